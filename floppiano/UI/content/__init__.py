@@ -1,8 +1,20 @@
-from floppiano.UI.content.splash_screen import splash_screen
-from floppiano.UI.content.dead_screen import dead_screen
-from floppiano.UI.content.screen_saver import FloppySaver
-from floppiano.UI.content.about_tab import AboutTab
-from floppiano.UI.content.midi_player_tab import MIDIPlayerTab
-from floppiano.UI.content.main_tab import MainTab
-from floppiano.UI.content.app_settings_tab import SettingsTab
-from floppiano.UI.content.easter_eggs import rick_roll_screen
\ No newline at end of file
+# UI content is imported on first use, so that startup only loads the content
+# that is shown (ex. no splash screen with --nosplash)
+_LAZY = {
+    'splash_screen': 'floppiano.UI.content.splash_screen',
+    'dead_screen': 'floppiano.UI.content.dead_screen',
+    'FloppySaver': 'floppiano.UI.content.screen_saver',
+    'AboutTab': 'floppiano.UI.content.about_tab',
+    'MIDIPlayerTab': 'floppiano.UI.content.midi_player_tab',
+    'MetricsTab': 'floppiano.UI.content.metrics_tab',
+    'MainTab': 'floppiano.UI.content.main_tab',
+    'SettingsTab': 'floppiano.UI.content.app_settings_tab',
+    'rick_roll_screen': 'floppiano.UI.content.easter_eggs',
+}
+
+def __getattr__(name:str):
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(
+        f"module 'floppiano.UI.content' has no attribute '{name}'")
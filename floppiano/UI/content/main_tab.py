@@ -1,7 +1,9 @@
 from asciimatics.widgets import Layout, Button
 from floppiano.UI.tabs import Tab
 from floppiano.UI.widgets import DynamicFrame, FloppieWidget, Setting
-from floppiano.synths import (PITCH_BEND_RANGES, OUTPUT_MODES, DriveSynth)
+from floppiano.synths import (
+    PITCH_BEND_RANGES, OUTPUT_MODES, MODULATION_WAVES, RANGE_POLICIES, 
+    DriveSynth)
 
 
 
@@ -36,7 +38,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Spin', 
                 options = ['off', 'on'], 
-                on_update = lambda: self._synth.__getattribute__('spin'), # On update just read the synth's attribute and match it
+                on_update = lambda: getattr(self._synth, 'spin'), # On update just read the synth's attribute and match it
                 on_change = lambda x: self._synth.__setattr__('spin', x), # Make the synth change
                 frame = self._frame,
                 tool_tip = "Controls the floppy drive platters. 'on' = the platters will spin!")
@@ -46,7 +48,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Bow', 
                 options = ['off', 'on'], 
-                on_update = lambda: self._synth.__getattribute__('bow'), 
+                on_update = lambda: getattr(self._synth, 'bow'), 
                 on_change = lambda x: self._synth.__setattr__('bow', x),
                 frame = self._frame,
                 tool_tip = "How the floppy drive heads move. 'on' = heads move to-and-fro!")
@@ -56,7 +58,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Polyphony', 
                 options = ['monophonic', 'polyphonic'], 
-                on_update = lambda: self._synth.__getattribute__('polyphonic'), 
+                on_update = lambda: getattr(self._synth, 'polyphonic'), 
                 on_change = self._polyphony_changed,
                 frame = self._frame,
                 tool_tip = "Sets the polyphony.") 
@@ -66,7 +68,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Pitch bend Range', 
                 options = list(PITCH_BEND_RANGES.keys()), 
-                on_update = lambda: self._synth.__getattribute__('pitch_bend_range'), 
+                on_update = lambda: getattr(self._synth, 'pitch_bend_range'), 
                 on_change = lambda x: self._synth.__setattr__('pitch_bend_range', x),
                 frame = self._frame,
                 tool_tip = "Changes how far the pitchwheel will bend a note at its extreme position.")
@@ -76,17 +78,47 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Modulation Rate', 
                 options = range(0,128), 
-                on_update = lambda: self._synth.__getattribute__('modulation_rate'), 
+                on_update = lambda: getattr(self._synth, 'modulation_rate'), 
                 on_change = lambda x: self._synth.__setattr__('modulation_rate', x),
                 frame = self._frame,
                 tool_tip = "The amount in Hz to add to a note when modulating. A.K.A. modulation attack.")
         )
 
+        self._settings.append(
+            Setting(
+                label_text = 'Modulation Wave', 
+                options = MODULATION_WAVES, 
+                on_update = lambda: getattr(self._synth, 'modulation_wave'), 
+                on_change = lambda x: self._synth.__setattr__('modulation_wave', x),
+                frame = self._frame,
+                tool_tip = "The modulation wave shape. 'square' is played by the drives, others cost bus time.")
+        )
+
+        self._settings.append(
+            Setting(
+                label_text = 'Glide', 
+                options = range(0,128), 
+                on_update = lambda: getattr(self._synth, 'glide'), 
+                on_change = lambda x: self._synth.__setattr__('glide', x),
+                frame = self._frame,
+                tool_tip = "The time (x20ms) a voice takes to slide to its next note. '0' = off")
+        )
+
+        self._settings.append(
+            Setting(
+                label_text = 'Range Policy', 
+                options = RANGE_POLICIES, 
+                on_update = lambda: getattr(self._synth, 'range_policy'), 
+                on_change = lambda x: self._synth.__setattr__('range_policy', x),
+                frame = self._frame,
+                tool_tip = "Notes a drive can't play go to another drive. 'fold' = or play them an octave away.")
+        )
+
         self._settings.append(
             Setting(
                 label_text = 'Monophonic Voices', 
                 options = range(0,128), 
-                on_update = lambda: self._synth.__getattribute__('mono_voices'),
+                on_update = lambda: getattr(self._synth, 'mono_voices'),
                 # _mono_voices is a private variable only edit if you know what you're doing
                 on_change = lambda x: self._synth.__setattr__('_mono_voices', x), 
                 frame = self._frame,
@@ -97,7 +129,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Polyphonic Voices', 
                 options = range(0,128), 
-                on_update = lambda: self._synth.__getattribute__('poly_voices'), 
+                on_update = lambda: getattr(self._synth, 'poly_voices'), 
                 on_change = lambda x: self._synth.__setattr__('poly_voices', x),
                 frame = self._frame,
                 tool_tip = "The number of voices to use when polyphonic. '0' = max voices")
@@ -117,7 +149,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Input Channel', 
                 options = range(0,16), 
-                on_update = lambda: self._synth.__getattribute__('input_channel'), 
+                on_update = lambda: getattr(self._synth, 'input_channel'), 
                 on_change = lambda x: self._synth.__setattr__('input_channel', x),
                 frame = self._frame,
                 tool_tip = "The incoming MIDI channel.")
@@ -127,7 +159,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Output Channel', 
                 options = range(0,16), 
-                on_update = lambda: self._synth.__getattribute__('output_channel'), 
+                on_update = lambda: getattr(self._synth, 'output_channel'), 
                 on_change = lambda x: self._synth.__setattr__('output_channel', x),
                 frame = self._frame,
                 tool_tip = "The outgoing MIDI channel.")
@@ -137,7 +169,7 @@ class MainTab(Tab):
             Setting(
                 label_text = 'Output Mode', 
                 options = OUTPUT_MODES, 
-                on_update = lambda: self._synth.__getattribute__('output_mode'), 
+                on_update = lambda: getattr(self._synth, 'output_mode'), 
                 on_change = lambda x: self._synth.__setattr__('output_mode', x),
                 frame = self._frame,
                 tool_tip = "What MIDI gets output. 'rollover' = MIDI that could not be played.")
@@ -0,0 +1,88 @@
+from asciimatics.widgets import Layout, Label, Divider
+from floppiano.UI.tabs import Tab
+from floppiano.UI.widgets import DynamicFrame, ReadOnlyText
+import floppiano.metrics as metrics
+
+import time
+
+class MetricsTab(Tab):
+    """
+        A tab for displaying live performance metrics (see floppiano.metrics)
+    """
+    # The most times per second the metrics are read
+    REFRESH_RATE = 2
+
+    # (label, metric name, 'rate' or a unit to scale the value by) of each row
+    ROWS = (
+        ('Loop rate', 'engine.loops', 'rate'),
+        ('Keyboard messages', 'messages.keyboard', 'rate'),
+        ('MIDI player messages', 'messages.midi_player', 'rate'),
+        ('MIDI input messages', 'messages.input_port', 'rate'),
+        ('Cluster messages', 'messages.cluster', 'rate'),
+        ('Bus writes', 'bus.writes', 'rate'),
+        ('Bus reads', 'bus.reads', 'rate'),
+        ('Bus errors', 'bus.errors', 'count'),
+        ('Dropped writes', 'bus.dropped', 'count'),
+        ('Active voices', 'synth.active_voices', 'count'),
+        ('Available voices', 'synth.available_voices', 'count'),
+        ('Rolled notes', 'synth.rolled', 'count'),
+        ('Player lateness', 'midi_player.lateness', 'ms'),
+    )
+
+    def __init__(self, app, name: str):
+        super().__init__(app, name)
+        # Ask the app to redraw the metrics without keyboard events
+        self.refresh_period = 1 / MetricsTab.REFRESH_RATE
+
+        # Set up the Frame
+        self._frame = DynamicFrame(
+            self.app.screen,
+            self.app.screen.height-2,
+            self.app.screen.width,
+            y=2,
+            has_border=False,
+            can_scroll=False,
+            on_update = self._update_widgets)
+        self._frame.set_theme(self.app.theme)
+
+        layout = Layout([1], fill_frame=False)
+        self._frame.add_layout(layout)
+        layout.add_widget(Label('Performance', align='^'))
+        layout.add_widget(Divider())
+
+        # A label and a value text for each row
+        layout = Layout([60, 40], fill_frame=False)
+        self._frame.add_layout(layout)
+        self._values:list[ReadOnlyText] = []
+        for label, _, _ in MetricsTab.ROWS:
+            layout.add_widget(Label(label), 0)
+            value = ReadOnlyText(tab_stop = False)
+            value.value = '-'
+            layout.add_widget(value, 1)
+            self._values.append(value)
+
+        # The snapshot the rates are measured from
+        self._last_snapshot = metrics.registry.snapshot()
+
+        self._frame.fix()
+        self.add_effect(self._frame, reset=False)
+
+    def _update_widgets(self):
+        # Read the metrics at most REFRESH_RATE times per second
+        last_time, _ = self._last_snapshot
+        if time.perf_counter() - last_time < self.refresh_period: return
+
+        snapshot = metrics.registry.snapshot()
+        rates = metrics.MetricsRegistry.rates(self._last_snapshot, snapshot)
+        self._last_snapshot = snapshot
+        _, values = snapshot
+
+        for text, (_, name, kind) in zip(self._values, MetricsTab.ROWS):
+            if name not in values:
+                text.value = '-'
+            elif kind == 'rate':
+                text.value = f'{rates[name]:.0f}/s'
+            elif kind == 'ms':
+                text.value = f'{values[name] * 1000:.1f} ms'
+            else:
+                text.value = f'{values[name]}'
@@ -1,23 +1,41 @@
-from asciimatics.widgets import Layout, FileBrowser
+from asciimatics.widgets import Layout, MultiColumnListBox, Text
 
 from asciimatics.widgets import Button, Divider
 
 from floppiano.UI.tabs import Tab
+from floppiano.library import MIDILibrary
 from floppiano.UI.widgets import DynamicFrame, Setting, ReadOnlyText
 
-import os
-
 class MIDIPlayerTab(Tab):
     """
-        A tab for displaying, playing and stopping .mid files
+        A tab for finding, playing and stopping .mid files from the MIDI
+        library
     """
+    # How often (in seconds) the list is refreshed while the library is built
+    BUILD_REFRESH_PERIOD = 0.5
+
+    # The ways to sort the library and the entry key to sort by
+    SORTS = (
+        ('name', lambda entry: entry['name'].lower()),
+        ('duration', lambda entry: entry.get('duration', 0)),
+        ('voices', lambda entry: entry.get('polyphony', 0)),
+        ('notes', lambda entry: entry.get('notes', 0)),
+    )
 
     def __init__(self, app, name: str):
         super().__init__(app, name)
 
-        # Get the Synth and MIDI Player
+        # Get the Synth, MIDI Player and MIDI library
         self._synth = self.app.resource('synth')
         self._midi_player = self.app.resource('midi_player')
+        self._library = self.app.resource('midi_library')
+        # The library version the list shows
+        self._library_version = None
+        # The sequence number of the last failed command when play/queue was
+        # pressed (newer failures are shown)
+        self._error_sequence = 0
+        # Refresh the list as the library is built
+        self.refresh_period = MIDIPlayerTab.BUILD_REFRESH_PERIOD
 
         # Set up the Frame
         self._frame = DynamicFrame(
@@ -32,82 +50,276 @@ class MIDIPlayerTab(Tab):
 
         # A setting to control the .mid playback transpose
         self._transpose_setting = Setting(
-            label_text = 'Transpose', 
-            options = range(-12,13), 
+            label_text = 'Transpose',
+            options = range(-12,13),
             on_update = lambda: 0, # This sets the default value
             on_change = None,
             frame = self._frame)
-        
+
         # A setting to control the .mid MIDI channel redirect
         self._redirect_setting = Setting(
-            label_text = 'Redirect', 
-            options = ['off', 'on'], 
-            on_update = None, 
+            label_text = 'Redirect',
+            options = ['off', 'on'],
+            on_update = None,
             on_change = None,
             frame = self._frame)
 
+        # A setting to transpose and pick the channels of the selected file
+        # that fit the most notes on the drives
+        self._arrange_setting = Setting(
+            label_text = 'Arrange',
+            options = ['off', 'auto'],
+            on_update = None,
+            on_change = lambda _: self._selection_changed(),
+            frame = self._frame)
+
+        # A setting to leave out notes ahead of time so that playing never 
+        # needs more voices than the synth has
+        self._reduce_setting = Setting(
+            label_text = 'Reduce',
+            options = ['off', 'on'],
+            on_update = None,
+            on_change = lambda _: self._selection_changed(),
+            frame = self._frame)
+
+        # A setting to sort the library
+        self._sort_setting = Setting(
+            label_text = 'Sort by',
+            options = [sort for sort, _ in MIDIPlayerTab.SORTS],
+            on_update = None,
+            on_change = lambda _: self._update_list(),
+            frame = self._frame)
 
         layout = Layout([1],fill_frame=False)
         self._frame.add_layout(layout)
+
+        # Filters the library by file name as it's typed
+        self._search = Text(
+            label = 'Search:',
+            on_change = self._update_list)
+        layout.add_widget(self._search)
         layout.add_widget(Divider())
 
-        # File Browser
-        self._file_browser = FileBrowser(
-                            height = 15,#height = Widget.FILL_FRAME,
-                            root = os.path.abspath("./assets/MIDI/"),
-                            on_select = self.play,
-                            on_change = None,
-                            file_filter = ".*.mid$")
-        layout.add_widget(self._file_browser)
+        # The library
+        self._file_list = MultiColumnListBox(
+            height = 10,
+            columns = ['<20', '>5', '>5', '>6'],
+            options = [],
+            titles = ['File', 'Time', 'Poly', 'Notes'],
+            on_change = self._selection_changed,
+            on_select = self.play)
+        layout.add_widget(self._file_list)
+
+        # The details (and warnings) of the selected file
+        self._info_text = ReadOnlyText(tab_stop = False)
+        self._info_text.value = ' '
+        layout.add_widget(self._info_text)
 
         layout.add_widget(Divider())
 
-        
-        layout = Layout([80,20])
+
+        layout = Layout([58,22,20])
         self._frame.add_layout(layout)
 
         # What's playing text
         self._details_text = ReadOnlyText(tab_stop = False)
         self._details_text.value = ' '
         layout.add_widget(self._details_text, 0)
-        
+
+        # A button to play the selected file after the playing one(s)
+        layout.add_widget(Button(text="Queue", on_click= self.queue), 1)
+
         # A button to stop playback
         self._stop_button = Button(text="Stop", on_click= self.stop)
-        layout.add_widget(self._stop_button,1)
+        layout.add_widget(self._stop_button,2)
 
 
         self._frame.fix()
         self.add_effect(self._frame, reset=False)
 
-    def _update_widgets(self):  
+    def _update_widgets(self):
+        # Show the files indexed since the last update
+        if self._library_version != self._library.version:
+            self._update_list()
+        if not self._library.building: self.refresh_period = None
+
         # If playing, enable the stop button and update the now playing text
         if self._midi_player.playing:
             self._stop_button.disabled = False
-            file_display_text = self._midi_player.file_path.split("/")[-1]
+            file_path = self._midi_player.file_path
+            # (No file between playlist files)
+            if file_path is None: file_path = '...'
+            file_display_text = file_path.split("/")[-1]
             self._details_text.value = f"'{file_display_text}'"
+            # Show how many files are queued
+            queued = len(self._midi_player.playlist)
+            if queued > 0: self._details_text.value += f' +{queued}'
+            # Show how many notes the drives couldn't play
+            unplayable = self._synth.range_stats('midi_player')['unplayable']
+            if unplayable > 0:
+                self._details_text.value += f' ({unplayable} unplayable)'
         else:
             self._stop_button.disabled = True
             self._details_text.value = ' '
+            # Show why the file didn't play
+            error = self.app.resource('command_error')
+            if error is not None and error['sequence'] > self._error_sequence:
+                self._details_text.value = error['error']
+
+    def _update_list(self):
+        # List the library's files that match the search, sorted
+        self._library_version = self._library.version
+        search = self._search.value.lower()
+        _, key = MIDIPlayerTab.SORTS[self._sort_setting.value or 0]
+        entries = sorted(
+            (entry for entry in self._library.get_entries()
+             if search in entry['name'].lower()),
+            key = key)
+
+        voices = self._voices()
+        options = []
+        for entry in entries:
+            # Mark the files that need more voices than the synth has
+            mark = '!' if entry.get('polyphony', 0) > voices else ''
+            if 'error' in entry:
+                columns = ['?' + entry['name'], '-', '-', '-']
+            else:
+                minutes, seconds = divmod(int(entry['duration']), 60)
+                columns = [
+                    mark + entry['name'],
+                    f'{minutes}:{seconds:02}',
+                    str(entry['polyphony']),
+                    str(entry['notes'])]
+            options.append((columns, entry))
 
+        # Keep the selection if it's still listed
+        selected = self._file_list.value
+        self._file_list.options = options
+        for _, entry in options:
+            if selected is not None and entry['path'] == selected['path']:
+                self._file_list.value = entry
+                break
+        self._selection_changed()
+
+    def _selection_changed(self):
+        # Show the selected file's details and arrangement, warn if the drives
+        # can't play it
+        entry = self._file_list.value
+        arrangement = self._arrangement()
+        if arrangement is not None and self._auto_arrange():
+            # Play the arrangement (the channels are picked on play())
+            self._transpose_setting.value = arrangement['transpose']
+        if entry is None:
+            self._info_text.value = ' '
+        elif 'error' in entry:
+            self._info_text.value = f"Can't read: {entry['error']}"
+        elif entry['notes'] > 0 and self._channels() is not None and \
+            self._synth.input_channel not in entry['channels']:
+            # Without a redirect the synth hears none of the file
+            self._info_text.value = \
+                f'No notes on channel {self._synth.input_channel}'
+        elif arrangement is not None and (self._auto_arrange() or 
+            arrangement['transpose'] != self._transpose_setting.value or
+            arrangement['channels'] != entry['channels']):
+            # Show (or suggest) the arrangement
+            channels = ','.join(
+                str(channel) for channel in arrangement['channels'])
+            self._info_text.value = (
+                f"{'Arranged' if self._auto_arrange() else 'Try'} "
+                f"{arrangement['transpose']:+} ch {channels} "
+                f"({arrangement['in_range']}/{entry['notes']} in range)")
+        elif entry['polyphony'] > self._voices() and \
+            self._reduce_setting.value:
+            self._info_text.value = f'Reduced to {self._voices()} voices'
+        elif entry['polyphony'] > self._voices():
+            self._info_text.value = (
+                f"Needs {entry['polyphony']} voices, "
+                f'the synth has {self._voices()}')
+        elif entry['notes'] == 0:
+            self._info_text.value = 'No notes'
+        else:
+            channels = ','.join(str(channel) for channel in entry['channels'])
+            self._info_text.value = (
+                f"Notes {entry['lowest']}-{entry['highest']}, "
+                f'channels {channels}')
+
+    def _arrangement(self) -> dict:
+        # The arrangement of the selected file (see MIDILibrary.arrange()), 
+        # None if there is none
+        entry = self._file_list.value
+        if entry is None or 'error' in entry: return None
+        return MIDILibrary.arrange(
+            entry, 
+            self._synth.playable_notes, 
+            self._voices(), 
+            channels = self._channels())
+
+    def _auto_arrange(self) -> bool:
+        # Should the selected file be played arranged?
+        return bool(self._arrange_setting.value)
+
+    def _channels(self) -> list[int]:
+        # The channels to play (and reduce), None for all. Without a redirect
+        # the synth only hears its input channel
+        if bool(self._redirect_setting.value): return None
+        return [self._synth.input_channel]
+
+    def _reduce_voices(self) -> int:
+        # The voices to reduce the files played to, None to not reduce
+        if not self._reduce_setting.value or self._voices() == 0: return None
+        return self._voices()
+
+    def _voices(self) -> int:
+        # The number of voices the synth can play at once
+        return self._synth.active_voices + self._synth.available_voices
 
     def play(self):
         # Don't do anything if the player is already playing
         if self._midi_player.playing: return
 
+        entry = self._file_list.value
+        if entry is None or 'error' in entry: return
+        self._clear_error()
         #The path to the file that the user wants to play
-        file = self._file_browser.value
+        file = entry['path']
+        # Leave out the channels that don't fit the drives if arranging
+        arrangement = self._arrangement() if self._auto_arrange() else None
+        channels = self._channels() if arrangement is None else \
+            arrangement['channels']
         #start playing
-        if bool(self._redirect_setting.value):
-            # Redirect all the MIDI to the synth's input channel
-            self._midi_player.play(
-                file, 
-                redirect = self._synth.input_channel, 
-                transpose = self._transpose_setting.value)
-        else:
-            # Don't redirect
-            self._midi_player.play(
-                file, 
-                transpose = self._transpose_setting.value)
+        self._midi_player.play(
+            file, 
+            *self._play_args(), 
+            channels = channels, 
+            voices = self._reduce_voices())
+
+    def queue(self):
+        # Play the selected file once the playing (or queued) files are done
+        entry = self._file_list.value
+        if entry is None or 'error' in entry: return
+        self._clear_error()
+        self._midi_player.queue(entry['path'])
+        # Nothing playing, play the queue now
+        if not self._midi_player.playing: 
+            self._midi_player.play_playlist(
+                *self._play_args(), 
+                channels = self._channels(), 
+                voices = self._reduce_voices())
+
+    def _clear_error(self):
+        # Only show the failures from now on
+        error = self.app.resource('command_error')
+        if error is not None: self._error_sequence = error['sequence']
 
     def stop(self):
+        # Stop playback, including the queued files
+        self._midi_player.clear_playlist()
         self._midi_player.stop()
+
+    def _play_args(self) -> tuple[int, int]:
+        # The redirect and transpose to play with
+        if bool(self._redirect_setting.value):
+            # Redirect all the MIDI to the synth's input channel
+            return (self._synth.input_channel, self._transpose_setting.value)
+        # Don't redirect
+        return (-1, self._transpose_setting.value)
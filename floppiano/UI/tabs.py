@@ -148,6 +148,9 @@ class Tab(Scene):
         self.prior_tab_name = None
         # The next tab in the TabGroup - used for going to the next Tab
         self.next_tab_name = None
+        # How often (in seconds) the Tab should be redrawn without a keyboard
+        # event - None only redraws on keyboard events
+        self.refresh_period = None
 
     @property
     def app(self):
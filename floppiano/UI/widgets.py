@@ -279,6 +279,10 @@ class Setting():
     def value(self):
         return self._dd.value
     
+    @value.setter
+    def value(self, value):
+        self._dd.value = value
+
     @property
     def selected(self) -> bool:
         return self._dd._has_focus
\ No newline at end of file
@@ -1,2 +1,15 @@
 VERSION = 0.1
-from floppiano.floppiano_app import FlopPianoApp
\ No newline at end of file
+
+# The apps are imported on first use, so that running headless never imports
+# the UI (asciimatics)
+_LAZY = {
+    'FlopPianoApp': 'floppiano.floppiano_app',
+    'HeadlessApp': 'floppiano.headless',
+    'Engine': 'floppiano.engine',
+}
+
+def __getattr__(name:str):
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module 'floppiano' has no attribute '{name}'")
@@ -1,11 +1,15 @@
 #Try to import smbus for The SMBusWrapper (default bus) class
 try:
-    from smbus2 import SMBus
+    from smbus2 import SMBus, i2c_msg
 except ModuleNotFoundError:
     # Ignore, let the default_bus() call handle setting things up
     pass
 
+import time
 import logging
+import floppiano.metrics as metrics
+from queue import SimpleQueue, Empty
+from threading import Lock
 
 class BusException(Exception):
     pass
@@ -34,6 +38,11 @@ class Bus():
             'floppiano.bus.default_bus()'
             )
 
+    def write_batch(self, messages:list[tuple[int, int, list]])->None:
+        # Buses that can't combine writes just write them one after another
+        for address, register, data in messages:
+            self.write(address, register, data)
+
 class DebugBus(Bus):
     """
         A class to write all I2C reads/writes to a logger. Does not 
@@ -44,23 +53,36 @@ class DebugBus(Bus):
         self._logger = logging.getLogger(__name__)
 
     def read(self, address:int, register:int, length:int)->list[int]:
+        metrics.registry.count('bus.reads')
         self._logger.debug(f'read from address: {address} register: {register}'
                            f' length: {length}')
         return [0]*length
 
     def write(self, address:int, register:int, data:list)->None:
+        metrics.registry.count('bus.writes')
         self._logger.debug(f'write to address: {address} register: {register}'
                            f' data: {data}')
 
+    def write_batch(self, messages:list[tuple[int, int, list]])->None:
+        metrics.registry.count('bus.writes', len(messages))
+        self._logger.debug(f'write batch: {messages}')
+
 
 class SMBusWrapper(Bus):
     """_summary_
         A wrapper class for smbus. We only implement the things
         we care about. (reading and writing via I2C)
     """
+    # The most messages the kernel allows in one transaction 
+    # (I2C_RDWR_IOCTL_MAX_MSGS)
+    MAX_BATCH = 42
+
     def __init__(self, bus_number:int) -> None:
         super().__init__()
         self._bus = SMBus(bus_number) 
+        # SMBus sets the device address then transfers, so only one thread may
+        # use it at a time
+        self._lock = Lock()
     
     def read(self, address: int, register: int, length: int) -> list[int]:
         """
@@ -77,9 +99,12 @@ class SMBusWrapper(Bus):
         Returns:
             list[int]: The bytes read from the register
         """
+        metrics.registry.count('bus.reads')
         try:
-            return self._bus.read_i2c_block_data(address, register, length)
+            with self._lock:
+                return self._bus.read_i2c_block_data(address, register, length)
         except OSError as oe:
+            metrics.registry.count('bus.errors')
             raise BusException("Error reading from the I2C SMbus") from oe
     
     def write(self, address: int, register: int, data:list[int]) -> None:
@@ -94,12 +119,241 @@ class SMBusWrapper(Bus):
         Raises:
             BusException: If the write could not be completed
         """
+        metrics.registry.count('bus.writes')
         try:
-            self._bus.write_block_data(address, register, data) #<- this does though
+            with self._lock:
+                self._bus.write_block_data(address, register, data) #<- this does though
             #self._bus.write_i2c_block_data(address, register, data) <- does not work right
         except OSError as oe:
+            metrics.registry.count('bus.errors')
+            raise BusException("Error writing to the I2C SMbus") from oe
+
+    def write_batch(self, messages:list[tuple[int, int, list[int]]]) -> None:
+        """
+            Writes a list of block writes back-to-back in a single bus
+            transaction (I2C combined messages with repeated starts). Each
+            message has the same bytes on the wire as a write() call.
+        Args:
+            messages (list[tuple[int, int, list[int]]]): The (address, 
+                register, data) of each write, in order.
+
+        Raises:
+            BusException: If the writes could not be completed
+        """
+        # The same bytes as an SMBus block write: register, count, data
+        i2c_messages = [
+            i2c_msg.write(address, [register, len(data)] + list(data))
+            for address, register, data in messages]
+        metrics.registry.count('bus.writes', len(messages))
+        try:
+            # The kernel limits the number of messages per transaction
+            with self._lock:
+                for start in range(
+                    0, len(i2c_messages), SMBusWrapper.MAX_BATCH):
+                    self._bus.i2c_rdwr(
+                        *i2c_messages[start:start + SMBusWrapper.MAX_BATCH])
+        except OSError as oe:
+            metrics.registry.count('bus.errors')
             raise BusException("Error writing to the I2C SMbus") from oe
 
+class FaultTolerantBus(Bus):
+    """
+        Wraps a Bus to retry failed reads/writes (with backoff) and to stop
+        talking to addresses that keep failing. Each address has a circuit
+        breaker: after repeated failures it opens and the address's writes are 
+        dropped (reads raise immediately) until a probe read succeeds. Failed 
+        writes never raise, so one bad device can't stop the others.
+    """
+    # Breaker states
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(
+        self,
+        bus_object:Bus,
+        retries:int = 2,
+        backoff:float = 0.0005,
+        failures:int = 3,
+        cooldown:float = 2.0,
+        probe_register:int = 0) -> None:
+        """
+            Creates a FaultTolerantBus
+        Args:
+            bus_object (Bus): The Bus to read/write with
+            retries (int, optional): The number of times to retry a failed
+                read/write. Defaults to 2.
+            backoff (float, optional): The wait (in seconds) before the first
+                retry, doubled for every retry after. Defaults to 0.0005.
+            failures (int, optional): The number of failed reads/writes (after
+                retries) in a row that open an address's breaker. Defaults to 3.
+            cooldown (float, optional): The time (in seconds) between probes of
+                an address with an open breaker. Defaults to 2.0.
+            probe_register (int, optional): The register to read (one byte) to 
+                probe an address. Defaults to 0.
+        """
+        super().__init__()
+        self._bus = bus_object
+        self._retries = retries
+        self._backoff = backoff
+        self._failures = failures
+        self._cooldown = cooldown
+        self._probe_register = probe_register
+        self._logger = logging.getLogger(__name__)
+
+        self._lock = Lock()
+        # Failed reads/writes in a row and the total errors, by address
+        self._failed:dict[int, int] = {}
+        self._errors:dict[int, int] = {}
+        # The time of the next probe of each address with an open breaker
+        self._open:dict[int, float] = {}
+        self._changes = SimpleQueue()
+        # Writes dropped because of an open breaker
+        self.dropped = 0
+
+    def read(self, address:int, register:int, length:int) -> list[int]:
+        """
+            Reads (with retries) from a register at an I2C address
+        Raises:
+            BusException: If the read failed or the address's breaker is open
+        """
+        if address in self._open:
+            raise BusException(f'I2C address {address} is not answering')
+        return self._attempt(address, self._bus.read, address, register, length)
+
+    def write(self, address:int, register:int, data:list) -> bool:
+        """
+            Writes (with retries) to a register at an I2C address. The write is
+            dropped if the address's breaker is open or it keeps failing.
+        Returns:
+            bool: True if the write was sent, False if it was dropped
+        """
+        if address in self._open:
+            self.dropped += 1
+            metrics.registry.count('bus.dropped')
+            return False
+        try:
+            self._attempt(address, self._bus.write, address, register, data)
+            return True
+        except BusException:
+            # Counted by _attempt(), don't let one device stop the others
+            return False
+
+    def write_batch(self, messages:list[tuple[int, int, list]]) -> bool:
+        """
+            Writes (with retries) a list of writes in one transaction. Writes to
+            addresses with an open breaker are dropped. If the transaction keeps
+            failing, some of its writes may have been made so none are resent,
+            each address is probed (see update()) to find the failing one.
+        Returns:
+            bool: True if every write was sent, False if any was dropped or
+                the transaction failed (resending is up to the caller)
+        """
+        batch = [message for message in messages if message[0] not in self._open]
+        self.dropped += len(messages) - len(batch)
+        metrics.registry.count('bus.dropped', len(messages) - len(batch))
+        if len(batch) == 0: return False
+        try:
+            self._attempt(None, self._bus.write_batch, batch)
+        except BusException:
+            # (Address 0 is every drive, it can't be probed)
+            for address in dict.fromkeys(message[0] for message in batch):
+                if address == 0: continue
+                try:
+                    self._attempt(
+                        address, self._bus.read, 
+                        address, self._probe_register, 1)
+                except BusException:
+                    # Counted by _attempt()
+                    pass
+            return False
+        return len(batch) == len(messages)
+
+    def update(self) -> None:
+        """
+            Should be called regularly. Probes (one read) an address whose
+            breaker is open once its cooldown is over, the breaker closes if 
+            the read succeeds.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            due = [address for address, probe_time in self._open.items()
+                   if probe_time <= now]
+            if len(due) == 0: return
+            address = due[0]
+            self._open[address] = now + self._cooldown
+
+        try:
+            self._bus.read(address, self._probe_register, 1)
+        except BusException:
+            return
+        with self._lock:
+            self._open.pop(address, None)
+            self._failed[address] = 0
+        self._logger.info(f'I2C address {address} breaker closed')
+        self._changes.put((address, True))
+
+    def breaker(self, address:int) -> str:
+        """
+            Returns the breaker state (CLOSED or OPEN) of an address
+        Args:
+            address (int): The I2C address
+        """
+        return FaultTolerantBus.OPEN if address in self._open else \
+            FaultTolerantBus.CLOSED
+
+    def errors(self, address:int) -> int:
+        """
+            Returns the number of failed reads/writes (after retries) of an 
+            address
+        Args:
+            address (int): The I2C address
+        """
+        return self._errors.get(address, 0)
+
+    def get_changes(self) -> list[tuple[int, bool]]:
+        """
+            Returns (without blocking) the breakers that opened or closed since
+            the last call. Meant to be called from the main loop.
+        Returns:
+            list[tuple[int, bool]]: The I2C address and whether its breaker is
+                closed (the address can be used), in the order they changed
+        """
+        changes = []
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except Empty:
+                return changes
+
+    def _attempt(self, address:int, operation, *args):
+        # Run a bus operation, retrying with backoff. Counts the failure 
+        # against the address (if any) when every attempt failed.
+        for attempt in range(self._retries + 1):
+            try:
+                result = operation(*args)
+                if address is not None and self._failed.get(address, 0) > 0:
+                    with self._lock: self._failed[address] = 0
+                return result
+            except BusException as be:
+                error = be
+                if attempt < self._retries:
+                    time.sleep(self._backoff * 2 ** attempt)
+        if address is not None: self._failure(address)
+        raise error
+
+    def _failure(self, address:int) -> None:
+        # Count a failure, opening the breaker after too many in a row. 
+        # (Address 0 is every drive, it never opens)
+        with self._lock:
+            self._errors[address] = self._errors.get(address, 0) + 1
+            self._failed[address] = self._failed.get(address, 0) + 1
+            if address == 0 or address in self._open or \
+                self._failed[address] < self._failures:
+                return
+            self._open[address] = time.perf_counter() + self._cooldown
+        self._logger.warning(f'I2C address {address} breaker opened')
+        self._changes.put((address, False))
+
 def default_bus(bus_object:Bus = None):
     """_summary_
         Sets the default Bus handler.
@@ -0,0 +1,219 @@
+import time
+import socket
+import struct
+import logging
+import floppiano.metrics as metrics
+from mido import Message
+
+"""
+                              Cluster Packets:
+
+Several FlopPianos (nodes) can be chained into one instrument: the MIDI that a
+node's synth rolls over (ex. notes it has no voice for) is sent to the next
+node over UDP instead of to the MIDI output port.
+
+Each datagram holds one or more messages:
+    b'FPC1'                         - The packet magic (and version)
+    then for each message:
+        <d  origin                  - When the message arrived at the first
+                                      node (seconds since the epoch)
+        <B  hops                    - The number of times it was forwarded
+        <H  length                  - The length of the MIDI bytes
+        bytes                       - The MIDI message (see mido's bytes())
+
+The origin is a wall clock time so it can be compared across nodes, the nodes'
+clocks should be synchronized (ex. NTP) when they are on different machines.
+"""
+
+# The packet magic (and version)
+MAGIC = b'FPC1'
+# The origin, hops and length of each message
+ENTRY = struct.Struct('<dBH')
+# The most bytes per datagram (fits an ethernet frame)
+MAX_PACKET = 1400
+# The most times a message is forwarded (stops messages going around a ring
+# of nodes forever)
+MAX_HOPS = 8
+
+
+class ClusterLink():
+    """
+        Sends the MIDI a node rolls over to the next node and receives the MIDI
+        the node before rolled over, over UDP without blocking. Messages keep
+        the time they first arrived at (see floppiano.cluster)
+    """
+
+    def __init__(
+        self,
+        port:int,
+        next_node:tuple[str, int] = None,
+        host:str = '0.0.0.0') -> None:
+        """
+            Creates a ClusterLink
+        Args:
+            port (int): The UDP port to receive MIDI on
+            next_node (tuple[str, int], optional): The host and UDP port of
+                the next node. Defaults to None (the last node).
+            host (str, optional): The address to receive MIDI on. Defaults to
+                '0.0.0.0' (every interface).
+        """
+        self.logger = logging.getLogger(__name__)
+        self._port = port
+        self._host = host
+        self._next_node = next_node
+        self._socket:socket.socket = None
+        # Message counts
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+
+    def open(self) -> None:
+        """
+            Opens the socket
+
+        Raises:
+            OSError: If the port can not be used
+        """
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((self._host, self._port))
+        self._socket.setblocking(False)
+        self.logger.info(
+            f'Cluster: receiving on {self._host}:{self._port}, next node '
+            f'{self._next_node}')
+
+    def close(self) -> None:
+        """
+            Closes the socket
+        """
+        if self._socket is not None: self._socket.close()
+        self._socket = None
+
+    @property
+    def next_node(self) -> tuple[str, int]:
+        """
+            The host and UDP port of the next node, None if this is the last
+        """
+        return self._next_node
+
+    def receive(self) -> list[tuple[Message, float, int]]:
+        """
+            Returns (without blocking) the messages received since the last
+            call. Meant to be called from the main loop.
+        Returns:
+            list[tuple[Message, float, int]]: The message, the time it first
+                arrived (converted to this node's time.perf_counter()) and the
+                number of times it was forwarded, in the order received
+        """
+        if self._socket is None: return []
+        messages = []
+        while True:
+            try:
+                data, _ = self._socket.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                # (ex. the next node's port is closed, reported on Linux)
+                self.logger.debug(f'Cluster receive failed: {e}')
+                continue
+            try:
+                entries = ClusterLink.unpack(data)
+            except ValueError as e:
+                self.errors += 1
+                self.logger.debug(f'Bad cluster packet: {e}')
+                continue
+            # Wall clock origins to this node's perf_counter()
+            offset = time.perf_counter() - time.time()
+            messages.extend(
+                (msg, origin + offset, hops) for msg, origin, hops in entries)
+        self.received += len(messages)
+        metrics.registry.count('cluster.received', len(messages))
+        return messages
+
+    def send(
+        self,
+        messages:list[tuple[Message, float, int]]
+        ) -> list[tuple[Message, float, int]]:
+        """
+            Forwards messages to the next node. The messages that were
+            forwarded MAX_HOPS times already are not.
+        Args:
+            messages (list[tuple[Message, float, int]]): The message, the time
+                it first arrived (time.perf_counter()) and the number of times
+                it was forwarded
+
+        Returns:
+            list[tuple[Message, float, int]]: The messages that were not
+                forwarded (all of them if there is no next node)
+        """
+        if self._socket is None or self._next_node is None: return messages
+        # perf_counter() arrivals to wall clock origins
+        offset = time.time() - time.perf_counter()
+        entries = [(msg, arrival + offset, hops + 1)
+                   for msg, arrival, hops in messages if hops < MAX_HOPS]
+        kept = [entry for entry in messages if entry[2] >= MAX_HOPS]
+        if len(entries) == 0: return kept
+        for packet in ClusterLink.pack(entries):
+            try:
+                self._socket.sendto(packet, self._next_node)
+            except OSError as e:
+                # Not answering, the notes are lost (like a rolled note
+                # without an output port)
+                self.errors += 1
+                self.logger.debug(f'Cluster send failed: {e}')
+        self.sent += len(entries)
+        metrics.registry.count('cluster.sent', len(entries))
+        return kept
+
+    @staticmethod
+    def pack(entries:list[tuple[Message, float, int]]) -> list[bytes]:
+        """
+            Packs messages into as few datagrams as possible (see
+            floppiano.cluster)
+        Args:
+            entries (list[tuple[Message, float, int]]): The message, its origin
+                (seconds since the epoch) and hops
+
+        Returns:
+            list[bytes]: The datagrams
+        """
+        packets = []
+        packet = bytearray(MAGIC)
+        for msg, origin, hops in entries:
+            data = bytes(msg.bytes())
+            entry = ENTRY.pack(origin, min(hops, 255), len(data)) + data
+            if len(packet) > len(MAGIC) and \
+                len(packet) + len(entry) > MAX_PACKET:
+                packets.append(bytes(packet))
+                packet = bytearray(MAGIC)
+            packet += entry
+        if len(packet) > len(MAGIC): packets.append(bytes(packet))
+        return packets
+
+    @staticmethod
+    def unpack(data:bytes) -> list[tuple[Message, float, int]]:
+        """
+            Unpacks the messages of a datagram (see floppiano.cluster)
+        Args:
+            data (bytes): The datagram
+
+        Raises:
+            ValueError: If the datagram is not a cluster packet
+
+        Returns:
+            list[tuple[Message, float, int]]: The message, its origin (seconds
+                since the epoch) and hops
+        """
+        if not data.startswith(MAGIC): raise ValueError('Not a cluster packet')
+        entries = []
+        offset = len(MAGIC)
+        while offset < len(data):
+            if offset + ENTRY.size > len(data):
+                raise ValueError('Truncated cluster packet')
+            origin, hops, length = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            if offset + length > len(data):
+                raise ValueError('Truncated cluster packet')
+            msg = Message.from_bytes(data[offset:offset + length])
+            offset += length
+            entries.append((msg, origin, hops))
+        return entries
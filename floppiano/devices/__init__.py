@@ -1,4 +1,9 @@
 DEVICE_TYPE_REG = 4 # Should be common to all devices
 from floppiano.devices.drives import Drives
+# Before the keyboards, the synths (imported by keyboards) need it
+from floppiano.devices.calibration import DriveCalibration
 from floppiano.devices.discovery import DeviceDiscovery
-from floppiano.devices.keyboards import MIDIKeyboard
\ No newline at end of file
+from floppiano.devices.keyboards import (
+    MIDIKeyboard, KeyboardScanner, WheelFilter)
+from floppiano.devices.inventory import DeviceInventory
+from floppiano.devices.monitor import DeviceMonitor
@@ -0,0 +1,199 @@
+import json
+import math
+from floppiano.midi import MIDIUtil
+from floppiano.devices.drives import Drives
+
+"""
+                        Drive Calibration File:
+
+A JSON object where each key is a drive's I2C address and each value is an
+object with any of the following (optional) keys:
+
+    cents    - The tuning offset (in cents) to add to every frequency sent to
+               the drive. Defaults to 0.
+    min_freq - The lowest frequency (in Hz) the drive can sound well.
+               Defaults to 0.
+    max_freq - The highest frequency (in Hz) the drive can sound well.
+               Defaults to no limit.
+
+Ex.
+{
+    "8":  {"cents": -12.5},
+    "9":  {"cents": 3, "min_freq": 45, "max_freq": 1200}
+}
+"""
+
+
+class DriveCalibration():
+    """
+        A store of per-drive tuning. Precomputes each drive's frequency payload
+        (see Drives.pack_frequency()) for every MIDI note and the set of MIDI
+        notes each drive can play, so that nothing is calculated when a note is
+        played.
+    """
+
+    def __init__(self, drives:dict[int, dict] = None) -> None:
+        """
+            Creates a DriveCalibration. Drives that are not calibrated are in
+            tune and can play every note the drive firmware accepts.
+        Args:
+            drives (dict[int, dict], optional): A dict of drive I2C address to
+                calibration dict (keys: 'cents', 'min_freq', 'max_freq').
+                Defaults to None (no drives calibrated).
+
+        Raises:
+            ValueError: If a drive's address or calibration is not valid
+        """
+        self._drives:dict[int, dict] = {}
+        # The precomputed tables of each calibrated drive
+        self._payloads:dict[int, tuple[list[int]]] = {}
+        self._playable:dict[int, frozenset[int]] = {}
+
+        if drives is not None:
+            for address, calibration in drives.items():
+                self._add(int(address), calibration)
+
+        # The tables for drives without a calibration
+        self._default_payloads = DriveCalibration._gen_payloads(0)
+        self._default_playable = DriveCalibration._gen_playable(
+            0, 0, math.inf)
+
+    @staticmethod
+    def load(file_path:str) -> 'DriveCalibration':
+        """
+            Loads a DriveCalibration from a calibration (JSON) file
+        Args:
+            file_path (str): The path to the calibration file
+
+        Raises:
+            ValueError: If the file's contents are not a valid calibration
+
+        Returns:
+            DriveCalibration: The loaded DriveCalibration
+        """
+        with open(file_path, encoding='utf8') as file:
+            drives = json.load(file)
+        if not isinstance(drives, dict):
+            raise ValueError('A calibration file must contain a JSON object')
+        return DriveCalibration(drives)
+
+    def save(self, file_path:str) -> None:
+        """
+            Saves the DriveCalibration to a calibration (JSON) file
+        Args:
+            file_path (str): The path to the calibration file
+        """
+        drives = {}
+        for address, calibration in self._drives.items():
+            saved = {
+                'cents': calibration['cents'],
+                'min_freq': calibration['min_freq']
+            }
+            # No limit is the default (and not valid JSON)
+            if calibration['max_freq'] != math.inf:
+                saved['max_freq'] = calibration['max_freq']
+            drives[str(address)] = saved
+        with open(file_path, 'w', encoding='utf8') as file:
+            json.dump(drives, file, indent=4)
+
+    def cents(self, address:int) -> float:
+        """
+            Returns the tuning offset (in cents) of a drive
+        Args:
+            address (int): The drive's I2C address
+        """
+        if address in self._drives: return self._drives[address]['cents']
+        return 0
+
+    def range(self, address:int) -> tuple[float, float]:
+        """
+            Returns the usable frequency range (min, max in Hz) of a drive
+        Args:
+            address (int): The drive's I2C address
+        """
+        if address in self._drives:
+            calibration = self._drives[address]
+            return (calibration['min_freq'], calibration['max_freq'])
+        return (0, math.inf)
+
+    def tune(self, address:int, frequency:float) -> float:
+        """
+            Applies a drive's tuning offset to a frequency. For notes use
+            payload() instead.
+        Args:
+            address (int): The drive's I2C address
+            frequency (float): The frequency (in Hz) to tune
+
+        Returns:
+            float: The frequency the drive should be sent
+        """
+        if address in self._drives:
+            return frequency * self._drives[address]['ratio']
+        return frequency
+
+    def payload(self, address:int, note:int) -> list[int]:
+        """
+            Returns the precomputed (tuned) frequency payload to send to a drive
+            to play a MIDI note.
+        Args:
+            address (int): The drive's I2C address
+            note (int): The MIDI note
+
+        Returns:
+            list[int]: The frequency payload (see Drives.frequency_payload())
+        """
+        return self._payloads.get(address, self._default_payloads)[note]
+
+    def playable(self, address:int) -> frozenset[int]:
+        """
+            Returns the set of MIDI notes a drive can play. That is, the notes
+            in the drive's usable range whose tuned frequency is accepted by
+            the drive firmware (see Drives.playable())
+        Args:
+            address (int): The drive's I2C address
+        """
+        return self._playable.get(address, self._default_playable)
+
+    def _add(self, address:int, calibration:dict) -> None:
+        # Validates and stores a drive's calibration then builds its tables
+        Drives._check_address(address)
+        if address == 0:
+            raise ValueError('Drive address 0 can not be calibrated')
+
+        cents = float(calibration.get('cents', 0))
+        min_freq = float(calibration.get('min_freq', 0))
+        max_freq = float(calibration.get('max_freq', math.inf))
+        if min_freq < 0 or max_freq <= min_freq:
+            raise ValueError(
+                f'Invalid frequency range for drive {address}: '
+                f'[{min_freq}, {max_freq}]')
+
+        self._drives[address] = {
+            'cents': cents,
+            'min_freq': min_freq,
+            'max_freq': max_freq,
+            'ratio': 2 ** (cents / 1200)
+        }
+        self._payloads[address] = DriveCalibration._gen_payloads(cents)
+        self._playable[address] = DriveCalibration._gen_playable(
+            cents, min_freq, max_freq)
+
+    @staticmethod
+    def _gen_playable(
+        cents:float, 
+        min_freq:float, 
+        max_freq:float) -> frozenset[int]:
+        # The MIDI notes in the range that the firmware accepts once tuned
+        ratio = 2 ** (cents / 1200)
+        return frozenset(
+            note for note in range(128)
+            if min_freq <= MIDIUtil.MIDI2Freq(note) <= max_freq and 
+            Drives.playable(MIDIUtil.MIDI2Freq(note) * ratio))
+
+    @staticmethod
+    def _gen_payloads(cents:float) -> tuple[list[int]]:
+        # The tuned frequency payload of every MIDI note
+        ratio = 2 ** (cents / 1200)
+        return tuple(
+            Drives.pack_frequency(MIDIUtil.MIDI2Freq(note) * ratio)
+            for note in range(128))
@@ -1,36 +1,78 @@
-from threading import Thread, Event
+import time
+from threading import Thread, Event, Lock
 import floppiano.bus as bus
 import floppiano.devices.drives as drive
 import floppiano.devices.keyboards as keyboard
 from floppiano.devices import DEVICE_TYPE_REG
 
+# The range of valid (non-reserved) I2C addresses
+FIRST_ADDRESS = 0x8
+LAST_ADDRESS = 0x77
+
 class DeviceDiscovery(Thread):
     """
-        A Thread to find drives and the keyboard on the I2C bus
+        A Thread to find drives and the keyboard on the I2C bus. Likely
+        addresses are probed first and the scan stops as soon as the expected
+        devices are found.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        priority:list[int] = None,
+        expected_drives:int = None,
+        expect_keyboard:bool = True,
+        shards:int = 1) -> None:
+        """
+            Creates a DeviceDiscovery
+        Args:
+            priority (list[int], optional): Addresses to probe before all
+                others, ex. the last known devices. Defaults to None.
+            expected_drives (int, optional): Stop the scan once this many drives
+                (and the keyboard, if expected) are found. Defaults to None
+                (scan every address).
+            expect_keyboard (bool, optional): Is a keyboard expected? Only used
+                if expected_drives is given. Defaults to True.
+            shards (int, optional): The number of threads to split the probes
+                between. Defaults to 1.
+        """
         Thread.__init__(self)
 
         self._stop_event = Event()
+        self._lock = Lock()
         self._drive_addresses = []
         self._keyboard_address = None
-    
+        self._scan_times:dict[int, float] = {}
+
+        self._expected_drives = expected_drives
+        self._expect_keyboard = expect_keyboard
+        self._shards = max(1, shards)
+
+        # Probe the given addresses, the keyboard's default address, then
+        # everything else (drives count up from their default address)
+        order = [] if priority is None else list(priority)
+        order.append(keyboard.DEFAULT_ADDRESS)
+        order.extend(range(drive.DEFAULT_ADDRESS, LAST_ADDRESS + 1))
+        order.extend(range(FIRST_ADDRESS, drive.DEFAULT_ADDRESS))
+        self._order = [
+            address for index, address in enumerate(order)
+            if address is not None and
+            FIRST_ADDRESS <= address <= LAST_ADDRESS and
+            address not in order[:index]]
+
     def run(self) -> None:
-        # ping all i2c devices from from 0x8 to 0x77 and get their device type, 
-        # if the type is correct add it to the list/update the devices
-        for address in range(0x8, 0x77+1):
-            if self._stop_event.is_set(): break
-            try:
-                response = bus.read(address, DEVICE_TYPE_REG, 1)[0]
-                if response == drive.DEVICE_TYPE: 
-                    self._drive_addresses.append(address)
-                if response == keyboard.DEVICE_TYPE: 
-                    self._keyboard_address = address
-            except Exception:
-                # Don't let any exceptions happen. Either due to the bus
-                # otherwise.
-                pass
+        if self._shards == 1:
+            self._probe_all(self._order)
+        else:
+            # Each shard probes an interleaved slice so the likely addresses
+            # are still probed first
+            workers = [
+                Thread(target=self._probe_all,
+                       args=(self._order[shard::self._shards],))
+                for shard in range(self._shards)]
+            for worker in workers: worker.start()
+            for worker in workers: worker.join()
+
+        self._drive_addresses.sort()
 
     def quit(self):
         """
@@ -44,10 +86,52 @@ class DeviceDiscovery(Thread):
         Raises:
             Exception: If the DeviceDiscovery is still working
         Returns:
-            tuple[list[int], int]: A list of drive addresses and the keyboard 
+            tuple[list[int], int]: A list of drive addresses and the keyboard
             address
         """
         if self.is_alive():
             raise Exception("DeviceDiscovery not finished")
-        
-        return (self._drive_addresses, self._keyboard_address)
\ No newline at end of file
+
+        return (self._drive_addresses, self._keyboard_address)
+
+    def get_scan_times(self) -> dict[int, float]:
+        """
+            Returns how long (in seconds) each probed address took to answer
+            (or fail). Slow addresses usually point to a bus issue.
+        Raises:
+            Exception: If the DeviceDiscovery is still working
+        Returns:
+            dict[int, float]: The scan time of each probed address
+        """
+        if self.is_alive():
+            raise Exception("DeviceDiscovery not finished")
+
+        return dict(self._scan_times)
+
+    def _probe_all(self, addresses:list[int]) -> None:
+        # Get the device type of each address, if the type is correct add it
+        # to the list/update the devices
+        for address in addresses:
+            if self._stop_event.is_set(): break
+            start = time.perf_counter()
+            try:
+                response = bus.read(address, DEVICE_TYPE_REG, 1)[0]
+            except Exception:
+                # Don't let any exceptions happen. Either due to the bus
+                # otherwise.
+                response = None
+
+            with self._lock:
+                self._scan_times[address] = time.perf_counter() - start
+                if response == drive.DEVICE_TYPE:
+                    self._drive_addresses.append(address)
+                if response == keyboard.DEVICE_TYPE:
+                    self._keyboard_address = address
+                if self._found_expected(): self._stop_event.set()
+
+    def _found_expected(self) -> bool:
+        # Have all the expected devices been found?
+        if self._expected_drives is None: return False
+        if self._expect_keyboard and self._keyboard_address is None:
+            return False
+        return len(self._drive_addresses) >= self._expected_drives
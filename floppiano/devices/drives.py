@@ -108,6 +108,17 @@ stored. Reading this register on a drive should always result in a value of
 
 #Constants
 DEVICE_TYPE = 69
+# The drive firmware's I2C address before it is changed (see firmware I2C_ADDR)
+DEFAULT_ADDRESS = 8
+
+# The drive firmware's timer constant. A drive sounds a frequency by setting its
+# timer TOP to round(ALPHA/frequency) (see firmware updateFreq())
+ALPHA = 2500000
+# The range of timer TOP values the firmware accepts. Frequencies outside of
+# this range are ignored by the drive (see firmware updateFreq())
+STEP_PULSE_WIDTH = 10
+MIN_TOP = STEP_PULSE_WIDTH + 1
+MAX_TOP = 65535
 
 CTRL_REG        = 0
 FREQ_REG        = 1
@@ -123,6 +134,10 @@ CTRL_EN_MASK   = 0b00010000
 CTRL_SPIN_MASK = 0b00100000 
 CTRL_BOW_MASK  = 0b01000000
 
+# CTRL register values that only set the enable bit
+CTRL_ENABLE  = CTRL_EN_MASK | (1 << CTRL_EN)
+CTRL_DISABLE = CTRL_EN_MASK
+
 class Drives():
     """
         A collection of functions to set/get values in a drive's registers
@@ -235,7 +250,7 @@ class Drives():
             Sets/sends the desired frequency (in Hz) of a drive. 
             Notes:
                 - If the desired frequency cannot be played by a drive it will
-                  be ignored. (See drive firmware)
+                  be ignored. (See drive firmware and playable())
                 - If the drive is not enabled the no sound will be produced but
                   the frequency will be set.
         Args:
@@ -244,16 +259,120 @@ class Drives():
         """
         
         Drives._check_address(address)
+        # write
+        bus.write(address, FREQ_REG, Drives.pack_frequency(frequency))
+
+    @staticmethod
+    def frequency_payload(address:int, payload:list[int]) -> None:
+        """
+            Sends an already packed frequency (see pack_frequency()) to a 
+            drive. Used to send precomputed frequencies without re-packing them.
+        Args:
+            address (int): The drive's I2C address
+            payload (list[int]): The four bytes of the packed frequency
+        """
+        Drives._check_address(address)
+        bus.write(address, FREQ_REG, payload)
+
+    @staticmethod
+    def play(addresses:tuple[int], payloads:list[list[int]]) -> bool:
+        """
+            Sends each drive its frequency then enables it, all in one bus
+            transaction. The addresses are NOT validated, they should have 
+            been checked (see _check_address()) beforehand.
+        Args:
+            addresses (tuple[int]): The drives' I2C addresses
+            payloads (list[list[int]]): The packed frequency of each drive (see
+                pack_frequency())
+
+        Returns:
+            bool: False if the writes were not all sent (see 
+                FaultTolerantBus.write_batch())
+        """
+        messages = []
+        for address, payload in zip(addresses, payloads):
+            messages.append((address, FREQ_REG, payload))
+            messages.append((address, CTRL_REG, [CTRL_ENABLE]))
+        return bus.write_batch(messages)
+
+    @staticmethod
+    def retune(addresses:tuple[int], payloads:list[list[int]]) -> bool:
+        """
+            Sends each drive its frequency, all in one bus transaction. The 
+            addresses are NOT validated, they should have been checked (see 
+            _check_address()) beforehand.
+        Args:
+            addresses (tuple[int]): The drives' I2C addresses
+            payloads (list[list[int]]): The packed frequency of each drive (see
+                pack_frequency())
+
+        Returns:
+            bool: False if the writes were not all sent (see 
+                FaultTolerantBus.write_batch())
+        """
+        return bus.write_batch([(address, FREQ_REG, payload) 
+                                for address, payload in zip(addresses, payloads)])
+
+    @staticmethod
+    def silence(addresses:tuple[int]) -> None:
+        """
+            Disables the drives, all in one bus transaction. The addresses are 
+            NOT validated, they should have been checked (see _check_address())
+            beforehand.
+        Args:
+            addresses (tuple[int]): The drives' I2C addresses
+        """
+        bus.write_batch([(address, CTRL_REG, [CTRL_DISABLE]) 
+                         for address in addresses])
 
+    @staticmethod
+    def pack_frequency(frequency:float) -> list[int]:
+        """
+            Converts a frequency (in Hz) into the bytes that a drive's 
+            frequency register expects.
+        Args:
+            frequency (float): The frequency
+
+        Returns:
+            list[int]: The four bytes of the frequency (as a float)
+        """
         #round the frequency so it's only 3 decimal places       
         frequency = round(float(frequency),3)
  
         # convert frequency into a bytearray   
         frequency = struct.pack('f', frequency)
         # byte array to a list - always four bytes
-        frequency = list(frequency)
-        # write
-        bus.write(address, FREQ_REG, frequency)
+        return list(frequency)
+
+    @staticmethod
+    def top(frequency:float) -> int:
+        """
+            Returns the timer TOP value a drive's firmware will use to sound
+            the given frequency. Frequencies with the same TOP sound identical 
+            on a drive, so there is no need to send a frequency if the TOP it
+            results in has not changed.
+        Args:
+            frequency (float): The frequency in Hz
+
+        Returns:
+            int: The drive timer TOP value for the frequency
+        """
+        return round(ALPHA / round(float(frequency), 3))
+
+    @staticmethod
+    def playable(frequency:float) -> bool:
+        """
+            Returns True if a drive's firmware will accept the given frequency.
+            A frequency that is not playable is ignored by a drive and the 
+            drive keeps sounding its last frequency.
+        Args:
+            frequency (float): The frequency in Hz
+
+        Returns:
+            bool: True if the frequency results in a valid timer TOP
+        """
+        if round(float(frequency), 3) <= 0: return False
+        return MIN_TOP <= Drives.top(frequency) <= MAX_TOP
 
     @staticmethod
     def modulation_rate(address:int, rate:int) -> None:
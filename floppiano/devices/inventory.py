@@ -0,0 +1,110 @@
+import os
+import json
+import floppiano.bus as bus
+import floppiano.devices.drives as drive
+import floppiano.devices.keyboards as keyboard
+from floppiano.devices import DEVICE_TYPE_REG
+
+"""
+                          Device Inventory File:
+
+A JSON object recording the devices found on the I2C bus the last time it was
+scanned, so that the next startup only has to check them.
+
+Ex.
+{
+    "bus_number": 22,
+    "drives": [8, 9, 10, 11],
+    "keyboard": 119
+}
+"""
+
+
+class DeviceInventory():
+    """
+        The drive and keyboard addresses found on an I2C bus
+    """
+
+    def __init__(
+        self,
+        bus_number:int,
+        drive_addresses:list[int],
+        keyboard_address:int = None) -> None:
+        """
+            Creates a DeviceInventory
+        Args:
+            bus_number (int): The I2C bus number the devices are on
+            drive_addresses (list[int]): The drives' I2C addresses
+            keyboard_address (int, optional): The keyboard's I2C address.
+                Defaults to None (no keyboard).
+        """
+        self.bus_number = bus_number
+        self.drive_addresses = list(drive_addresses)
+        self.keyboard_address = keyboard_address
+
+    @staticmethod
+    def load(file_path:str) -> 'DeviceInventory':
+        """
+            Loads a DeviceInventory from an inventory (JSON) file
+        Args:
+            file_path (str): The path to the inventory file
+
+        Raises:
+            ValueError: If the file's contents are not a valid inventory
+
+        Returns:
+            DeviceInventory: The loaded DeviceInventory
+        """
+        with open(file_path, encoding='utf8') as file:
+            inventory = json.load(file)
+        try:
+            keyboard_address = inventory.get('keyboard')
+            return DeviceInventory(
+                int(inventory['bus_number']),
+                [int(address) for address in inventory['drives']],
+                None if keyboard_address is None else int(keyboard_address))
+        except (AttributeError, KeyError, TypeError) as e:
+            raise ValueError(f'Invalid device inventory: {e}') from e
+
+    def save(self, file_path:str) -> None:
+        """
+            Saves the DeviceInventory to an inventory (JSON) file, creating its
+            directory if needed
+        Args:
+            file_path (str): The path to the inventory file
+        """
+        directory = os.path.dirname(file_path)
+        if directory != '': os.makedirs(directory, exist_ok=True)
+        with open(file_path, 'w', encoding='utf8') as file:
+            json.dump({
+                'bus_number': self.bus_number,
+                'drives': self.drive_addresses,
+                'keyboard': self.keyboard_address
+            }, file, indent=4)
+
+    def verify(self) -> bool:
+        """
+            Checks that every device in the inventory is still on the bus by
+            reading its device type (one read per device).
+        Returns:
+            bool: True if every device answered with the right device type
+        """
+        expected = {address: drive.DEVICE_TYPE
+                    for address in self.drive_addresses}
+        if self.keyboard_address is not None:
+            expected[self.keyboard_address] = keyboard.DEVICE_TYPE
+
+        for address, device_type in expected.items():
+            try:
+                if bus.read(address, DEVICE_TYPE_REG, 1)[0] != device_type:
+                    return False
+            except Exception:
+                # Missing devices or a bus issue, either way a scan is needed
+                return False
+        return True
+
+    def __eq__(self, other:object) -> bool:
+        if not isinstance(other, DeviceInventory): return False
+        return (self.bus_number == other.bus_number and
+                self.drive_addresses == other.drive_addresses and
+                self.keyboard_address == other.keyboard_address)
@@ -1,5 +1,8 @@
+import time
 from enum import IntEnum
 from abc import ABC, abstractmethod
+from collections import deque
+from threading import Thread, Event
 from mido import Message
 
 import floppiano.bus  as bus
@@ -60,6 +63,8 @@ stored. Reading this register on the keyboard should always result in a value of
 
 #Constants
 DEVICE_TYPE = 55
+# The keyboard firmware's I2C address (see firmware I2C_ADDR)
+DEFAULT_ADDRESS = 0x77
 CTRL_REG = 0
 INPUT_REG = 1
 
@@ -200,6 +205,108 @@ class KeyboardListener(ABC):
         """
         pass
 
+def _key_change_table(keys:tuple[Keys]) -> tuple[tuple[tuple[Keys, int]]]:
+    """
+        Generates the table of the keys changed by every changed bits byte of a
+        byte position
+    Args:
+        keys (tuple[Keys]): The keys of each bit of the byte position, MSB 
+            first (see Keyboard.KEY_BYTE_MAP)
+
+    Returns:
+        tuple[tuple[tuple[Keys, int]]]: For every changed bits byte [0-255], 
+            the (key, key mask) of each changed key
+    """
+    # A key's position in the byte map determines its mask
+    masks = tuple(
+        (key, 1 << (7 - key_index)) for key_index, key in enumerate(keys)
+        if key != Keys.UNUSED)
+    return tuple(
+        tuple((key, mask) for key, mask in masks if mask & changed_bits)
+        for changed_bits in range(256))
+
+class WheelFilter():
+    """
+        Filters the analog readings of a wheel (10 bit, [0-1023]) so that ADC
+        noise doesn't produce a stream of changes. Readings are smoothed, 
+        snapped to the wheel's rest position (deadband), only reported when
+        they move far enough from the last reported value (hysteresis), and 
+        reported at most once per min_interval.
+    """
+
+    def __init__(
+        self,
+        deadband:int = 0,
+        center:int = None,
+        hysteresis:int = 0,
+        smoothing:float = 1.0,
+        min_interval:float = 0.0) -> None:
+        """
+            Creates a WheelFilter. The defaults report every change.
+        Args:
+            deadband (int, optional): Readings this close to the center are 
+                reported as the center. Defaults to 0.
+            center (int, optional): The wheel's rest position. Defaults to None
+                (the wheel does not spring back).
+            hysteresis (int, optional): The least change from the last
+                reported value to report. The rest position and the ends of 
+                the wheel are always reported. Defaults to 0.
+            smoothing (float, optional): How much of each new reading is used,
+                (0-1] (exponential smoothing). Defaults to 1.0 (no smoothing).
+            min_interval (float, optional): The least time (in seconds) between 
+                reports. Defaults to 0.0.
+        Raises:
+            ValueError: If the smoothing is not in the range (0-1]
+        """
+        if smoothing <= 0 or smoothing > 1:
+            raise ValueError('smoothing must be (0-1]')
+        self.deadband = deadband
+        self.center = center
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self.min_interval = min_interval
+        # Number of changed readings that were not reported
+        self.suppressed = 0
+        self._value:float = None
+        self._raw:int = None
+        self._reported:int = None
+        self._report_time = 0.0
+
+    def update(self, raw:int, now:float) -> int:
+        """
+            Filters a reading. Should be called for every reading, even if it
+            has not changed, so that smoothed and rate limited values settle.
+        Args:
+            raw (int): The wheel reading
+            now (float): The time of the reading in seconds 
+                (time.perf_counter())
+
+        Returns:
+            int: The value to report or None if nothing should be reported
+        """
+        changed = raw != self._raw
+        self._raw = raw
+
+        if self._value is None or abs(raw - self._value) < 0.5:
+            self._value = raw
+        else:
+            self._value += self.smoothing * (raw - self._value)
+        value = round(self._value)
+        if self.center is not None and abs(value - self.center) <= self.deadband:
+            value = self.center
+
+        if (value == self._reported or 
+            (self._reported is not None and 
+             abs(value - self._reported) < self.hysteresis and
+             value not in (self.center, 0, 1023)) or
+            now - self._report_time < self.min_interval):
+            if changed: self.suppressed += 1
+            return None
+
+        self._reported = value
+        self._report_time = now
+        return value
+
 class Keyboard():
     """
          A class/object to read and write keyboard states (via I2C). Invokes
@@ -258,6 +365,9 @@ class Keyboard():
             Keys.UNUSED,
         )
     )
+    # The (key, key mask) of the keys changed by every changed bits byte, for
+    # each byte position
+    KEY_CHANGE_TABLES = tuple(_key_change_table(keys) for keys in KEY_BYTE_MAP)
 
     def __init__(
         self,
@@ -266,7 +376,9 @@ class Keyboard():
         mute_led:bool = False,
         octave_up_led:bool = False,
         octave_down_led:bool = False,
-        octave:int = 2) -> None:
+        octave:int = 2,
+        pitch_filter:WheelFilter = None,
+        mod_filter:WheelFilter = None) -> None:
         """
             Constructs a Keyboard object.
         Args:
@@ -281,9 +393,16 @@ class Keyboard():
             octave_down_led (bool, optional): The starting state of the octave 
                 up led. Defaults to False (off).
             octave (int, optional): The starting octave led. Defaults to 2.
+            pitch_filter (WheelFilter, optional): The filter for the pitch 
+                wheel readings. Defaults to None (report every change).
+            mod_filter (WheelFilter, optional): The filter for the modulation 
+                wheel readings. Defaults to None (report every change).
         """
 
         self.listener = listener
+        self.pitch_filter = \
+            WheelFilter() if pitch_filter is None else pitch_filter
+        self.mod_filter = WheelFilter() if mod_filter is None else mod_filter
         self.address = address
         self.mute_led = mute_led
         self.octave_up_led = octave_up_led
@@ -292,11 +411,14 @@ class Keyboard():
 
         # Array/List of the last read key states 
         self._last_state:list[int] = [0, 0, 0, 0, 0, 0, 0, 0, 0]
+        # The ctrl register value last written (None forces a write)
+        self._ctrl:int = None
 
     def update(self) -> None:
         """
-            Immediately writes all LED states to the Keyboard then reads all key
-            states from the keyboard. If a key state has changed since the last
+            Immediately writes all LED states to the Keyboard (only if they 
+            changed since they were last written) then reads all key states 
+            from the keyboard. If a key state has changed since the last
             update() call, the appropriate call back in the KeyboardListener 
             will be invoked.
         """
@@ -305,7 +427,11 @@ class Keyboard():
         ctrl = ctrl | (self.octave_down_led << 4)
         ctrl = ctrl | (self.mute_led << 3)
         ctrl = ctrl | self.octave
-        bus.write(self.address, CTRL_REG, [ctrl])
+        if ctrl != self._ctrl:
+            # Only remember writes that were sent, a dropped one is retried
+            # (a FaultTolerantBus returns False, the other buses raise)
+            if bus.write(self.address, CTRL_REG, [ctrl]) is not False:
+                self._ctrl = ctrl
 
         # Update the ctrl register and read the states from the nano
         new_state = bus.read(self.address, INPUT_REG, 9)
@@ -321,54 +447,58 @@ class Keyboard():
         if (self._last_state[0:5] != new_key_states):
             self._key(new_key_states)
         
-        #Has the pitch wheel changed?
-        if (self._last_state[5:7] != new_pitch_states):
-            self._pitch(new_pitch_states)
-
-        #Has the mod wheel changed?
-        if (self._last_state[7:] != new_mod_states):
-            self._mod(new_mod_states)
+        # The wheels are filtered every update so that they settle
+        now = time.perf_counter()
+        self._pitch(new_pitch_states, now)
+        self._mod(new_mod_states, now)
         
         #update the last state
         self._last_state = new_state
 
+    def invalidate(self) -> None:
+        """
+            Forces the LED states to be written on the next update() call. (ex.
+            after the keyboard restarted)
+        """
+        self._ctrl = None
+
     def _key(self, new_key_states:list[int]) -> None:
         #loop through each byte in the new key states(item in list)
         for byte_index, bite in enumerate(new_key_states):
             #XORing with the old state gives us only the bits which have
             #changed since the last state
             changed_bits = bite ^ self._last_state[byte_index]
+            if changed_bits == 0: continue
 
-            #Using the key byte map we can figure out which key was changed
+            #Using the key change tables we can look up which keys were changed
             #then update the listener to that change
-            for key_index, key in enumerate(Keyboard.KEY_BYTE_MAP[byte_index]):
-                #A key's position in the key byte map determines its mask 
-                key_mask = 2 ** abs(7 - key_index)
-                #The key at key_index was changed
-                if (key_mask & changed_bits):
-                    #Was the key pressed or released? 
-                    # pressed = True if the change was a press,
-                    # pressed = False if the change was a release
-                    pressed = bool(key_mask & bite) 
-                    #Now tell the listener what happened
-                    if (self.listener is not None):
-                        self.listener._key_changed(key, pressed)
+            for key, key_mask in \
+                Keyboard.KEY_CHANGE_TABLES[byte_index][changed_bits]:
+                #Was the key pressed or released? 
+                # pressed = True if the change was a press,
+                # pressed = False if the change was a release
+                pressed = bool(key_mask & bite) 
+                #Now tell the listener what happened
+                if (self.listener is not None):
+                    self.listener._key_changed(key, pressed)
                 
-    def _pitch(self, new_pitch_states:list[int]) -> None:
+    def _pitch(self, new_pitch_states:list[int], now:float) -> None:
         # combine the pitch Upper and lower bytes
         pitch = (new_pitch_states[0] << 8 ) | new_pitch_states[1]
+        pitch = self.pitch_filter.update(pitch, now)
         #update the listener
-        if self.listener is not None:
+        if pitch is not None and self.listener is not None:
             self.listener._pitch_spin(pitch)
         
-    def _mod(self, new_mod_states:list[int]) -> None:
+    def _mod(self, new_mod_states:list[int], now:float) -> None:
         # combine the modulation upper and lower bytes
         mod = (new_mod_states[0] << 8) | new_mod_states[1]
         
         # TODO Mod analog read int-wraps when in lowest wheel position
         if mod > 1023: mod = 0
 
-        if self.listener is not None:
+        mod = self.mod_filter.update(mod, now)
+        if mod is not None and self.listener is not None:
             self.listener._modulation_spin(mod)
 
     @property 
@@ -389,7 +519,12 @@ class MIDIKeyboard(KeyboardListener):
     #The intended starting MIDI note (KEY_1) of the keyboard
     START_NOTE = 11
     
-    def __init__(self, address:int=119, synth:Synth = None) -> None:
+    def __init__(
+        self, 
+        address:int=119, 
+        synth:Synth = None,
+        pitch_filter:WheelFilter = None,
+        mod_filter:WheelFilter = None) -> None:
         """
             Construct a MIDIKeyboard. If synth is not specified MIDI will
             be generated on MIDI Channel 0.
@@ -401,7 +536,26 @@ class MIDIKeyboard(KeyboardListener):
                 always match the mute state and input channel of the synth. 
                 (via synth property observer). Additionally, the MIDIKeyboard
                 will generate MIDI messages that match the synth's command maps.
+            pitch_filter (WheelFilter, optional): The filter for the pitch 
+                wheel readings. Defaults to None (ignore ADC noise, at most 100
+                pitch wheel messages per second).
+            mod_filter (WheelFilter, optional): The filter for the modulation 
+                wheel readings. Defaults to None (ignore ADC noise, at most 100
+                modulation messages per second).
         """
+        if pitch_filter is None:
+            pitch_filter = WheelFilter(
+                deadband = 2,
+                center = 511, # The firmware's middle value on the pitch wheel
+                hysteresis = 2,
+                smoothing = 0.5,
+                min_interval = 0.01)
+        if mod_filter is None:
+            # One modulation step is ~8 counts
+            mod_filter = WheelFilter(
+                hysteresis = 4, 
+                smoothing = 0.5, 
+                min_interval = 0.01)
         
         if synth is None:
             # Set defaults
@@ -433,7 +587,9 @@ class MIDIKeyboard(KeyboardListener):
             mute_led = self._muted,
             octave_up_led = True,
             octave_down_led = True,
-            octave=2)
+            octave=2,
+            pitch_filter = pitch_filter,
+            mod_filter = mod_filter)
         # Update once to initialize the LEDs
         self._keyboard.update()
         # Set the keyboard's listener to self (after update so that update does
@@ -443,7 +599,7 @@ class MIDIKeyboard(KeyboardListener):
         # A list of all the MIDI messages created on an update() call
         self._output:list[Message] = []
 
-        self._last_pitch = 510 # The Nominal middle value on the pitch wheel
+        self._last_pitch = 511 # The firmware's middle value on the pitch wheel
 
     def update(self) -> list[Message]:
         """
@@ -464,6 +620,31 @@ class MIDIKeyboard(KeyboardListener):
 
         return output_buffer
 
+    def invalidate(self) -> None:
+        """
+            Forces the Keyboard's LED states to be written on the next update()
+            call. (ex. after the keyboard restarted)
+        """
+        self._keyboard.invalidate()
+
+    @property
+    def address(self) -> int:
+        """
+            The I2C address of the Keyboard
+        """
+        return self._keyboard.address
+
+    @property
+    def suppressed(self) -> dict[str, int]:
+        """
+            The number of wheel readings that were filtered out (see 
+            WheelFilter), by wheel ('pitch', 'modulation')
+        """
+        return {
+            'pitch': self._keyboard.pitch_filter.suppressed,
+            'modulation': self._keyboard.mod_filter.suppressed
+        }
+
     def _mute(self, muted:bool):
         # Force the Mute LED and mute property to match muted param.
         # This method will be called by the synth (if set) when it's mute
@@ -554,6 +735,8 @@ class MIDIKeyboard(KeyboardListener):
             )
     
     def _pitch_spin(self, pitch: int) -> None:
+        # A wheel at rest never bends (whatever its filter's center maps to)
+        at_rest = pitch == self._keyboard.pitch_filter.center
         # map the pitch to a valid midi pitch range
         # from arduino analog read (10 bit) range
         pitch = MIDIUtil.integer_map_range(
@@ -566,7 +749,7 @@ class MIDIKeyboard(KeyboardListener):
 
         # Enforce the wheel dead zone (It's done in firmware but it's done here
         # to ensure that the dead zone sticks if the potentiometer drifts)
-        if pitch>= -10 and pitch<= 10:
+        if at_rest or (pitch>= -10 and pitch<= 10):
             pitch  = 0
          
         self._output.append(Message(
@@ -591,4 +774,106 @@ class MIDIKeyboard(KeyboardListener):
             control = self._modulation_cc,
             value = mod,
             channel = self._channel
-        ))
\ No newline at end of file
+        ))
+
+class KeyboardScanner(Thread):
+    """
+        A Thread that polls a MIDIKeyboard at a fixed rate so that key latency
+        does not depend on the main loop. The produced MIDI messages are 
+        timestamped (Message.time is the time.perf_counter() time of the scan
+        that found the change) and queued for the main loop. Scans are
+        skipped while paused (ex. the keyboard is offline).
+    """
+
+    def __init__(self, keyboard:MIDIKeyboard, scan_rate:int = 500) -> None:
+        """
+            Creates a KeyboardScanner
+        Args:
+            keyboard (MIDIKeyboard): The MIDIKeyboard to poll
+            scan_rate (int, optional): The number of scans per second. Defaults
+                to 500.
+        Raises:
+            ValueError: If the scan_rate is not positive
+        """
+        Thread.__init__(self, daemon=True)
+        if scan_rate <= 0:
+            raise ValueError('scan_rate must be positive')
+
+        self._keyboard = keyboard
+        self._period = 1 / scan_rate
+        self._stop_event = Event()
+        # Appending/popping from either end of a deque is thread safe
+        self._messages:deque[Message] = deque()
+        # Skip the scans? (Set from another thread, read once per scan)
+        self.paused = False
+
+        self.scans = 0 # Number of scans made
+        self.missed = 0 # Number of scan deadlines missed
+        self.errors = 0 # Number of scans that failed (bus errors)
+        self._rate_start = None # Start of the current scan rate window
+        self._rate_scans = 0 # Scans in the current scan rate window
+        self._scan_rate = 0.0 # The achieved scan rate of the last window
+
+    def run(self) -> None:
+        deadline = time.perf_counter()
+        self._rate_start = deadline
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            if not self.paused:
+                try:
+                    for msg in self._keyboard.update():
+                        msg.time = now
+                        self._messages.append(msg)
+                except Exception:
+                    # Bus errors are handled by the bus (see 
+                    # FaultTolerantBus), keep scanning
+                    self.errors += 1
+                self.scans += 1
+                self._count_rate(now)
+            else:
+                # Measure the rate from when the scans start again
+                self._rate_start = now
+                self._rate_scans = 0
+
+            deadline += self._period
+            now = time.perf_counter()
+            if now > deadline:
+                # Late, skip the missed deadlines rather than bursting scans
+                missed = int((now - deadline) / self._period) + 1
+                self.missed += missed
+                deadline += missed * self._period
+            self._stop_event.wait(deadline - now)
+
+    def quit(self) -> None:
+        """
+            Sets the stop event to halt the KeyboardScanner
+        """
+        self._stop_event.set()
+
+    def get_messages(self) -> list[Message]:
+        """
+            Returns (without blocking) the MIDI messages produced since the last
+            call, oldest first. Meant to be called from the main loop.
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self._messages.popleft())
+            except IndexError:
+                return messages
+
+    @property
+    def scan_rate(self) -> float:
+        """
+            The achieved number of scans per second (measured every second)
+        """
+        return self._scan_rate
+
+    def _count_rate(self, now:float) -> None:
+        # Measure the achieved scan rate over one second windows
+        self._rate_scans += 1
+        elapsed = now - self._rate_start
+        if elapsed >= 1:
+            self._scan_rate = self._rate_scans / elapsed
+            self._rate_scans = 0
+            self._rate_start = now
@@ -0,0 +1,131 @@
+import time
+from queue import SimpleQueue, Empty
+from threading import Thread, Event
+import floppiano.bus as bus
+import floppiano.devices.drives as drive
+import floppiano.devices.keyboards as keyboard
+from floppiano.devices import DEVICE_TYPE_REG
+
+
+class DeviceMonitor(Thread):
+    """
+        A Thread that slowly probes known devices on the I2C bus to find ones
+        that stopped answering (ex. browned out or reseated) and ones that came
+        back. Probes are limited by a token bucket so they only take a small,
+        fixed share of the bus.
+    """
+
+    def __init__(
+        self,
+        drive_addresses:list[int],
+        keyboard_address:int = None,
+        probe_rate:float = 4,
+        burst:int = 2,
+        failures:int = 2) -> None:
+        """
+            Creates a DeviceMonitor
+        Args:
+            drive_addresses (list[int]): The drives' I2C addresses to monitor
+            keyboard_address (int, optional): The keyboard's I2C address to
+                monitor. Defaults to None (no keyboard).
+            probe_rate (float, optional): The maximum number of probes (bus
+                reads) per second. Defaults to 4.
+            burst (int, optional): The maximum number of probes that can be
+                made back-to-back after an idle period. Defaults to 2.
+            failures (int, optional): The number of failed probes in a row
+                before a device is considered lost. Defaults to 2.
+        Raises:
+            ValueError: If probe_rate, burst or failures is not positive
+        """
+        Thread.__init__(self, daemon=True)
+        if probe_rate <= 0 or burst < 1 or failures < 1:
+            raise ValueError('probe_rate, burst and failures must be positive')
+
+        self._stop_event = Event()
+        self._changes = SimpleQueue()
+
+        # The device type each address should answer with
+        self._expected = {address: drive.DEVICE_TYPE
+                          for address in drive_addresses}
+        if keyboard_address is not None:
+            self._expected[keyboard_address] = keyboard.DEVICE_TYPE
+        self.keyboard_address = keyboard_address
+
+        self._probe_rate = probe_rate
+        self._burst = burst
+        self._failures = failures
+        # The number of failed probes in a row of each address
+        self._failed = {address: 0 for address in self._expected}
+        self._alive = {address: True for address in self._expected}
+        self.probes = 0
+
+    def run(self) -> None:
+        addresses = list(self._expected)
+        if len(addresses) == 0: return
+
+        tokens = self._burst
+        last_time = time.perf_counter()
+        index = 0
+        while not self._stop_event.is_set():
+            # Refill the bucket, wait if there is no token to probe with
+            now = time.perf_counter()
+            tokens = min(
+                self._burst, tokens + (now - last_time) * self._probe_rate)
+            last_time = now
+            if tokens < 1:
+                self._stop_event.wait((1 - tokens) / self._probe_rate)
+                continue
+            tokens -= 1
+
+            self._probe(addresses[index])
+            index = (index + 1) % len(addresses)
+
+    def quit(self) -> None:
+        """
+            Sets the stop event to halt the DeviceMonitor
+        """
+        self._stop_event.set()
+
+    def alive(self, address:int) -> bool:
+        """
+            Returns True if the device at the address is answering probes
+        Args:
+            address (int): The device's I2C address
+        """
+        return self._alive.get(address, False)
+
+    def get_changes(self) -> list[tuple[int, bool]]:
+        """
+            Returns (without blocking) the devices that were lost or came back
+            since the last call. Meant to be called from the main loop.
+        Returns:
+            list[tuple[int, bool]]: The I2C address of each device and whether
+                it is alive, in the order they changed
+        """
+        changes = []
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except Empty:
+                return changes
+
+    def _probe(self, address:int) -> None:
+        # Read the device type and track the address's liveness
+        try:
+            answered = (bus.read(address, DEVICE_TYPE_REG, 1)[0] ==
+                        self._expected[address])
+        except Exception:
+            answered = False
+        self.probes += 1
+
+        if answered:
+            self._failed[address] = 0
+            if not self._alive[address]:
+                self._alive[address] = True
+                self._changes.put((address, True))
+        else:
+            self._failed[address] += 1
+            if self._alive[address] and \
+                self._failed[address] >= self._failures:
+                self._alive[address] = False
+                self._changes.put((address, False))
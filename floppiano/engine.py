@@ -0,0 +1,568 @@
+import floppiano.bus as bus
+from floppiano.synths import DriveSynth, SynthRouter
+from floppiano.devices import MIDIKeyboard, KeyboardScanner, DeviceMonitor
+from floppiano.midi import MIDIPlayer
+from floppiano.reduction import VoiceReducer
+import floppiano.metrics as metrics
+
+from mido import Message
+from mido.ports import BaseInput, BaseOutput
+
+import time
+import logging
+from itertools import count
+from queue import SimpleQueue, Empty
+from threading import Thread, Event
+from typing import Any, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Optional features, imported by whoever uses them
+    from floppiano.tracing import LatencyTracer
+    from floppiano.cluster import ClusterLink
+
+# The state of each object that is copied into an Engine snapshot
+ENGINE_STATE = ('loopback',)
+SYNTH_STATE = (
+    'input_channel', 'output_channel', 'output_mode', 'pitch_bend_range',
+    'modulation_wave', 'modulation_rate', 'modulation', 'polyphonic',
+    'mono_voices', 'poly_voices', 'bow', 'spin', 'glide', 'range_policy',
+    'muted', 'offline_drives', 'active_voices', 'available_voices',
+    'playable_notes'
+)
+MIDI_PLAYER_STATE = (
+    'playing', 'file_path', 'last_file_path', 'playlist', 'shuffle', 'repeat')
+
+# The sources of MIDI that the synth counts range stats for
+SOURCES = ('keyboard', 'midi_player', 'input_port', 'cluster')
+
+# The messages that are traced (they end in bus writes)
+TRACED_TYPES = ('note_on', 'note_off')
+
+
+class Engine():
+    """
+        The FlopPiano's MIDI pipeline without any UI. Moves MIDI from the
+        keyboard, the MIDIPlayer, the input port and the node before (see
+        ClusterLink) through the synth to the output port (or the next node),
+        and keeps the synth's drives in step with the bus.
+    """
+
+    def __init__(
+            self,
+            synth:DriveSynth,
+            keyboard:MIDIKeyboard = None,
+            input_port:BaseInput = None,
+            output_port:BaseOutput = None,
+            monitor:DeviceMonitor = None,
+            fault_bus:bus.FaultTolerantBus = None,
+            scan_rate:int = None,
+            tracer:'LatencyTracer' = None,
+            trace_file:str = None,
+            reduction_cache:str = None,
+            cluster:'ClusterLink' = None) -> None:
+        """
+            Creates an Engine
+        Args:
+            synth (DriveSynth): The DriveSynth to sound all music on floppy
+                drives (or a SynthRouter to split the drives across MIDI
+                channels)
+            keyboard (MIDIKeyboard, optional): The MIDIKeyboard to generate
+                notes. Defaults to None.
+            input_port (BaseInput, optional): The MIDI input. Defaults to None.
+            output_port (BaseOutput, optional): The MIDI output. Defaults to
+                None.
+            monitor (DeviceMonitor, optional): Finds lost and recovered devices.
+                Defaults to None.
+            fault_bus (bus.FaultTolerantBus, optional): The bus that stops using
+                devices that keep failing. Defaults to None.
+            scan_rate (int, optional): The number of keyboard scans per second
+                on a KeyboardScanner thread. Defaults to None (scan on every
+                update() call).
+            tracer (LatencyTracer, optional): Traces the latency of notes from
+                their arrival to their bus writes. Defaults to None (no
+                tracing).
+            trace_file (str, optional): The file to save the tracer's Chrome
+                trace to when the Engine stops. Defaults to None.
+            reduction_cache (str, optional): The file to cache the MIDIPlayer's
+                voice reductions in (see VoiceReducer). Defaults to None (no
+                cache).
+            cluster (ClusterLink, optional): Receives the MIDI the node before
+                rolled over and sends the synth's output to the next node
+                (instead of the output port). Defaults to None (not in a
+                cluster).
+        """
+        self.logger = logging.getLogger(__name__)
+        self._synth = synth
+        self._keyboard = keyboard
+        self._input_port = input_port
+        self._output_port = output_port
+        self._monitor = monitor
+        self._fault_bus = fault_bus
+        # Polls the keyboard at a fixed rate (None polls on update())
+        self._scanner = None
+        if keyboard is not None and scan_rate is not None:
+            self._scanner = KeyboardScanner(keyboard, scan_rate)
+        self._tracer = tracer
+        self._trace_file = trace_file
+        self._cluster = cluster
+        # Why each device is offline ('monitor', 'breaker'), by address
+        self._offline:dict[int, set[str]] = {}
+        # Allow the piano keys' midi to be injected?
+        self.loopback = True
+        # A Non-blocking MIDIPlayer
+        self._reducer = VoiceReducer(reduction_cache)
+        self._midi_player = MIDIPlayer(
+            on_stop=self._midi_player_stopped, reducer=self._reducer)
+        # Read by whoever watches the metrics (see floppiano.metrics)
+        metrics.registry.gauge(
+            'synth.active_voices', lambda: synth.active_voices)
+        metrics.registry.gauge(
+            'synth.available_voices', lambda: synth.available_voices)
+
+    def start(self) -> None:
+        """
+            Starts the background threads (device monitor, keyboard scanner)
+            and opens the cluster link
+
+        Raises:
+            OSError: If the cluster link's port can not be used
+        """
+        if self._cluster is not None: self._cluster.open()
+        # Watch for lost/recovered devices in the background
+        if self._monitor is not None: self._monitor.start()
+        # Poll the keyboard in the background
+        if self._scanner is not None: self._scanner.start()
+
+    def stop(self) -> None:
+        """
+            Stops the background threads, closes the cluster link and the MIDI
+            ports, logs their statistics and saves the MIDIPlayer's voice
+            reductions
+        """
+        if self._monitor is not None: self._monitor.quit()
+        if self._scanner is not None:
+            self._scanner.quit()
+            self.logger.info(
+                f'Keyboard scanner: {self._scanner.scans} scans at '
+                f'{self._scanner.scan_rate:.0f}/s, '
+                f'{self._scanner.missed} missed deadlines, '
+                f'{self._scanner.errors} errors')
+        if self._keyboard is not None:
+            suppressed = self._keyboard.suppressed
+            self.logger.info(
+                f"Keyboard wheels: {suppressed['pitch']} pitch and "
+                f"{suppressed['modulation']} modulation readings "
+                'suppressed')
+        if self._cluster is not None:
+            self._cluster.close()
+            self.logger.info(
+                f'Cluster: {self._cluster.received} messages received, '
+                f'{self._cluster.sent} sent, {self._cluster.errors} errors')
+        for port in (self._input_port, self._output_port):
+            if port is not None: port.close()
+        if self._tracer is not None:
+            for line in self._tracer.report():
+                self.logger.info(f'Latency {line}')
+            if self._trace_file is not None:
+                try:
+                    self._tracer.save_trace(self._trace_file)
+                except OSError as e:
+                    self.logger.error(f'Could not save the trace: {e}')
+        self._reducer.save()
+
+    def update(self) -> None:
+        """
+            Should be called regularly (as often as possible). Moves all pending
+            MIDI through the synth and sends the synth's continuous updates.
+
+        Raises:
+            RuntimeError: If a MIDI port closed
+        """
+        metrics.registry.count('engine.loops')
+        # Any output from the synth goes in this list, with the arrival time
+        # and hops of the message it came from (see _parse())
+        outgoing:list[tuple[Message, float, int]] = []
+
+        # Take lost drives out of the synth, put recovered ones back
+        if self._monitor is not None:
+            self._apply_device_changes(self._monitor.get_changes(), 'monitor')
+        if self._fault_bus is not None:
+            self._fault_bus.update()
+            self._apply_device_changes(
+                self._fault_bus.get_changes(), 'breaker')
+
+        # Let the synth handle the MIDIKeyboard messages
+        if self._scanner is not None:
+            # Always drain the scanned messages so they don't pile up
+            keyboard_msgs = self._scanner.get_messages()
+            if self.loopback and keyboard_msgs:
+                # Arrived at the scan that found them (see KeyboardScanner)
+                outgoing.extend(self._parse(keyboard_msgs, 'keyboard'))
+        elif (self.loopback and self._keyboard is not None and
+            self._keyboard.address not in self._offline):
+            try:
+                arrival = time.perf_counter()
+                outgoing.extend(self._parse(
+                    self._keyboard.update(), 'keyboard', arrival))
+            except bus.BusException as be:
+                # A failing keyboard is taken offline by the breaker,
+                # keep playing everything else
+                self.logger.debug(f'Keyboard update failed: {be}')
+
+        # If playing a .mid, let the synth handle the messages
+        if self._midi_player.playing:
+            arrival = time.perf_counter()
+            msg = self._midi_player.update()
+            if msg is not None:
+                outgoing.extend(self._parse([msg], "midi_player", arrival))
+
+        # Handle any incoming MIDI from the input port
+        if self._input_port is not None:
+            #Get the messages from the input port
+            if(not self._input_port.closed):
+                arrival = time.perf_counter()
+                input_msg = self._input_port.receive(block=False)
+                # Don't let the input message be a clock,
+                # it slows down everything because they are so frequent
+                if input_msg is not None and input_msg.type!='clock':
+                    # If we have a message parse it
+                    outgoing.extend(
+                        self._parse([input_msg], "input_port", arrival))
+            else: raise RuntimeError("The MIDI input port closed!")
+
+        # Handle the MIDI the node before rolled over
+        if self._cluster is not None:
+            for msg, arrival, hops in self._cluster.receive():
+                # (Arrived when it arrived at the first node)
+                outgoing.extend(
+                    self._parse([msg], 'cluster', arrival, hops))
+            # The next node plays what the synth could not
+            if self._cluster.next_node is not None:
+                outgoing = self._cluster.send(outgoing)
+
+        # write the output
+        if self._output_port is not None:
+            if (not self._output_port.closed):
+                for msg, _, _ in outgoing:
+                    self._output_port.send(msg)
+            else: raise RuntimeError("The MIDI output port closed!")
+
+        # Let the synth send any continuous updates (ex. modulation)
+        self._synth.update()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """
+            Returns a copy of the engine, synth and MIDIPlayer state (see
+            ENGINE_STATE, SYNTH_STATE and MIDI_PLAYER_STATE) that is safe to
+            read from another thread
+        """
+        synth = {name: getattr(self._synth, name) for name in SYNTH_STATE}
+        synth['range_stats'] = {
+            source: self._synth.range_stats(source) for source in SOURCES}
+        return {
+            'engine': {name: getattr(self, name) for name in ENGINE_STATE},
+            'synth': synth,
+            'midi_player': {name: getattr(self._midi_player, name)
+                            for name in MIDI_PLAYER_STATE}
+        }
+
+    @property
+    def synth(self) -> DriveSynth:
+        return self._synth
+
+    @property
+    def tracer(self) -> 'LatencyTracer':
+        return self._tracer
+
+    @property
+    def cluster(self) -> 'ClusterLink':
+        return self._cluster
+
+    @property
+    def keyboard(self) -> MIDIKeyboard:
+        return self._keyboard
+
+    @property
+    def midi_player(self) -> MIDIPlayer:
+        return self._midi_player
+
+    def _apply_device_changes(self, changes:list[tuple[int, bool]], reason:str):
+        # A device is online only if nothing says it is offline
+        for address, alive in changes:
+            reasons = self._offline.setdefault(address, set())
+            if alive:
+                reasons.discard(reason)
+            else:
+                reasons.add(reason)
+            if len(reasons) > 0: continue
+            self._offline.pop(address)
+
+        for address, alive in changes:
+            online = address not in self._offline
+            if self._keyboard is not None and address == self._keyboard.address:
+                self.logger.info(
+                    f"Keyboard {'online' if online else 'offline'}")
+                # Offline devices are not polled
+                if self._scanner is not None: self._scanner.paused = not online
+                # The keyboard may have restarted, resend its LED states
+                if online: self._keyboard.invalidate()
+            else:
+                self._synth.set_drive_online(address, online)
+
+    def _parse(
+            self,
+            messages:list[Message],
+            source:str,
+            arrival:float = None,
+            hops:int = 0) -> list[tuple[Message, float, int]]:
+        # Let the synth handle the messages, tracing them if needed. Without an
+        # arrival time, each message's time is its arrival time. Returns the
+        # synth's output with the arrival time and hops (times forwarded by
+        # the cluster) of the message it came from
+        metrics.registry.count(f'messages.{source}', len(messages))
+        if self._tracer is None:
+            outgoing = self._synth.parse(messages, source)
+            if len(outgoing) == 0: return []
+            if arrival is not None:
+                return [(msg, arrival, hops) for msg in outgoing]
+            # The synth passes along the messages it does not play (the same
+            # objects), anything else arrived now
+            arrivals = {id(msg): msg.time for msg in messages}
+            now = time.perf_counter()
+            return [(msg, arrivals.get(id(msg), now), hops)
+                    for msg in outgoing]
+
+        outgoing = []
+        for msg in messages:
+            # One at a time, so each message's bus writes can be timed
+            start = time.perf_counter()
+            msg_arrival = msg.time if arrival is None else arrival
+            outgoing.extend(
+                (out, msg_arrival, hops)
+                for out in self._synth.parse([msg], source))
+            if msg.type in TRACED_TYPES:
+                self._tracer.record(
+                    source,
+                    f'{msg.type} {msg.note}',
+                    msg_arrival,
+                    start,
+                    time.perf_counter())
+        return outgoing
+
+    def _midi_player_stopped(self):
+        # Report the notes of the file that the drives could not play as asked
+        stats = self._synth.range_stats('midi_player')
+        self._synth.clear_range_stats('midi_player')
+        self.logger.info(
+            f"Played '{self._midi_player.last_file_path}': "
+            f"{stats['unplayable']} unplayable, {stats['folded']} folded, "
+            f"{stats['rerouted']} rerouted notes")
+        self._synth.reset()
+        if self._cluster is not None:
+            # The next nodes may be playing the file's rolled notes, reset
+            # them too (they pass the reset along)
+            synths = self._synth.synths \
+                if isinstance(self._synth, SynthRouter) else [self._synth]
+            now = time.perf_counter()
+            self._cluster.send([(Message(
+                'control_change',
+                channel = synth.output_channel,
+                control = synth.control_change_map.code('reset'),
+                value = 0), now, 0) for synth in synths])
+
+
+class EngineThread(Thread):
+    """
+        A Thread that runs an Engine (see Engine.update()) so that the MIDI
+        pipeline does not wait on anything else, ex. drawing the UI. Other
+        threads must not touch the engine's objects, they queue commands to
+        run on the EngineThread (see call()) and read the state from
+        snapshots (see snapshot). A failing command is logged and reported in
+        the snapshots, the engine keeps running.
+    """
+
+    def __init__(self, engine:Engine, snapshot_rate:int = 20) -> None:
+        """
+            Creates an EngineThread
+        Args:
+            engine (Engine): The Engine to run
+            snapshot_rate (int, optional): The number of snapshots taken per
+                second (one is also taken after any commands run). Defaults
+                to 20.
+        Raises:
+            ValueError: If the snapshot_rate is not positive
+        """
+        Thread.__init__(self, daemon=True)
+        if snapshot_rate <= 0:
+            raise ValueError('snapshot_rate must be positive')
+
+        self.logger = logging.getLogger(__name__)
+        self._engine = engine
+        self._period = 1 / snapshot_rate
+        self._stop_event = Event()
+        self._commands = SimpleQueue()
+        # Numbers the commands, a snapshot has the number of the last one run
+        self._sequence = count(1)
+        # The last command that failed: its 'sequence' number and 'error'
+        self._command_error:dict[str, Any] = None
+        self._snapshot = dict(
+            engine.snapshot(), sequence = 0, command_error = None)
+        # The exception that stopped the engine
+        self.error:Exception = None
+        self.loops = 0
+
+    def run(self) -> None:
+        self._engine.start()
+        try:
+            next_snapshot = time.perf_counter() + self._period
+            while not self._stop_event.is_set():
+                sequence = self._run_commands()
+                self._engine.update()
+                self.loops += 1
+
+                now = time.perf_counter()
+                if sequence is not None or now >= next_snapshot:
+                    if sequence is None: sequence = self._snapshot['sequence']
+                    # Replaced (never changed) so readers get a whole snapshot
+                    self._snapshot = dict(
+                        self._engine.snapshot(), 
+                        sequence = sequence,
+                        command_error = self._command_error)
+                    next_snapshot = now + self._period
+        except Exception as e:
+            # Handed to the UI to show (see error)
+            self.logger.exception('Engine error')
+            self.error = e
+        finally:
+            self._engine.stop()
+
+    def quit(self) -> None:
+        """
+            Sets the stop event to halt the EngineThread
+        """
+        self._stop_event.set()
+
+    def call(self, function:Callable, *args, **kwargs) -> int:
+        """
+            Queues a function to be called on the EngineThread between
+            Engine.update() calls. Its return value is discarded and an
+            exception is reported in the snapshots (see snapshot).
+        Args:
+            function (Callable): The function to call
+        Returns:
+            int: The command's sequence number, snapshots taken after the
+                command ran have a 'sequence' at least this large
+        """
+        sequence = next(self._sequence)
+        self._commands.put((sequence, function, args, kwargs))
+        return sequence
+
+    @property
+    def snapshot(self) -> dict[str, Any]:
+        """
+            The latest (read-only) snapshot of the engine's state (see
+            Engine.snapshot()), the 'sequence' number of the last command
+            that ran before it was taken and the last 'command_error' (the
+            'sequence' number and 'error' of the last command that failed, None
+            if none did)
+        """
+        return self._snapshot
+
+    def _run_commands(self) -> int:
+        # Run all queued commands, returns the last sequence number or None
+        sequence = None
+        while True:
+            try:
+                sequence, function, args, kwargs = self._commands.get_nowait()
+            except Empty:
+                return sequence
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                # Ex. a play() queued from a stale snapshot while something
+                # already plays, or a file that can't be read. Not worth
+                # stopping the engine for.
+                name = getattr(function, '__name__', repr(function))
+                self.logger.exception(f"Command '{name}' failed")
+                self._command_error = {
+                    'sequence': sequence, 'error': f'{name}: {e}'}
+
+
+class EngineProxy():
+    """
+        Stands in for an object that an EngineThread owns (ex. the synth).
+        Attributes are read from the EngineThread's snapshots, setting an
+        attribute or calling a method is queued to run on the EngineThread.
+        Method calls always return None.
+    """
+
+    def __init__(self, thread:EngineThread, target:Any, name:str) -> None:
+        """
+            Creates an EngineProxy
+        Args:
+            thread (EngineThread): The EngineThread that owns the target
+            target (Any): The object to stand in for
+            name (str): The name of the target's state in the snapshots (ex.
+                'synth')
+        """
+        object.__setattr__(self, '_thread', thread)
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_name', name)
+        # The values set but not yet in a snapshot, by attribute name
+        object.__setattr__(self, '_pending', {})
+
+    def __getattr__(self, name:str) -> Any:
+        snapshot = self._thread.snapshot
+        state = snapshot[self._name]
+        key = self._key(name, state)
+        if key in self._pending:
+            sequence, value = self._pending[key]
+            # Show the set value until a snapshot has it
+            if sequence > snapshot['sequence']: return value
+            del self._pending[key]
+        if key in state: return state[key]
+
+        attribute = getattr(self._target, name)
+        if callable(attribute):
+            def queued(*args, **kwargs) -> None:
+                self._thread.call(attribute, *args, **kwargs)
+            return queued
+        raise AttributeError(f"'{name}' is not in the {self._name} snapshot")
+
+    def __setattr__(self, name:str, value:Any) -> None:
+        sequence = self._thread.call(setattr, self._target, name, value)
+        self._pending[self._key(name, self._thread.snapshot[self._name])] = \
+            (sequence, value)
+
+    @staticmethod
+    def _key(name:str, state:dict[str, Any]) -> str:
+        # Private attributes (ex. _mono_voices) are read as their property
+        public = name.lstrip('_')
+        return public if name not in state and public in state else name
+
+
+class SynthProxy(EngineProxy):
+    """
+        An EngineProxy for a DriveSynth
+    """
+
+    def __init__(self, thread:EngineThread, synth:DriveSynth) -> None:
+        """
+            Creates a SynthProxy
+        Args:
+            thread (EngineThread): The EngineThread that owns the synth
+            synth (DriveSynth): The synth to stand in for
+        """
+        super().__init__(thread, synth, 'synth')
+
+    def range_stats(self, source) -> dict[str, int]:
+        """
+            Returns the synth's range stats of a source as of the last
+            snapshot (see DriveSynth.range_stats())
+        Args:
+            source (_type_): The source of the notes
+        """
+        stats = {'rerouted': 0, 'folded': 0, 'unplayable': 0}
+        stats.update(self._thread.snapshot['synth']['range_stats'].get(
+            source, {}))
+        return stats
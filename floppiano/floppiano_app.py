@@ -1,34 +1,37 @@
 from floppiano import VERSION
 from floppiano.UI.app import App
 from floppiano.UI.tabs import TabGroup
-from floppiano.UI.content import (
-    splash_screen, dead_screen, rick_roll_screen, FloppySaver, MainTab, 
-    MIDIPlayerTab, AboutTab, SettingsTab)
+# UI content is imported when it is first shown (see floppiano.UI.content)
+import floppiano.UI.content as content
 
-from floppiano.synths import DriveSynth
-from floppiano.devices import MIDIKeyboard
-from floppiano.midi import MIDIPlayer
+from floppiano.engine import Engine, EngineThread, EngineProxy, SynthProxy
+from floppiano.library import MIDILibrary
 
 from asciimatics.screen import Screen
 from asciimatics.scene import Scene
 from asciimatics.exceptions import StopApplication
 from asciimatics.widgets.utilities import THEMES
 
-from mido import Message
-from mido.ports import BaseInput, BaseOutput
-
+import sys
 import time
 import logging
 
+# The .mid files to play and where to cache what's in them
+MIDI_LIBRARY_ROOT = 'assets/MIDI'
+MIDI_LIBRARY_CACHE = 'cache/library.json'
+
+# How long the UI sleeps when there was nothing to draw (in seconds)
+UI_IDLE_TIME = 0.01
+# How long a thread may hold the GIL before another may run (in seconds), short
+# so the engine thread is not held up by drawing (Python's default is 0.005)
+SWITCH_INTERVAL = 0.001
+
 
 class FlopPianoApp(App):
 
     def __init__(
             self, 
-            synth:DriveSynth,
-            keyboard:MIDIKeyboard,
-            input_port:BaseInput,
-            output_port:BaseOutput,
+            engine:Engine,
             theme: str = 'default',
             splash_start: bool = True,
             screen_timeout:float = None,
@@ -38,16 +41,20 @@ class FlopPianoApp(App):
         self.logger = logging.getLogger(__name__)        
         self._splash_start = splash_start # Start with a splash screen?        
         self._screen_timeout = screen_timeout # Timeout for the screen saver
-        self._synth = synth # DriveSynth to sound all music on floppy drives
-        self._keyboard = keyboard # MIDIKeyboard to generate notes  
-        self._input_port = input_port # MIDI input
-        self._output_port = output_port #MIDI output
+        self._engine = engine # Moves all MIDI through the synth
+        self._synth = engine.synth # DriveSynth to sound all music on floppy drives
+        # Runs the engine, the UI only uses the engine's objects via proxies
+        self._engine_thread = EngineThread(engine)
+        self._engine_proxy = EngineProxy(self._engine_thread, engine, 'engine')
+        self._synth_proxy = SynthProxy(self._engine_thread, self._synth)
+        self._midi_player_proxy = EngineProxy(
+            self._engine_thread, engine.midi_player, 'midi_player')
+        # The .mid files (and their details) to play, indexed in the background
+        self._midi_library = MIDILibrary(MIDI_LIBRARY_ROOT, MIDI_LIBRARY_CACHE)
         self._last_scene = None # Scene that was active before the screen saver
         self._last_draw_time = None # Time that the screen was last drawn
+        self._last_refresh_time = 0 # Time that a Tab's refresh was last drawn
         self._needs_redraw = False # A flag to force a redraw
-        self._loopback = True # Allow the piano keys' midi to be injected?
-        # A Non-blocking MIDIPlayer
-        self._midi_player = MIDIPlayer(on_stop=self._synth.reset)
   
     def run(self) -> bool:
         # Ensure a start with a fresh synth
@@ -57,21 +64,29 @@ class FlopPianoApp(App):
         if self._splash_start:
             #Use asciimatics to play the splash sequence, blocks until done
             Screen.wrapper(
-                splash_screen, 
+                content.splash_screen, 
                 catch_interrupt=True, 
                 arguments=[self._synth])
 
+        # Run the engine (and its background work) on its own thread
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SWITCH_INTERVAL)
+        self._engine_thread.start()
+        self._midi_library.start()
+
         # Handle errors and application exit
         try:
             self._loop()
         except KeyboardInterrupt as ki:
+            self._stop_engine() # The synth can be used once the engine stops
             self.reset() # Reset the Screen so print() works
             self._synth.reset() # Stop any synth activity
             print("ctrl+c stopped.")
             return False # Return false to quit the app
         except Exception as e:
+            self._stop_engine()
             # Show the dead screen error message
-            dead_screen(self.screen, error_msg=(
+            content.dead_screen(self.screen, error_msg=(
                 "Uh-oh! an error occurred. Press 'enter' to restart. "
                 f'Error: {str(e)}'
             ))
@@ -79,6 +94,10 @@ class FlopPianoApp(App):
             #ie. NO self._synth.reset()or hardware_reset() call
             self.reset() # Kill the screen
             return True # Return True to restart the app
+        finally:
+            self._midi_library.quit()
+            self._stop_engine()
+            sys.setswitchinterval(switch_interval)
 
 
     def _loop(self):
@@ -86,42 +105,36 @@ class FlopPianoApp(App):
         self.draw(force=True)
 
         while True:            
-            # Any output from the synth goes in this list
-            outgoing:list[Message] = []
+            # The engine stopped, show its error
+            if self._engine_thread.error is not None:
+                raise self._engine_thread.error
+            if not self._engine_thread.is_alive():
+                raise RuntimeError('The engine stopped')
 
-            # Let the synth handle the MIDIKeyboard messages
-            if self._loopback and self._keyboard is not None:
-                outgoing.extend(
-                    self._synth.parse(self._keyboard.update(),'keyboard')) 
-            
-            # If playing a .mid, let the synth handle the messages
-            if self._midi_player.playing:
-                msg = self._midi_player.update()
-                if msg is not None:
-                    outgoing.extend(self._synth.parse([msg], "midi_player"))
-
-            # Handle any incoming MIDI from the input port
-            if self._input_port is not None:
-                #Get the messages from the input port
-                if(not self._input_port.closed): 
-                    input_msg = self._input_port.receive(block=False)
-                    # Don't let the input message be a clock, 
-                    # it slows down everything because they are so frequent
-                    if input_msg is not None and input_msg.type!='clock': 
-                        # If we have a message parse it
-                        outgoing.extend(
-                            self._synth.parse([input_msg], "input_port"))
-                else: raise RuntimeError("The MIDI input port closed!")
-
-            # write the output
-            if self._output_port is not None:
-                if (not self._output_port.closed):
-                    for msg in outgoing:
-                        self._output_port.send(msg)
-                else: raise RuntimeError("The MIDI output port closed!")
-            
             # If something requested a redraw force a draw to happen 
-            if self.draw(self._needs_redraw): self._needs_redraw = False            
+            if self.draw(self._needs_redraw): 
+                self._needs_redraw = False
+            elif not self._refresh():
+                # Let the engine have the interpreter
+                time.sleep(UI_IDLE_TIME)
+
+    def _refresh(self) -> bool:
+        # Redraw the active Tab if it wants to be refreshed (ex. live metrics).
+        # Doesn't count as activity for the screen saver
+        if self._last_scene is not None or self.screen is None: return False
+        period = getattr(
+            self.screen._scenes[self.screen._scene_index], 
+            'refresh_period', 
+            None)
+        if period is None or \
+            time.time() - self._last_refresh_time < period: return False
+        self._last_refresh_time = time.time()
+        return super().draw(force=True)
+
+    def _stop_engine(self):
+        # Stop the engine thread and wait for it to finish its current update
+        self._engine_thread.quit()
+        if self._engine_thread.is_alive(): self._engine_thread.join()
      
     def action(self, action: str, args=None):
         if action == 'theme':
@@ -129,32 +142,39 @@ class FlopPianoApp(App):
             self.reset()
             self._needs_redraw =True
         if action == 'loopback':
-            self._loopback = args
+            self._engine_proxy.loopback = args
         if action == 'rick_roll':
             # Ensure no midi is playing
-            self._midi_player.stop() 
+            self._midi_player_proxy.stop() 
              # Reset the synth
-            self._synth.reset()
+            self._synth_proxy.reset()
             # Play the rick roll
-            Screen.wrapper(rick_roll_screen, catch_interrupt=True)
+            Screen.wrapper(content.rick_roll_screen, catch_interrupt=True)
             # Raise an error to restart the application
             raise RuntimeError('Floppie died from embarrassment.')
     
     def resource(self, resource: str, args=None):
+        # The engine thread owns these, the UI gets proxies (see EngineProxy)
         if resource == 'synth':
-            return self._synth
+            return self._synth_proxy
         if resource == 'loopback':
-            return self._loopback
+            return self._engine_proxy.loopback
         if resource == 'midi_player':
-            return self._midi_player
+            return self._midi_player_proxy
+        if resource == 'midi_library':
+            return self._midi_library
+        if resource == 'command_error':
+            # The last queued call that failed (see EngineThread.snapshot)
+            return self._engine_thread.snapshot['command_error']
         return None 
 
     def _draw_init(self, screen:Screen) -> tuple[list[Scene], Scene]:
         tab_group = TabGroup(screen)
-        tab_group.add_tab(MainTab(self, 'Main'))
-        tab_group.add_tab(MIDIPlayerTab(self, "MIDI Player"))
-        tab_group.add_tab(AboutTab(self, 'About'))
-        tab_group.add_tab(SettingsTab(self, 'Settings'))
+        tab_group.add_tab(content.MainTab(self, 'Main'))
+        tab_group.add_tab(content.MIDIPlayerTab(self, "MIDI Player"))
+        tab_group.add_tab(content.MetricsTab(self, 'Metrics'))
+        tab_group.add_tab(content.AboutTab(self, 'About'))
+        tab_group.add_tab(content.SettingsTab(self, 'Settings'))
         tab_group.fix()        
         return (tab_group.tabs, None)
 
@@ -201,7 +221,7 @@ class FlopPianoApp(App):
                     #Force the screen to have only the screen saver as a scene
                     self.screen.set_scenes(
                         [Scene(
-                            [FloppySaver(self.screen, VERSION)],#[FloppySaver(self.screen, VERSION)],
+                            [content.FloppySaver(self.screen, VERSION)],#[FloppySaver(self.screen, VERSION)],
                             -1,
                             clear=True
                         )]
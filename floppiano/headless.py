@@ -0,0 +1,304 @@
+import sys
+import json
+import time
+import select
+import socket
+import logging
+from floppiano.engine import Engine
+from floppiano.synths import DriveSynth, SynthRouter
+from floppiano.library import MIDILibrary
+
+"""
+                          Headless Control Socket:
+
+A UDP socket (on localhost) that accepts one command per datagram and answers
+each with a single datagram: 'ok', 'ok <JSON>' or 'error: <reason>'.
+
+Commands:
+    status                      - The player/synth state (and the note
+                                  latency stats if tracing, the cluster
+                                  message counts if in a cluster) as JSON
+    play <file> [transpose]     - Plays a .mid file, a transpose of 'auto'
+                                  plays the file's arrangement (see arrange)
+    arrange <file>              - The transpose and channels that fit the 
+                                  most notes of a .mid file on the drives as 
+                                  JSON
+    stop                        - Stops the playing .mid file
+    queue <file> [transpose]    - Adds a .mid file to the playlist, plays the
+                                  playlist if nothing is playing
+    skip                        - Plays the next file in the playlist
+    clear                       - Empties the playlist
+    shuffle on|off              - Shuffles the playlist when it repeats
+    repeat on|off               - Repeats the playlist when it ends
+    reduce on|off               - Leaves out notes ahead of time so that the
+                                  files played/queued after never need more
+                                  voices than the synth has
+    mute / unmute               - Mutes/un-mutes the synth
+    reset                       - Resets the synth
+    set <property> <value>      - Sets a synth property (ex. 'set glide 20' or
+                                  'set bow on'), of every synth if the drives
+                                  are split
+    quit                        - Stops the HeadlessApp
+
+Ex. (from a shell)
+    echo -n "play assets/MIDI/song.mid -5" | nc -u -w1 127.0.0.1 9300
+"""
+
+# The synth properties that can be set via the control socket
+SETTABLE = (
+    'input_channel', 'output_channel', 'output_mode', 'pitch_bend_range',
+    'modulation_wave', 'modulation_rate', 'modulation', 'poly_voices', 'bow',
+    'spin', 'glide', 'range_policy'
+)
+# The settable properties that are on or off
+SWITCHES = ('bow', 'spin')
+# The settable properties that also take a name (ex. 'set range_policy fold')
+NAMED = ('output_mode', 'modulation_wave', 'range_policy')
+# The on/off values of SWITCHES
+BOOLEANS = {'on': True, 'true': True, 'off': False, 'false': False}
+
+# The shortest time (in seconds) between engine updates, the rest of a loop
+# waits (for a control command) instead of keeping a core busy
+LOOP_TIME = 0.001
+# The GIL switch interval while running (like FlopPianoApp) so the
+# KeyboardScanner thread scans on time
+SWITCH_INTERVAL = 0.001
+
+
+class HeadlessApp():
+    """
+        Runs the FlopPiano Engine without a screen. Controlled by the startup
+        arguments and (optionally) a control socket.
+    """
+
+    def __init__(self, engine:Engine, control_port:int = None) -> None:
+        """
+            Creates a HeadlessApp
+        Args:
+            engine (Engine): The Engine to run
+            control_port (int, optional): The localhost UDP port of the control
+                socket. Defaults to None (no control socket).
+        """
+        self.logger = logging.getLogger(__name__)
+        self._engine = engine
+        # A DriveSynth or a SynthRouter (the drives split across channels)
+        self._synth:DriveSynth | SynthRouter = engine.synth
+        self._control_port = control_port
+        self._socket:socket.socket = None
+        # Reduce the files played to the synth's voices?
+        self._reduce = False
+        self._running = False
+        # Loop statistics
+        self.loops = 0
+        self._start_time = None
+
+    def run(self) -> bool:
+        """
+            Runs the Engine until a 'quit' command or ctrl+c. Blocks.
+
+        Returns:
+            bool: True if the app should be restarted (an error occurred),
+            False otherwise
+        """
+        if self._control_port is not None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            # Bind the control socket first, nothing is running yet if its
+            # port is taken
+            if self._socket is not None:
+                self._socket.bind(('127.0.0.1', self._control_port))
+                self._socket.setblocking(False)
+            # Ensure a start with a fresh synth
+            self._synth.hardware_reset()
+            self._engine.start()
+        except Exception:
+            # Don't leave the control port bound
+            if self._socket is not None: self._socket.close()
+            self._socket = None
+            raise
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SWITCH_INTERVAL)
+        self._running = True
+        self._start_time = time.perf_counter()
+        try:
+            while self._running:
+                loop_start = time.perf_counter()
+                self._engine.update()
+                self.loops += 1
+                self._wait(loop_start + LOOP_TIME)
+            return False
+        except KeyboardInterrupt:
+            self._synth.reset() # Stop any synth activity
+            print("ctrl+c stopped.")
+            return False
+        except Exception as e:
+            # Do not reset the synth incase a BusException caused the crash
+            self.logger.exception('Headless engine error, restarting')
+            print(f'Error: {e}. Restarting...')
+            return True
+        finally:
+            self._engine.stop()
+            if self._socket is not None: self._socket.close()
+            sys.setswitchinterval(switch_interval)
+            elapsed = time.perf_counter() - self._start_time
+            if elapsed > 0:
+                self.logger.info(
+                    f'Headless: {self.loops} loops at '
+                    f'{self.loops / elapsed:.0f}/s')
+
+    def execute(self, command:str) -> str:
+        """
+            Runs a control command (see the module doc)
+        Args:
+            command (str): The command
+
+        Returns:
+            str: The reply, 'ok', 'ok <JSON>' or 'error: <reason>'
+        """
+        words = command.split()
+        if len(words) == 0: return 'error: empty command'
+        player = self._engine.midi_player
+        try:
+            match words[0]:
+                case 'status':
+                    status = {
+                        'playing': player.playing,
+                        'file': player.file_path,
+                        'playlist': player.playlist,
+                        'muted': self._synth.muted,
+                        'offline_drives': sorted(self._synth.offline_drives)
+                    }
+                    if self._engine.tracer is not None:
+                        status['latency'] = self._engine.tracer.stats()
+                    cluster = self._engine.cluster
+                    if cluster is not None:
+                        status['cluster'] = {
+                            'received': cluster.received,
+                            'sent': cluster.sent,
+                            'errors': cluster.errors
+                        }
+                    return 'ok ' + json.dumps(status)
+                case 'play':
+                    if player.playing: player.stop()
+                    if len(words) > 2 and words[2] == 'auto':
+                        arrangement = self._arrange(words[1])
+                        player.play(
+                            words[1], 
+                            transpose = arrangement['transpose'], 
+                            channels = arrangement['channels'],
+                            voices = self._voices())
+                    else:
+                        transpose = int(words[2]) if len(words) > 2 else 0
+                        player.play(
+                            words[1], 
+                            transpose = transpose, 
+                            channels = self._channels(),
+                            voices = self._voices())
+                case 'arrange':
+                    return 'ok ' + json.dumps(self._arrange(words[1]))
+                case 'stop':
+                    player.stop()
+                case 'queue':
+                    player.queue(words[1])
+                    if not player.playing:
+                        transpose = int(words[2]) if len(words) > 2 else 0
+                        player.play_playlist(
+                            transpose = transpose, 
+                            channels = self._channels(),
+                            voices = self._voices())
+                case 'skip':
+                    player.skip()
+                case 'clear':
+                    player.clear_playlist()
+                case 'shuffle' | 'repeat':
+                    if words[1] not in ('on', 'off'):
+                        return f'error: {words[0]} must be on or off'
+                    setattr(player, words[0], words[1] == 'on')
+                case 'reduce':
+                    if words[1] not in ('on', 'off'):
+                        return 'error: reduce must be on or off'
+                    self._reduce = words[1] == 'on'
+                case 'mute':
+                    self._synth.mute()
+                case 'unmute':
+                    self._synth.muted = False
+                case 'reset':
+                    self._synth.reset()
+                case 'set':
+                    if words[1] not in SETTABLE:
+                        return f'error: {words[1]} can not be set'
+                    value = words[2]
+                    # Properties take ints (or names for list based settings,
+                    # on/off for switches)
+                    if words[1] in SWITCHES and value.lower() in BOOLEANS:
+                        value = BOOLEANS[value.lower()]
+                    elif value.lstrip('-').isdigit(): 
+                        value = int(value)
+                    elif words[1] in SWITCHES:
+                        return f'error: {words[1]} must be on or off'
+                    elif words[1] not in NAMED:
+                        return f'error: {words[1]} must be a number'
+                    for synth in self._synths(): 
+                        setattr(synth, words[1], value)
+                case 'quit':
+                    self._running = False
+                case _:
+                    return f'error: unknown command {words[0]}'
+        except (IndexError, ValueError, OSError, RuntimeError) as e:
+            return f'error: {e}'
+        return 'ok'
+
+    def _synths(self) -> list[DriveSynth]:
+        # The DriveSynths (the router's when the drives are split)
+        if isinstance(self._synth, SynthRouter): return self._synth.synths
+        return [self._synth]
+
+    def _channels(self) -> list[int]:
+        # The channels the synths listen on (the files' other channels are
+        # not heard, so they are not played or reduced)
+        return sorted({synth.input_channel for synth in self._synths()})
+
+    def _voices(self) -> int:
+        # The voices to reduce the files played to, None to not reduce
+        if not self._reduce: return None
+        return self._synth.active_voices + self._synth.available_voices
+
+    def _arrange(self, file_path:str) -> dict:
+        # The arrangement of a .mid file for the synth (see 
+        # MIDILibrary.arrange())
+        entry = MIDILibrary.analyze(file_path)
+        if 'error' in entry: raise ValueError(entry['error'])
+        arrangement = MIDILibrary.arrange(
+            entry, 
+            self._synth.playable_notes, 
+            self._synth.active_voices + self._synth.available_voices,
+            channels = self._channels())
+        if arrangement is None: 
+            raise ValueError('no arrangement fits the synth')
+        return arrangement
+
+    def _wait(self, deadline:float) -> None:
+        # Waits until the deadline (time.perf_counter()), answers the control
+        # commands that arrive meanwhile
+        timeout = deadline - time.perf_counter()
+        if self._socket is None:
+            if timeout > 0: time.sleep(timeout)
+            return
+        if timeout > 0: select.select([self._socket], [], [], timeout)
+        self._handle_commands()
+
+    def _handle_commands(self) -> None:
+        # Answer every pending command without blocking
+        while True:
+            try:
+                data, sender = self._socket.recvfrom(1024)
+            except BlockingIOError:
+                return
+            reply = self.execute(data.decode('utf8', errors='replace'))
+            self.logger.info(f'Control command: {data!r} -> {reply}')
+            try:
+                self._socket.sendto(reply.encode('utf8'), sender)
+            except OSError:
+                # The sender went away, nothing to answer
+                pass
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+from threading import Thread, Event, Lock
+from mido import MidiFile, MetaMessage
+
+"""
+                             MIDI Library Cache:
+
+A JSON object recording what is in each .mid file of the library so that only
+new or changed (by size and modification time) files have to be read again.
+
+Ex.
+{
+    "version": 1,
+    "files": {
+        "jacob/song.mid": {
+            "mtime": 1723100000.0,
+            "size": 9574,
+            "duration": 183.2,
+            "notes": 1520,
+            "polyphony": 4,
+            "lowest": 36,
+            "highest": 84,
+            "channels": [0, 1],
+            "histogram": [[[36, 120], [38, 64]], [[60, 30], [84, 2]]],
+            "peaks": [[1, 3], [2, 2]]
+        }
+    }
+}
+
+The "histogram" has the [note, count] pairs of each channel and the "peaks" 
+have the notes sounding on each channel (both in the order of "channels") at
+the moments that the most notes sound at once (see MIDILibrary.analyze()).
+
+A file that could not be read has an "error" instead of the details.
+"""
+
+# Bumped when the cached details change, older caches are rebuilt
+CACHE_VERSION = 2
+
+# The most channels whose subsets are searched by MIDILibrary.arrange()
+ARRANGE_CHANNELS = 10
+
+
+class MIDILibrary(Thread):
+    """
+        A Thread that indexes the .mid files under a directory. Cached entries
+        are available as soon as the thread starts, new and changed files are
+        read in the background and the cache is saved once they all are.
+    """
+
+    def __init__(self, root:str, cache_file:str = None) -> None:
+        """
+            Creates a MIDILibrary
+        Args:
+            root (str): The directory to find .mid files in (recursively)
+            cache_file (str, optional): The path to the cache (JSON) file.
+                Defaults to None (no cache).
+        """
+        Thread.__init__(self, daemon=True)
+        self._root = root
+        self._cache_file = cache_file
+        self._stop_event = Event()
+        self._lock = Lock()
+        # The entry of each file, by path relative to the root
+        self._entries:dict[str, dict] = {}
+        # Incremented whenever the entries change
+        self.version = 0
+
+    def run(self) -> None:
+        cache = self._load_cache()
+        files = self._find_files()
+
+        # Use every entry that is still up to date, read the rest
+        stale = []
+        with self._lock:
+            for name, (mtime, size) in files.items():
+                entry = cache.get(name)
+                if entry is not None and entry.get('mtime') == mtime and \
+                    entry.get('size') == size:
+                    self._entries[name] = dict(entry, name = name,
+                        path = os.path.join(self._root, name))
+                else:
+                    stale.append(name)
+            self.version += 1
+
+        for name in sorted(stale):
+            if self._stop_event.is_set(): return
+            mtime, size = files[name]
+            path = os.path.join(self._root, name)
+            entry = MIDILibrary.analyze(path)
+            entry.update(mtime = mtime, size = size)
+            with self._lock:
+                self._entries[name] = dict(entry, name = name, path = path)
+                self.version += 1
+            # Give the other threads (ex. the engine) a turn between files
+            time.sleep(0)
+
+        if len(stale) > 0 or len(cache) != len(files):
+            self._save_cache()
+
+    def quit(self) -> None:
+        """
+            Sets the stop event to halt the MIDILibrary
+        """
+        self._stop_event.set()
+
+    def get_entries(self) -> list[dict]:
+        """
+            Returns (without blocking) the entries indexed so far. Each entry
+            has the file's 'name' (relative to the root), 'path', 'mtime',
+            'size' and either its details (see analyze()) or an 'error'.
+        """
+        with self._lock:
+            return list(self._entries.values())
+
+    @property
+    def building(self) -> bool:
+        """
+            Is the library still being indexed?
+        """
+        return self.is_alive()
+
+    @staticmethod
+    def analyze(file_path:str) -> dict:
+        """
+            Reads a .mid file's details
+        Args:
+            file_path (str): The path to the .mid file
+        Returns:
+            dict: The 'duration' (seconds), number of 'notes', 'polyphony' (the
+                most notes sounding at once), 'lowest' and 'highest' notes (None
+                without notes), the 'channels' with notes, the 'histogram' (the
+                [note, count] pairs of each channel) and the 'peaks' (the notes
+                sounding on each channel whenever no other moment has as many
+                or more on every channel). Or an 'error' if the file could not 
+                be read.
+        """
+        try:
+            mid_file = MidiFile(file_path)
+            duration = 0.0
+            notes = 0
+            polyphony = 0
+            lowest = 127
+            highest = 0
+            # The count of each note, by channel
+            histogram:dict[int, dict[int, int]] = {}
+            # The number of times each (channel, note) is sounding
+            sounding:dict[tuple[int, int], int] = {}
+            # The notes sounding on each channel and every distinct mix of them
+            playing = [0] * 16
+            mixes = set()
+            for msg in mid_file:
+                duration += msg.time
+                if isinstance(msg, MetaMessage): continue
+                if msg.type not in ('note_on', 'note_off'): continue
+                key = (msg.channel, msg.note)
+                if msg.type == 'note_on' and msg.velocity > 0:
+                    notes += 1
+                    lowest = min(lowest, msg.note)
+                    highest = max(highest, msg.note)
+                    counts = histogram.setdefault(msg.channel, {})
+                    counts[msg.note] = counts.get(msg.note, 0) + 1
+                    sounding[key] = sounding.get(key, 0) + 1
+                    playing[msg.channel] += 1
+                    mixes.add(tuple(playing))
+                elif sounding.get(key, 0) > 0:
+                    sounding[key] -= 1
+                    playing[msg.channel] -= 1
+        except Exception as e:
+            # Broken or not a .mid file
+            return {'error': str(e)}
+
+        channels = sorted(histogram)
+        # Keep the mixes that no other mix has as many or more notes on every
+        # channel as, they are all that's needed for the polyphony of any 
+        # subset of the channels
+        peaks = []
+        for mix in sorted(mixes, key = sum, reverse = True):
+            if not any(all(peak[channel] >= mix[channel] 
+                           for channel in channels) for peak in peaks):
+                peaks.append(mix)
+        if len(peaks) > 0: polyphony = sum(peaks[0])
+
+        return {
+            'duration': duration,
+            'notes': notes,
+            'polyphony': polyphony,
+            'lowest': lowest if notes > 0 else None,
+            'highest': highest if notes > 0 else None,
+            'channels': channels,
+            'histogram': [sorted(histogram[channel].items()) 
+                          for channel in channels],
+            'peaks': [[peak[channel] for channel in channels] 
+                      for peak in peaks]
+        }
+
+    @staticmethod
+    def arrange(
+        entry:dict, 
+        playable:frozenset[int], 
+        voices:int, 
+        transposes = range(-12, 13),
+        channels:list[int] = None) -> dict:
+        """
+            Finds the transpose and the channels of a file (from its entry, see
+            get_entries()) that play the most notes within the playable notes
+            without ever needing more than the given number of voices. Ties go
+            to the arrangement with more notes, then the smaller transpose.
+        Args:
+            entry (dict): The file's entry
+            playable (frozenset[int]): The MIDI notes the synth can play
+            voices (int): The number of voices the synth has
+            transposes (optional): The transposes to try. Defaults to 
+                range(-12, 13).
+            channels (list[int], optional): The MIDI channels the synth hears,
+                only they are arranged. Defaults to None (all channels, ex. 
+                when they are redirected to the synth's).
+
+        Returns:
+            dict: The 'transpose', 'channels' (a list), the number of their 
+                notes that are 'in_range' (after transposing), their number of
+                'notes' and their 'polyphony'. None if the entry has no notes 
+                (on the channels heard) or the synth has no voices.
+        """
+        if entry.get('notes', 0) == 0 or voices <= 0: return None
+        histogram = entry['histogram']
+        peaks = entry['peaks']
+        size = len(entry['channels'])
+        # The indexes of the channels the synth hears
+        heard = [index for index, channel in enumerate(entry['channels'])
+                 if channels is None or channel in channels]
+        if len(heard) == 0: return None
+
+        def subset_sums(values:list[int], indexes:list[int]) -> list[int]:
+            # The sum of the values of every subset (bit mask) of the indexes
+            sums = [0] * (1 << len(indexes))
+            for mask in range(1, len(sums)):
+                low = mask & -mask
+                sums[mask] = sums[mask ^ low] + \
+                    values[indexes[low.bit_length() - 1]]
+            return sums
+
+        # Try subsets of the busiest channels when they all need too many 
+        # voices, or some are not heard (the others are left out)
+        if len(heard) == size and entry['polyphony'] <= voices:
+            indexes = heard
+            masks = [(1 << size) - 1]
+        else:
+            totals = [sum(count for _, count in notes) for notes in histogram]
+            indexes = sorted(heard, key = lambda index: -totals[index])
+            indexes = sorted(indexes[:ARRANGE_CHANNELS])
+            polyphonies = [0] * (1 << len(indexes))
+            for peak in peaks:
+                polyphonies = list(map(
+                    max, polyphonies, subset_sums(peak, indexes)))
+            masks = [mask for mask, polyphony in enumerate(polyphonies)
+                     if 0 < polyphony <= voices]
+            if len(masks) == 0: return None
+
+        def mask_sums(values:list[int]):
+            # The sums of the values of the channels of each mask
+            if len(masks) > 1: return subset_sums(values, indexes)
+            return {masks[0]: sum(values[index] for index in indexes)}
+
+        notes = mask_sums(
+            [sum(count for _, count in channel) for channel in histogram])
+
+        best = None
+        for transpose in transposes:
+            in_range = mask_sums(
+                [sum(count for note, count in channel 
+                     if note + transpose in playable) 
+                 for channel in histogram])
+            for mask in masks:
+                rank = (in_range[mask], notes[mask], -abs(transpose))
+                if best is None or rank > best[0]:
+                    best = (rank, transpose, mask)
+
+        (in_range, note_count, _), transpose, mask = best
+        chosen = [index for bit, index in enumerate(indexes) 
+                  if mask & (1 << bit)]
+        return {
+            'transpose': transpose,
+            'channels': [entry['channels'][index] for index in chosen],
+            'in_range': in_range,
+            'notes': note_count,
+            'polyphony': max(
+                (sum(peak[index] for index in chosen) for peak in peaks),
+                default = 0)
+        }
+
+    def _find_files(self) -> dict[str, tuple[float, int]]:
+        # The modification time and size of each .mid file, by relative path
+        files = {}
+        for directory, _, file_names in os.walk(self._root):
+            for file_name in file_names:
+                if not file_name.lower().endswith('.mid'): continue
+                path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[os.path.relpath(path, self._root)] = \
+                    (stat.st_mtime, stat.st_size)
+        return files
+
+    def _load_cache(self) -> dict[str, dict]:
+        # The cached entries, nothing if there is no (usable) cache
+        if self._cache_file is None: return {}
+        try:
+            with open(self._cache_file, encoding='utf8') as file:
+                cache = json.load(file)
+            if cache.get('version') != CACHE_VERSION: return {}
+            return dict(cache['files'])
+        except (OSError, ValueError, AttributeError, KeyError, TypeError):
+            return {}
+
+    def _save_cache(self) -> None:
+        # Save the entries (without their name/path) to the cache file
+        if self._cache_file is None: return
+        with self._lock:
+            files = {name: {key: value for key, value in entry.items()
+                            if key not in ('name', 'path')}
+                     for name, entry in self._entries.items()}
+        try:
+            directory = os.path.dirname(self._cache_file)
+            if directory != '': os.makedirs(directory, exist_ok=True)
+            with open(self._cache_file, 'w', encoding='utf8') as file:
+                json.dump({'version': CACHE_VERSION, 'files': files}, file)
+        except OSError:
+            # Not fatal, the library is read again next time
+            pass
@@ -1,21 +1,29 @@
 import time
+# As early as possible, so the import time shows up in the startup profile
+_START_TIME = time.perf_counter()
 import argparse
 import textwrap
-import mido
-from mido.ports import BaseInput, BaseOutput
+import contextlib
+from typing import TYPE_CHECKING
 
 import floppiano.bus as bus
-from floppiano.UI.content import dead_screen
-from floppiano import VERSION, FlopPianoApp
-from floppiano.devices import DeviceDiscovery
+from floppiano import VERSION
+from floppiano.devices import DEVICE_TYPE_REG, DeviceDiscovery
 from floppiano.devices import MIDIKeyboard
-from floppiano.synths import DriveSynth
+from floppiano.devices import DriveCalibration
+from floppiano.devices import DeviceInventory
+from floppiano.devices import DeviceMonitor
+from floppiano.synths import DriveSynth, SynthRouter
 
-from asciimatics.screen import Screen, ManagedScreen
-from asciimatics.widgets.utilities import THEMES
-from asciimatics.event import KeyboardEvent
 import logging
 
+if TYPE_CHECKING:
+    # The optional features (cluster, network, tracing) and the engine are
+    # imported when used. mido itself is loaded with the synths and devices,
+    # only its port backends wait until the MIDI interfaces are looked for
+    from mido.ports import BaseInput, BaseOutput
+    from floppiano.cluster import ClusterLink
+
 """
 
 The main entry point for the FlopPiano application. 
@@ -25,52 +33,154 @@ Handles all of the startup checks and setup.
 """
 
 
+# A device type read slower than this (in seconds) points to a bus issue
+SLOW_PROBE_TIME = 0.05
+# The number of threads the I2C scan's probes are split between
+DISCOVERY_SHARDS = 4
+
+# The asciimatics colours used to print (see asciimatics COLOUR_*), 
+# kept here so that headless startups don't import asciimatics
+COLOUR_RED = 1
+COLOUR_GREEN = 2
+COLOUR_YELLOW = 3
+COLOUR_WHITE = 7
+
+# The asciimatics themes that work on a Raspberry Pi
+THEME_NAMES = ('default', 'monochrome', 'green', 'bright', 'warning')
+
+# The startup text width when there is no screen (headless)
+HEADLESS_WIDTH = 45
+
+# Where the MIDIPlayer's voice reductions of .mid files are cached
+REDUCTION_CACHE = 'cache/reductions.json'
+
+
+class StartupProfiler():
+    """
+        Times the phases of a startup (ex. bus setup, device discovery) to find
+        what makes starting slow
+    """
+
+    def __init__(self, start_time:float = None) -> None:
+        """
+            Creates a StartupProfiler
+        Args:
+            start_time (float, optional): The time.perf_counter() time the
+                startup began. Defaults to None (now).
+        """
+        self._start_time = \
+            time.perf_counter() if start_time is None else start_time
+        self._phases:list[tuple[str, float]] = []
+        self._end_time = self._start_time
+
+    def add(self, name:str, seconds:float) -> None:
+        """
+            Adds a phase that was timed elsewhere
+        Args:
+            name (str): The name of the phase
+            seconds (float): How long the phase took
+        """
+        self._phases.append((name, seconds))
+        self._end_time = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name:str):
+        """
+            Times the code in a with block as a phase
+        Args:
+            name (str): The name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def report(self) -> list[str]:
+        """
+            Returns the lines of the profile, one per phase (in the order they
+            ran) and the total time from the startup to the end of the last
+            phase
+        """
+        lines = [f'{name:<20}{seconds * 1000:>8.1f} ms'
+                 for name, seconds in self._phases]
+        total = self._end_time - self._start_time
+        lines.append(f"{'total':<20}{total * 1000:>8.1f} ms")
+        return lines
+
+
 class Startup():
     """
-    A class to create FlopPianoApp with appropriate settings from command-
-    line arguments.
+    A class to create FlopPianoApp (or HeadlessApp) with appropriate settings
+    from command-line arguments.
     """
     def __init__(self) -> None:
-        # An asciimatics screen to draw with    
-        self._screen:Screen = None
+        # An asciimatics screen to draw with (None when headless)
+        self._screen = None
         # Current y position to print at
         self._line = 0
-
-    def get_app(self) -> FlopPianoApp:
+        # Was a warning (or error) printed?
+        self._warned = False
+        # Should the startup profile be printed once the app exits?
+        self.profile_pending = False
+        # Times the startup phases
+        self.profiler = StartupProfiler(_START_TIME)
+        self.profiler.add('imports', time.perf_counter() - _START_TIME)
+
+    def get_app(self, restart:bool = False):
         """
-            Returns a FlopPianoApp with appropriate startup settings. Prompts
-            for user input when there is an error, finds I2C Devices, finds MIDI
+            Returns a FlopPianoApp (or a HeadlessApp if --headless is given) 
+            with appropriate startup settings. Prompts for user input when there
+            is an error (continues when headless), finds I2C Devices, finds MIDI
             interfaces, and configures settings.
+        Args:
+            restart (bool, optional): Is the app being restarted? If so, 
+                don't hang for warnings to be read. Defaults to False.
         """
+        # A restart has nothing to import, profile from now
+        if restart: self.profiler = StartupProfiler()
+        profiler = self.profiler
         # Parse cli arguments
         args = self.parse_args()
 
         # Create a screen to draw with
-        with ManagedScreen() as screen:
+        screen_start = time.perf_counter()
+        with self._screen_context(args.headless) as screen:
+            profiler.add('screen', time.perf_counter() - screen_start)
             self._screen = screen    
             self.print(f'------------- FlopPiano Startup -------------',
-                       Screen.COLOUR_GREEN,
+                       COLOUR_GREEN,
                        True)
 
             drive_addresses = []
             keyboard_address = None
             input_port = None
             output_port = None             
+            fault_bus = None
 
             # Are we using the normal I2C bus?
             if not args.debugbus:
                 try:
                     #Set the bus up using the bus number
-                    bus.default_bus(bus.SMBusWrapper(args.busnumber))
+                    with profiler.phase('bus'):
+                        smbus = bus.SMBusWrapper(args.busnumber)
+                    bus.default_bus(smbus)
                     self.print(f'Using I2C bus number: {args.busnumber}')
-                    # Try to find the devices
-                    drive_addresses, keyboard_address = self.find_devices()
+                    # Try the devices found last time, otherwise find them
+                    with profiler.phase('devices'):
+                        drive_addresses, keyboard_address = \
+                            self.check_inventory(
+                                args.inventory, 
+                                args.busnumber, 
+                                args.rescan,
+                                args.expecteddrives,
+                                not args.nokeyboard)
                     self.print(f'Found keyboard: {str(keyboard_address)}')
                     self.print(f'Found drives: {drive_addresses}')
 
                     #No keyboard found and we intended to use a keyboard
                     if keyboard_address is None and not args.nokeyboard:
-                        self.print('No keyboard was detected.', Screen.COLOUR_RED)
+                        self.print('No keyboard was detected.', COLOUR_RED)
                         self.print('Continue without keyboard?')
                         self.prompt_for_exit()
                         self.print('Continuing without keyboard.')
@@ -80,51 +190,74 @@ class Startup():
                     #No drives found
                     if len(drive_addresses) == 0:
                         self.print('No drives were detected.',
-                                    Screen.COLOUR_RED)
+                                    COLOUR_RED)
                         self.print('Continue with the debug bus?')
                         self.prompt_for_exit()
                         self.print('Continuing with the debus bus.')
                         # Use the debug bus
                         args.debugbus = True
+                    else:
+                        # Found the devices, from now on retry failed 
+                        # reads/writes and stop using devices that keep failing
+                        fault_bus = bus.FaultTolerantBus(
+                            smbus, probe_register = DEVICE_TYPE_REG)
+                        bus.default_bus(fault_bus)
 
                 except FileNotFoundError as f:
                     # Setting up the bus failed
                     self.print(f'Encountered issue setting up the bus: {f}',
-                               color=Screen.COLOUR_RED)
+                               color=COLOUR_RED)
                     self.print('Continue with the debug bus?')
                     self.prompt_for_exit()
                     self.print('Continuing with the debus bus.')
                     # Use the debug bus
                     args.debugbus = True
             
-            self.print('-' * self._screen.width)
+            self.print('-' * self._width())
 
             # Check that the debug bus flag was not changed from the above
             if args.debugbus:
                 # Use the debug bus
+                fault_bus = None
                 bus.default_bus(bus.DebugBus())
                 # Arbitrary dummy drive addresses
                 drive_addresses = [i for i in range(8, 18)]
                 # Arbitrary dummy keyboard address
                 keyboard_address = 119
             
-            # Should MIDI interfaces be used?
-            if not args.noports: 
+            # Load the drive tuning
+            calibration = None
+            if args.calibration is not None:
+                with profiler.phase('calibration'):
+                    calibration = self.load_calibration(args.calibration)
+                self.print('-' * self._width())
+
+            # Should MIDI interfaces be used? (network ports take the place
+            # of the USB ones)
+            if not args.noports or args.networkin is not None or \
+                args.networkout is not None: 
                 # Find them
-                input_port, output_port = self.find_ports()
-                self.print('-' * self._screen.width)
+                with profiler.phase('ports'):
+                    input_port, output_port = self.find_ports(
+                        usb = not args.noports,
+                        network_input = args.networkin,
+                        network_output = args.networkout,
+                        latency = args.jitterbuffer / 1000)
+                self.print('-' * self._width())
 
             # Do a screen check to warn the user about the optimal resolution
-            if self._screen.height != 22 or self._screen.width!= 45:
+            if screen is not None and \
+                (self._screen.height != 22 or self._screen.width!= 45):
                 self.print('WARNING: The FlopPiano app is optimized for a 45 column X 22 line display', 
-                           color= Screen.COLOUR_YELLOW)
+                           color= COLOUR_YELLOW)
 
             self.print(f'Starting FlopPiano v{VERSION}...', 
-                       Screen.COLOUR_GREEN,
+                       COLOUR_GREEN,
                        True)
 
             # Hang for a second to let the user read any warnings
-            time.sleep(1)
+            if self._warned and not restart and not args.headless:
+                time.sleep(1)
 
         # Setup logger
         if args.logfile is not None:
@@ -136,17 +269,69 @@ class Startup():
 
         # Return the app with the settings applied
 
-        synth = DriveSynth(drive_addresses)
-        keyboard = None if args.nokeyboard else MIDIKeyboard(keyboard_address, synth)
-
-        return FlopPianoApp(
-            synth,
-            keyboard = keyboard,
-            input_port = input_port,
-            output_port = output_port,
-            theme = args.theme,
-            splash_start = args.nosplash, 
-            screen_timeout = args.screentimeout)
+        with profiler.phase('synth'):
+            if args.split is not None:
+                # Each synth plays a channel (and has at least one drive), the
+                # keyboard plays the first
+                synth = SynthRouter.split(
+                    drive_addresses, 
+                    min(args.split, len(drive_addresses)), 
+                    calibration = calibration)
+                keyboard_synth = synth.synths[0]
+            else:
+                synth = DriveSynth(drive_addresses, calibration = calibration)
+                keyboard_synth = synth
+            keyboard = None if args.nokeyboard else \
+                MIDIKeyboard(keyboard_address, keyboard_synth)
+        # Only monitor the devices on the real bus
+        monitor = None
+        if not args.debugbus and args.proberate > 0:
+            monitor = DeviceMonitor(
+                drive_addresses, 
+                None if args.nokeyboard else keyboard_address,
+                args.proberate)
+
+        with profiler.phase('engine'):
+            # Only import the tracing when tracing
+            tracer = None
+            if args.trace is not None:
+                from floppiano.tracing import LatencyTracer
+                tracer = LatencyTracer()
+
+            from floppiano.engine import Engine
+            engine = Engine(
+                synth,
+                keyboard = keyboard,
+                input_port = input_port,
+                output_port = output_port,
+                monitor = monitor,
+                fault_bus = fault_bus,
+                scan_rate = args.scanrate,
+                tracer = tracer,
+                trace_file = args.trace,
+                reduction_cache = REDUCTION_CACHE,
+                cluster = self.get_cluster(args.cluster, args.nextnode))
+
+        with profiler.phase('app'):
+            if args.headless:
+                from floppiano.headless import HeadlessApp
+                app = HeadlessApp(engine, control_port = args.controlport)
+            else:
+                from floppiano.floppiano_app import FlopPianoApp
+                app = FlopPianoApp(
+                    engine,
+                    theme = args.theme,
+                    splash_start = args.nosplash, 
+                    screen_timeout = args.screentimeout)
+
+        logging.getLogger(__name__).info(
+            'Startup profile: ' + ', '.join(profiler.report()))
+        # There is no screen to clear the profile when headless, otherwise
+        # it's printed once the app exits (see __main__)
+        if args.profilestartup:
+            if args.headless: self.print_profile()
+            else: self.profile_pending = True
+        return app
     
     def parse_args(self) -> argparse.Namespace:
         """
@@ -179,7 +364,7 @@ class Startup():
                             '--theme', 
                             help = 'Specifies the UI theme', 
                             action = 'store',
-                            choices = THEMES.keys(),
+                            choices = THEME_NAMES,
                             default = 'default')
 
         parser.add_argument('-ns',
@@ -194,6 +379,98 @@ class Startup():
                             metavar = 'TIME',
                             default = 300)
         
+        parser.add_argument('-cf',
+                            '--calibration', 
+                            help = 'Specifies a drive calibration (tuning) file to use', 
+                            metavar = 'FILE')
+
+        parser.add_argument('-if',
+                            '--inventory', 
+                            help = 'Specifies the file to cache the found I2C devices in', 
+                            metavar = 'FILE',
+                            default = 'cache/inventory.json')
+
+        parser.add_argument('-rs',
+                            '--rescan', 
+                            help = 'Ignores the cached I2C devices and scans the bus', 
+                            action = 'store_true')
+
+        parser.add_argument('-ed',
+                            '--expecteddrives', 
+                            help = 'Stops scanning the I2C bus once N drives (and the keyboard) are found', 
+                            type = int,
+                            metavar = 'N')
+
+        parser.add_argument('-pr',
+                            '--proberate', 
+                            help = 'Specifies how many I2C devices per second are checked for hot-plugging. 0=off', 
+                            type = float,
+                            metavar = 'RATE',
+                            default = 4)
+
+        parser.add_argument('-sr',
+                            '--scanrate', 
+                            help = 'Specifies how many times per second the piano keys are read. 0=every loop', 
+                            type = int,
+                            metavar = 'RATE',
+                            default = 500)
+
+        parser.add_argument('-hl',
+                            '--headless', 
+                            help = 'Runs without a UI (no screen is used)', 
+                            action = 'store_true')
+
+        parser.add_argument('-cp',
+                            '--controlport', 
+                            help = 'Specifies the localhost UDP port to accept commands on (effective only if -hl is given)', 
+                            type = int,
+                            metavar = 'PORT')
+
+        parser.add_argument('-sp',
+                            '--split', 
+                            help = 'Splits the drives across N synths that play MIDI channels 0 to N-1 (effective only if -hl is given)', 
+                            type = int,
+                            metavar = 'N')
+
+        parser.add_argument('-cl',
+                            '--cluster', 
+                            help = 'Specifies the UDP port to receive the MIDI the node before rolled over on', 
+                            type = int,
+                            metavar = 'PORT')
+
+        parser.add_argument('-nn',
+                            '--nextnode', 
+                            help = 'Sends the MIDI the synth rolls over to the next node instead of the output port', 
+                            metavar = 'HOST:PORT')
+
+        parser.add_argument('-ni',
+                            '--networkin', 
+                            help = 'Specifies the UDP port to receive MIDI (OSC) on instead of a USB MIDI input', 
+                            type = int,
+                            metavar = 'PORT')
+
+        parser.add_argument('-no',
+                            '--networkout', 
+                            help = 'Sends MIDI (OSC) to HOST:PORT over UDP instead of a USB MIDI output', 
+                            metavar = 'HOST:PORT')
+
+        parser.add_argument('-jb',
+                            '--jitterbuffer', 
+                            help = 'Specifies how many milliseconds after being sent network MIDI is played. 0=as received', 
+                            type = float,
+                            metavar = 'MS',
+                            default = 10)
+
+        parser.add_argument('-ps',
+                            '--profilestartup', 
+                            help = 'Prints how long each startup phase took', 
+                            action = 'store_true')
+
+        parser.add_argument('-tr',
+                            '--trace', 
+                            help = 'Traces note latency and saves a Chrome trace to the file on exit', 
+                            metavar = 'FILE')
+
         parser.add_argument('-lf',
                     '--logfile', 
                     help = 'Specifies a logfile to use',                     
@@ -212,16 +489,80 @@ class Startup():
         # Force the bus number to be positive 
         args.busnumber = abs(args.busnumber)
 
+        # Force the expected drives to be positive or None (scan every 
+        # address)
+        if args.expecteddrives is not None:
+            args.expecteddrives = abs(args.expecteddrives) or None
+
+        # Force the probe rate to be positive
+        args.proberate = abs(args.proberate)
+
+        # Force the scan rate to be positive or None (read every loop)
+        args.scanrate = abs(args.scanrate)
+        if args.scanrate == 0: args.scanrate = None
+
+        # Only split the drives when headless (the UI has one synth), into 
+        # 1 to 16 synths
+        if not args.headless or args.split is None or abs(args.split) < 2:
+            args.split = None
+        else:
+            args.split = min(abs(args.split), 16)
+
+        # The next node and network output must be HOST:PORT
+        for name in ('nextnode', 'networkout'):
+            value = getattr(args, name)
+            if value is None: continue
+            host, _, port = value.rpartition(':')
+            if host == '' or not port.isdigit():
+                parser.error(f'--{name} must be HOST:PORT')
+            setattr(args, name, (host, int(port)))
+
+        # Force the jitter buffer to be positive
+        args.jitterbuffer = abs(args.jitterbuffer)
+
         # Force the screentimeout to be positive or None (disabled)
         args.screentimeout = abs(args.screentimeout)
         if args.screentimeout == 0: args.screentimeout = None
 
         return args
 
-    def find_devices(self) -> tuple[list[int], int]:
+    def get_cluster(
+        self,
+        port:int,
+        next_node:tuple[str, int]) -> 'ClusterLink':
+        """
+            Returns a ClusterLink if this FlopPiano is a node of a cluster
+        Args:
+            port (int): The UDP port to receive MIDI on (None if this is the
+                first node)
+            next_node (tuple[str, int]): The host and UDP port of the next
+                node (None if this is the last node)
+        Returns:
+            ClusterLink: The ClusterLink, None if not in a cluster
+        """
+        if port is None and next_node is None: return None
+        from floppiano.cluster import ClusterLink
+        # The first node only sends (from any port)
+        return ClusterLink(0 if port is None else abs(port), next_node)
+
+    def find_devices(
+        self,
+        priority:list[int] = None,
+        expected_drives:int = None,
+        expect_keyboard:bool = True,
+        shards:int = DISCOVERY_SHARDS) -> tuple[list[int], int]:
         """
            Finds drives and the keyboard on I2C bus using another thread.
            (so that the UI may be updated)
+        Args:
+            priority (list[int], optional): Addresses to probe first. Defaults
+                to None.
+            expected_drives (int, optional): Stop scanning once this many drives
+                (and the keyboard if expected) are found. Defaults to None.
+            expect_keyboard (bool, optional): Is a keyboard expected? Defaults
+                to True.
+            shards (int, optional): The number of threads to split the probes
+                between. Defaults to DISCOVERY_SHARDS.
         Returns:
             tuple[list[int], int]: A list of drive I2C addresses and the 
             keyboard I2C address
@@ -235,7 +576,8 @@ class Startup():
         elapsed = time.time()
 
         # A special Thread object to find devices
-        discovery = DeviceDiscovery()
+        discovery = DeviceDiscovery(
+            priority, expected_drives, expect_keyboard, shards)
         discovery.start() # Start the thread
 
         # While the thread is working...
@@ -252,13 +594,129 @@ class Startup():
                 discovery.join()
                 break
         
+        # Report the scan times so a bus issue can be spotted
+        scan_times = discovery.get_scan_times()
+        self.print(f'    Probed {len(scan_times)} addresses in '
+                   f'{sum(scan_times.values()):.2f}s')
+        slow = [address for address, scan_time in scan_times.items() 
+                if scan_time > SLOW_PROBE_TIME]
+        if len(slow) > 0:
+            slowest = max(slow, key = lambda address: scan_times[address])
+            self.print(f'    {len(slow)} slow addresses, slowest: '
+                       f'{hex(slowest)} ({scan_times[slowest]:.2f}s)',
+                       color = COLOUR_YELLOW)
+
         self.print("Done.")
 
         return (discovery.get_devices())
 
-    def find_ports(self) -> tuple[BaseInput, BaseOutput]:
+    def check_inventory(
+        self,
+        file_path:str,
+        bus_number:int,
+        rescan:bool = False,
+        expected_drives:int = None,
+        expect_keyboard:bool = True) -> tuple[list[int], int]:
+        """
+            Uses the devices in the inventory file if they are all still on
+            the bus, otherwise scans the bus for devices (see find_devices())
+            and updates the inventory file.
+        Args:
+            file_path (str): The path to the inventory file
+            bus_number (int): The I2C bus number being used
+            rescan (bool, optional): Scan the bus without checking the
+                inventory. Defaults to False.
+            expected_drives (int, optional): Stop scanning once this many
+                drives are found. Defaults to None (as many as the inventory
+                has, every address without an inventory).
+            expect_keyboard (bool, optional): Is a keyboard expected? Defaults
+                to True.
+        Returns:
+            tuple[list[int], int]: A list of drive I2C addresses and the 
+            keyboard I2C address
+        """
+        inventory = None
+        if not rescan:
+            try:
+                inventory = DeviceInventory.load(file_path)
+            except (OSError, ValueError):
+                # No usable inventory, scan for the devices
+                pass
+
+        if (inventory is not None and 
+            inventory.bus_number == bus_number and
+            len(inventory.drive_addresses) > 0):
+            self.print('Checking cached devices...', bold=True)
+            if inventory.verify():
+                self.print("Done.")
+                return (inventory.drive_addresses, inventory.keyboard_address)
+            self.print('    Devices changed since the last scan')
+            # The last known devices are still the most likely ones (and
+            # probably as many)
+            priority = [
+                address for address in 
+                inventory.drive_addresses + [inventory.keyboard_address]
+                if address is not None]
+            if expected_drives is None: 
+                expected_drives = len(inventory.drive_addresses)
+            drive_addresses, keyboard_address = self.find_devices(
+                priority, 
+                expected_drives, 
+                expect_keyboard and inventory.keyboard_address is not None)
+        else:
+            drive_addresses, keyboard_address = self.find_devices(
+                expected_drives = expected_drives, 
+                expect_keyboard = expect_keyboard)
+
+        found = DeviceInventory(bus_number, drive_addresses, keyboard_address)
+        if len(drive_addresses) > 0 and found != inventory:
+            try:
+                found.save(file_path)
+            except OSError as e:
+                self.print(f'Could not save the device inventory: {e}',
+                           color=COLOUR_YELLOW)
+        return (drive_addresses, keyboard_address)
+
+    def load_calibration(self, file_path:str) -> DriveCalibration:
+        """
+            Loads the drive calibration file
+        Args:
+            file_path (str): The path to the calibration file
+        Returns:
+            DriveCalibration: The drive calibration or None if the calibration
+            could not be loaded
+        """
+        self.print('Loading drive calibration...', bold=True)
+        try:
+            calibration = DriveCalibration.load(file_path)
+            self.print(f'Loaded: {file_path}')
+            return calibration
+        except (OSError, ValueError) as e:
+            self.print(f'Could not load the drive calibration: {e}',
+                       color=COLOUR_RED)
+            self.print('Continue without drive calibration?')
+            self.prompt_for_exit()
+            self.print('Continuing without drive calibration.')
+            return None
+
+    def find_ports(
+        self,
+        usb:bool = True,
+        network_input:int = None,
+        network_output:tuple[str, int] = None,
+        latency:float = 0.01) -> tuple['BaseInput', 'BaseOutput']:
         """
-            Finds the MIDI USB interfaces for input and output
+            Finds the MIDI USB interfaces for input and output, or opens
+            network (OSC) ports in their place
+        Args:
+            usb (bool, optional): Find the USB interfaces? Defaults to True.
+            network_input (int, optional): The UDP port to receive MIDI on
+                instead of a USB input. Defaults to None (no network input).
+            network_output (tuple[str, int], optional): The host and UDP port
+                to send MIDI to instead of a USB output. Defaults to None (no
+                network output).
+            latency (float, optional): The seconds between network MIDI being
+                sent and played (see OSCInput). Defaults to 0.01.
         Returns:
             tuple[BaseInput, BaseOutput]: The MIDI input and output ports
         """
@@ -266,29 +724,51 @@ class Startup():
         input_port = None
         output_port = None
 
-        for option in mido.get_input_names():
-            if option.startswith('USB'):
-                input_port = mido.open_input(option)
-                self.print(f'Found input: {option}')
-                break
+        if network_input is not None:
+            from floppiano.network import OSCInput
+            try:
+                input_port = OSCInput(network_input, latency = latency)
+                self.print(f'Opened input: {input_port.name}')
+            except OSError as e:
+                self.print(f'Could not open the network input: {e}', 
+                           color = COLOUR_RED)
+                self.print('Continue without input interface?')
+                self.prompt_for_exit()
+                self.print('Continuing without input interface.')
+
+        if network_output is not None:
+            from floppiano.network import OSCOutput
+            output_port = OSCOutput(*network_output)
+            self.print(f'Opened output: {output_port.name}')
+
+        if usb and network_input is None:
+            import mido
+            for option in mido.get_input_names():
+                if option.startswith('USB'):
+                    input_port = mido.open_input(option)
+                    self.print(f'Found input: {option}')
+                    break
         
-        for option in mido.get_output_names():
-            if option.startswith('USB'):
-                output_port = mido.open_output(option)
-                self.print(f'Found output: {option}')
-                break
-        
-        if input_port is None:
+        if usb and network_output is None:
+            import mido
+            for option in mido.get_output_names():
+                if option.startswith('USB'):
+                    output_port = mido.open_output(option)
+                    self.print(f'Found output: {option}')
+                    break
+
+        # (A network input that failed to open was already reported)
+        if usb and input_port is None and network_input is None:
             self.print('No MIDI input interface was detected.'
-                       , color = Screen.COLOUR_RED)
+                       , color = COLOUR_RED)
             self.print('Continue without input interface?')
             self.prompt_for_exit()
             self.print('Continuing without input interface.')
             
 
-        if output_port is None:
+        if usb and output_port is None:
             self.print("No MIDI output interface was detected."
-                       , color = Screen.COLOUR_RED)
+                       , color = COLOUR_RED)
             self.print('Continue without output interface?')
             self.prompt_for_exit()
             self.print('Continuing without output interface.')
@@ -296,13 +776,36 @@ class Startup():
         self.print("Done.")
         return (input_port, output_port)
 
-    def key_pressed(self) -> KeyboardEvent:
+    def print_profile(self) -> None:
+        """
+            Prints the startup profile (see StartupProfiler) to stdout
+        """
+        print('Startup profile:')
+        for line in self.profiler.report(): print(f'    {line}')
+
+    def _screen_context(self, headless:bool):
+        # The context to create the screen with (nothing to create headless)
+        if headless: return contextlib.nullcontext()
+        from asciimatics.screen import ManagedScreen
+        from asciimatics.widgets.utilities import THEMES
+        #Remove this theme.. it does not work on Raspberry Pi (headless)
+        THEMES.pop('tlj256', None)
+        return ManagedScreen()
+
+    def _width(self) -> int:
+        # The width of the startup text
+        if self._screen is None: return HEADLESS_WIDTH
+        return self._screen.width
+
+    def key_pressed(self):
         """
             Checks for (computer) keyboard presses
         Returns:
             KeyboardEvent: Returns the Keyboard event or None if no key was 
-            pressed 
+            pressed (always None when headless)
         """
+        if self._screen is None: return None
+        from asciimatics.event import KeyboardEvent
         event = self._screen.get_event()
         if isinstance(event, KeyboardEvent): return event
         return None
@@ -330,9 +833,14 @@ class Startup():
             Asks the user to press <enter> to continue. If any other key is
             pressed the program is ended immediately 
         """
+        if self._screen is None:
+            # Nobody to ask
+            self.print('Headless, continuing.', color = COLOUR_YELLOW)
+            return
         self.print('Press <enter> to continue or any other key to quit:',
-                   color= Screen.COLOUR_YELLOW)
+                   color= COLOUR_YELLOW)
         if not self.wait_for_key(ord('\n')): 
+            from floppiano.UI.content import dead_screen
             #TODO: Handle power cycling
             dead_screen(
                 self._screen, 
@@ -351,6 +859,10 @@ class Startup():
             Defaults to False.
         """
         string = str(obj)
+        if color in (COLOUR_RED, COLOUR_YELLOW): self._warned = True
+        if self._screen is None:
+            print(string)
+            return
         # Handle text wrapping
         if len(string) > self._screen.width:
             wrapped = textwrap.wrap(string, self._screen.width)
@@ -366,19 +878,19 @@ class Startup():
         self._screen.refresh()
 
 if __name__ == '__main__': 
-    #Remove this theme.. it does not work on Raspberry Pi (headless)
-    THEMES.pop('tlj256')
-
     # Run until the app self terminates
     num_restarts = 0
     while True:
         # Get the app from the startup/bootstrap to detect all devices etc
-        floppiano_app = Startup().get_app()        
+        startup = Startup()
+        floppiano_app = startup.get_app(restart = num_restarts > 0)
         # If the app has been restarted force off the splash screen
         if num_restarts > 0: floppiano_app._splash_start = False
         # FlopPiano.run() will block until the app has terminated. 
         # if run() returns true, the app wants to be restarted.
-        if floppiano_app.run(): num_restarts +=1
+        restart = floppiano_app.run()
+        if startup.profile_pending: startup.print_profile()
+        if restart: num_restarts +=1
         else: break
 
 
@@ -0,0 +1,104 @@
+import time
+from typing import Callable
+
+"""
+                              Metrics Registry:
+
+A place for the parts of the FlopPiano to publish what they are doing without
+knowing who (if anyone) is watching. Counters and values are plain dictionary
+updates, so publishing is cheap. The cost of turning them into something to
+look at (ex. rates, gauges) is paid by the reader when it takes a snapshot.
+
+Names are '<part>.<metric>', ex.
+    engine.loops                - Engine.update() calls
+    messages.<source>           - MIDI messages handled from a source
+    bus.reads / bus.writes      - I2C reads/writes (a batch counts each write)
+    bus.errors                  - Failed I2C reads/writes
+    bus.dropped                 - Writes dropped by open circuit breakers
+    synth.rolled                - Notes the synth could not play
+    synth.active_voices         - Voices playing a note (gauge)
+    synth.available_voices      - Voices free to play a note (gauge)
+    midi_player.lateness        - How late (seconds) the last .mid event was
+"""
+
+
+class MetricsRegistry():
+    """
+        Holds counters, values and gauges. Counters are not locked, a count
+        can (rarely) be lost when two threads count the same name at once.
+    """
+
+    def __init__(self) -> None:
+        self._counters:dict[str, int] = {}
+        self._values:dict[str, float] = {}
+        self._gauges:dict[str, Callable[[], float]] = {}
+
+    def count(self, name:str, amount:int = 1) -> None:
+        """
+            Adds to a counter
+        Args:
+            name (str): The name of the counter
+            amount (int, optional): The amount to add. Defaults to 1.
+        """
+        self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set(self, name:str, value:float) -> None:
+        """
+            Sets a value
+        Args:
+            name (str): The name of the value
+            value (float): The value
+        """
+        self._values[name] = value
+
+    def gauge(self, name:str, function:Callable[[], float]) -> None:
+        """
+            Sets a function that is called for a value when a snapshot is taken
+            (on the snapshot's thread, so it should only read)
+        Args:
+            name (str): The name of the value
+            function (Callable[[], float]): Returns the value
+        """
+        self._gauges[name] = function
+
+    def snapshot(self) -> tuple[float, dict[str, float]]:
+        """
+            Returns the time.perf_counter() time and a copy of all counters,
+            values and gauges
+        """
+        metrics = dict(self._counters)
+        metrics.update(self._values)
+        for name, function in list(self._gauges.items()):
+            metrics[name] = function()
+        return (time.perf_counter(), metrics)
+
+    def clear(self) -> None:
+        """
+            Removes all counters, values and gauges
+        """
+        self._counters = {}
+        self._values = {}
+        self._gauges = {}
+
+    @staticmethod
+    def rates(
+        old:tuple[float, dict[str, float]],
+        new:tuple[float, dict[str, float]]) -> dict[str, float]:
+        """
+            Returns the per second rate of each counter between two snapshots
+        Args:
+            old (tuple[float, dict[str, float]]): The older snapshot
+            new (tuple[float, dict[str, float]]): The newer snapshot
+        Returns:
+            dict[str, float]: The rate of each counter in the newer snapshot
+        """
+        old_time, old_metrics = old
+        new_time, new_metrics = new
+        elapsed = new_time - old_time
+        if elapsed <= 0: return {}
+        return {name: (value - old_metrics.get(name, 0)) / elapsed
+                for name, value in new_metrics.items()}
+
+
+# The registry everything publishes to
+registry = MetricsRegistry()
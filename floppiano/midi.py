@@ -1,6 +1,11 @@
 import math
 import time
+import random
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from mido import Message, MetaMessage, MidiFile
+import floppiano.metrics as metrics
+from floppiano.reduction import VoiceReducer
 
 class MIDIUtil():
     """
@@ -464,23 +469,46 @@ class MIDIParser():
 class MIDIPlayer():
     '''
         A simple class to play .mid files in a single thread in a non-blocking
-        way via regular update() calls
+        way via regular update() calls. Files can also be played one after
+        another from a playlist, the next file is parsed on a worker thread
+        while the current one plays.
     '''
 
-    def __init__(self, on_stop=None) -> None:
+    def __init__(self, on_stop=None, reducer = None) -> None:
         """
             Creates a MIDI Player
         Args:
             on_stop (callable): A a callback function that gets called when 
-            the MIDIPlayer stops playing. Defaults to None.
+            the MIDIPlayer stops playing a file (including between playlist
+            files). Defaults to None.
+            reducer (VoiceReducer, optional): Reduces files to a number of 
+                voices (see play()). Defaults to None (a VoiceReducer without
+                a cache file).
         """
+        self.logger = logging.getLogger(__name__)
         self._on_stop = on_stop
+        if reducer is None: reducer = VoiceReducer()
+        self._reducer = reducer
         self._playing = False
         self._messages = None
         self._next_time = 0.0
         self._index = 0
         self._start_time = None
         self._file_path = None
+        self._last_file_path = None
+
+        # The files to play after the current one
+        self._playlist:list[str] = []
+        # The files played (and playing) since the playlist last started over
+        # (to repeat)
+        self._played:list[str] = []
+        self.shuffle = False # Shuffle the playlist when it repeats?
+        self.repeat = False # Repeat the playlist when it ends?
+        # The redirect, transpose, channels and voices of the playlist files
+        self._playlist_args = (-1, 0, None, None)
+        # The next playlist file and its messages (a Future) being prepared
+        self._next:tuple[str, Future] = None
+        self._executor:ThreadPoolExecutor = None
 
     def update(self) -> Message:
         """
@@ -491,17 +519,23 @@ class MIDIPlayer():
             a message is available.
         """
         if not self.playing: return None
+        # Between playlist files, wait for the next one to be prepared
+        if self._messages is None and not self._advance(): return None
         
         elapsed_time = time.time() - self._start_time
 
         if elapsed_time > self._next_time:
             # It's time to play a message
+            metrics.registry.set(
+                'midi_player.lateness', elapsed_time - self._next_time)
             msg_to_play = self._messages[self._index]
             
             self._index +=1  
             if self._index > (len(self._messages) -1):
-                # Reached the end of the messages so stop playing
-                self.stop()
+                # Reached the end of the messages so play the next playlist
+                # file or stop playing
+                if self._has_next(): self._file_done()
+                else: self.stop()
             else:
                 # When should we play the next message?
                 self._next_time += self._messages[self._index].time
@@ -510,7 +544,13 @@ class MIDIPlayer():
         
         return None
                     
-    def play(self, file_path:str, redirect:int = -1, transpose:int = 0):
+    def play(
+        self, 
+        file_path:str, 
+        redirect:int = -1, 
+        transpose:int = 0, 
+        channels:list[int] = None,
+        voices:int = None):
         """
             Preps the MIDIPlayer to generate messages on update() calls.
         Args:
@@ -520,6 +560,13 @@ class MIDIPlayer():
                 channel. Defaults to -1 (No redirect).
             transpose (int, optional): A number of MIDI notes to transpose when
                 a note_on or note_off is read. Defaults to 0.
+            channels (list[int], optional): The MIDI channels to play, messages
+                of other channels are left out (see MIDILibrary.arrange()), of
+                the files queued while it plays too. Defaults to None (all 
+                channels).
+            voices (int, optional): The most notes to play at once, notes are
+                left out ahead of time (see VoiceReducer) so that none are
+                rolled. Defaults to None (play every note).
 
         Raises:
             RuntimeError: If the MIDIPlayer is already in the process of playing
@@ -528,37 +575,114 @@ class MIDIPlayer():
         if self.playing:
             raise RuntimeError("MIDI player is already playing")
 
+        self._begin(
+            file_path, 
+            self._prepare(file_path, redirect, transpose, channels, voices))
+        self._played.append(file_path)
+        # Files queued while this one plays are played the same way
+        self._set_playlist_args((redirect, transpose, channels, voices))
+
+    def play_playlist(
+        self, 
+        redirect:int = -1, 
+        transpose:int = 0, 
+        channels:list[int] = None,
+        voices:int = None):
+        """
+            Plays the playlist files one after another (see queue()). Each file
+            is parsed while the one before it plays.
+        Args:
+            redirect (int, optional): The MIDI channel to redirect all MIDI to.
+                Defaults to -1 (No redirect).
+            transpose (int, optional): A number of MIDI notes to transpose. 
+                Defaults to 0.
+            channels (list[int], optional): The MIDI channels to play. Defaults
+                to None (all channels).
+            voices (int, optional): The most notes to play at once. Defaults 
+                to None (play every note).
+
+        Raises:
+            RuntimeError: If the MIDIPlayer is already in the process of playing
+        """
+        if self.playing:
+            raise RuntimeError("MIDI player is already playing")
+        self._set_playlist_args((redirect, transpose, channels, voices))
+        self._playing = True
+        self._prepare_next()
+
+    def queue(self, file_path:str):
+        """
+            Adds a file to the end of the playlist
+        Args:
+            file_path (str): The file path to the .mid file
+        """
+        self._playlist.append(file_path)
+        if self.playing: self._prepare_next()
+
+    def skip(self):
+        """
+            Stops the current file and plays the next playlist file (if any)
+        """
+        if not self.playing or self._messages is None: return
+        if self._has_next(): self._file_done()
+        else: self.stop()
+
+    def clear_playlist(self):
+        """
+            Removes every file from the playlist
+        """
+        self._playlist = []
+        self._played = []
+        self._next = None
+
+    @staticmethod
+    def prepare(
+        file_path:str, 
+        redirect:int = -1, 
+        transpose:int = 0, 
+        channels:list[int] = None) -> list[Message]:
+        """
+            Reads the messages to play from a .mid file (see play())
+        Args:
+            file_path (str): The file path to the .mid file
+            redirect (int, optional): The MIDI channel to redirect all MIDI to.
+                Defaults to -1 (No redirect).
+            transpose (int, optional): A number of MIDI notes to transpose. 
+                Defaults to 0.
+            channels (list[int], optional): The MIDI channels to play. Defaults
+                to None (all channels).
+        Returns:
+            list[Message]: The messages (without MetaMessages) to play
+        """
         mid_file = MidiFile(file_path)
 
         #Prepare the messages
-        self._messages = []
+        messages = []
+        # The time of the left out messages, added to the next message played
+        skipped_time = 0.0
         for msg in mid_file:
-            # ignore all MetaMessages 
-            if not isinstance(msg, MetaMessage):
-                # Redirect if needed
-                if redirect!=-1 and MIDIUtil.hasChannel(msg):
-                    msg.channel = redirect    
-                # Transpose if needed
-                if (msg.type == "note_on" or msg.type =="note_off"):
-                    msg.note = msg.note + transpose        
-                self._messages.append(msg)
-
-        self._playing = True
-        self._next_time = 0.0
-        self._index = 0
-        self._start_time = time.time()
-        self._file_path = file_path
+            # ignore all MetaMessages and the channels not played
+            if isinstance(msg, MetaMessage) or (channels is not None and 
+                MIDIUtil.hasChannel(msg) and msg.channel not in channels):
+                skipped_time += msg.time
+                continue
+            msg.time += skipped_time
+            skipped_time = 0.0
+            # Redirect if needed
+            if redirect!=-1 and MIDIUtil.hasChannel(msg):
+                msg.channel = redirect    
+            # Transpose if needed
+            if (msg.type == "note_on" or msg.type =="note_off"):
+                msg.note = msg.note + transpose        
+            messages.append(msg)
+        return messages
     
     def stop(self):
         """
-            Stops and resets the MIDIPlayer
+            Stops and resets the MIDIPlayer. The rest of the playlist is kept.
         """
-        self._playing = False
-        self._messages = None
-        self._next_time = 0.0
-        self._index = 0
-        self._start_time = None
-        self._file_path = None
+        if self._playing: self._last_file_path = self._file_path
+        self._reset()
         
         if self._on_stop is not None:
             self._on_stop()
@@ -571,6 +695,121 @@ class MIDIPlayer():
     def file_path(self) -> str:
         return self._file_path
 
+    @property
+    def last_file_path(self) -> str:
+        """
+            The path of the last file that stopped playing
+        """
+        return self._last_file_path
+
+    @property
+    def playlist(self) -> list[str]:
+        """
+            The files that will be played after the current one
+        """
+        return list(self._playlist)
+
+    def _set_playlist_args(self, args:tuple) -> None:
+        # Set the arguments the playlist files are prepared with
+        if self._playlist_args != args:
+            # Prepared with the wrong arguments
+            self._playlist_args = args
+            self._next = None
+
+    def _prepare(
+        self, 
+        file_path:str, 
+        redirect:int, 
+        transpose:int, 
+        channels:list[int], 
+        voices:int) -> list[Message]:
+        # The messages to play, reduced to the voices (if any)
+        messages = MIDIPlayer.prepare(file_path, redirect, transpose, channels)
+        if voices is None: return messages
+        return self._reducer.reduce(
+            file_path, messages, voices, channels, redirect)
+
+    def _reset(self) -> None:
+        # Not playing anything
+        self._playing = False
+        self._messages = None
+        self._next_time = 0.0
+        self._index = 0
+        self._start_time = None
+        self._file_path = None
+
+    def _begin(self, file_path:str, messages:list[Message]) -> None:
+        # Start playing the messages
+        self._messages = messages
+        self._playing = True
+        self._next_time = 0.0
+        self._index = 0
+        self._start_time = time.time()
+        self._file_path = file_path
+
+    def _file_done(self) -> None:
+        # The current file ended (or was skipped), wait for the next one
+        self._last_file_path = self._file_path
+        self._messages = None
+        self._file_path = None
+        if self._on_stop is not None:
+            self._on_stop()
+        self._advance()
+
+    def _has_next(self) -> bool:
+        # Is there a playlist file to play next?
+        return len(self._playlist) > 0 or \
+            (self.repeat and len(self._played) > 0)
+
+    def _prepare_next(self) -> None:
+        # Parse the next playlist file on the worker thread
+        if self._next is not None: return
+        if len(self._playlist) == 0 and self.repeat:
+            # Play the playlist again (the playing file is in it too)
+            self._playlist = self._played
+            self._played = []
+            if self.shuffle: 
+                random.shuffle(self._playlist)
+                # Don't play the same file twice in a row
+                if len(self._playlist) > 1 and \
+                    self._playlist[0] == self._file_path:
+                    self._playlist.append(self._playlist.pop(0))
+        if len(self._playlist) == 0: return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers = 1, thread_name_prefix = 'MIDIPlayer')
+        file_path = self._playlist[0]
+        self._next = (file_path, self._executor.submit(
+            self._prepare, file_path, *self._playlist_args))
+
+    def _advance(self) -> bool:
+        # Start the next playlist file if it's prepared, returns True if it
+        # started. Stops if the playlist is done (the last file already 
+        # called on_stop).
+        self._prepare_next()
+        if self._next is None:
+            self._reset()
+            self._played = []
+            return False
+        file_path, future = self._next
+        if not future.done(): return False
+
+        self._next = None
+        self._playlist.pop(0)
+        try:
+            messages = future.result()
+        except Exception as e:
+            # Skip the files that can't be read
+            self.logger.warning(f"Could not play '{file_path}': {e}")
+            return False
+        self._played.append(file_path)
+        if len(messages) == 0: return False
+        self._begin(file_path, messages)
+        # Parse the file after this one while it plays
+        self._prepare_next()
+        return True
+
     @staticmethod
     def blocking_play(synth, 
                       mid_file:str, 
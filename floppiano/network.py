@@ -0,0 +1,274 @@
+import time
+import heapq
+import socket
+import struct
+import logging
+from collections import deque
+from mido import Message
+from mido.ports import BaseInput, BaseOutput
+
+"""
+                              Network MIDI (OSC):
+
+MIDI sent over UDP as OSC (Open Sound Control 1.0). Each MIDI message is an
+OSC bundle whose timetag is when the message was sent, holding one '/midi'
+OSC message:
+    b'#bundle\\0'                     - The bundle header
+    <II timetag                     - The send time (NTP: seconds since 1900
+                                      and fractions of a second)
+    >i  size                        - The size of the OSC message
+    b'/midi\\0\\0\\0'                   - The OSC address
+    b',m\\0\\0' + 4 bytes             - A MIDI message of up to 3 bytes (port
+                                      id 0, status, data 1, data 2)
+    or b',b\\0\\0' + blob             - Longer MIDI messages (ex. sysex), the
+                                      blob is >i size + bytes (padded to 4)
+
+'/midi' OSC messages that are not in a bundle (or have the 'immediately'
+timetag) are taken as sent when they were received.
+"""
+
+# Seconds from 1900 (NTP) to 1970 (unix time)
+NTP_DELTA = 2208988800
+# The 'immediately' timetag
+IMMEDIATELY = 1
+BUNDLE = b'#bundle\0'
+ADDRESS = b'/midi\0\0\0'
+# The number of messages the clock offset (see OSCInput) is the smallest of
+OFFSET_WINDOW = 256
+
+
+def _logger() -> logging.Logger:
+    # Looked up when used: the ports are opened before the logfile is set up
+    # (which disables the loggers that exist by then, see Startup)
+    return logging.getLogger(__name__)
+
+
+class OSCInput(BaseInput):
+    """
+        A mido input port that receives MIDI as OSC over UDP (see
+        floppiano.network). A jitter buffer plays each message a fixed latency
+        after it was sent (instead of as it was received) so that the network
+        does not change the timing between messages.
+    """
+
+    def __init__(
+        self,
+        port:int,
+        host:str = '0.0.0.0',
+        latency:float = 0.01) -> None:
+        """
+            Creates an OSCInput
+        Args:
+            port (int): The UDP port to receive on
+            host (str, optional): The address to receive on. Defaults to
+                '0.0.0.0' (every interface).
+            latency (float, optional): The seconds between a message being sent
+                and it being played. Defaults to 0.01. 0 plays messages as
+                they are received.
+
+        Raises:
+            OSError: If the port can not be used
+        """
+        BaseInput.__init__(
+            self, f'OSC {host}:{port}', port=port, host=host, latency=latency)
+
+    def _open(self, port:int, host:str, latency:float) -> None:
+        self.latency = max(latency, 0)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((host, port))
+        self._socket.setblocking(False)
+        # The messages waiting to be played: (send time, arrival order, msg)
+        self._buffer:list[tuple[float, int, Message]] = []
+        self._order = 0
+        # The (arrival - send) time of the latest messages, the smallest is
+        # the clock difference to the sender plus the fastest trip
+        self._offsets = deque(maxlen = OFFSET_WINDOW)
+        self._offset = 0.0
+        # Message counts
+        self.received = 0
+        self.late = 0
+        self.errors = 0
+
+    def _close(self) -> None:
+        self._socket.close()
+        _logger().info(
+            f'{self.name}: {self.received} messages received, {self.late} '
+            f'late, {self.errors} errors')
+
+    def _receive(self, block:bool = True) -> None:
+        # Buffers the received messages, hands the ones due to mido
+        while True:
+            try:
+                data, _ = self._socket.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                _logger().debug(f'{self.name} receive failed: {e}')
+                continue
+            now = time.time()
+            try:
+                entries = unpack(data)
+            except ValueError as e:
+                self.errors += 1
+                _logger().debug(f'{self.name}: bad packet: {e}')
+                continue
+            for msg, sent in entries:
+                self._buffer_message(msg, now if sent is None else sent, now)
+
+        # Play the messages in the order they were sent, once due
+        deadline = time.time() - self._offset - self.latency
+        while self._buffer and self._buffer[0][0] <= deadline:
+            self._messages.append(heapq.heappop(self._buffer)[2])
+
+    def _buffer_message(self, msg:Message, sent:float, now:float) -> None:
+        # Holds a message until a fixed latency after it was sent
+        self.received += 1
+        if self.latency == 0:
+            self._messages.append(msg)
+            return
+        self._offsets.append(now - sent)
+        self._offset = min(self._offsets)
+        # Arrived later than the latency allows, it plays now
+        if sent + self._offset + self.latency < now: self.late += 1
+        heapq.heappush(self._buffer, (sent, self._order, msg))
+        self._order += 1
+
+
+class OSCOutput(BaseOutput):
+    """
+        A mido output port that sends MIDI as OSC over UDP, each message
+        stamped with the time it was sent (see floppiano.network)
+    """
+
+    def __init__(self, host:str, port:int) -> None:
+        """
+            Creates an OSCOutput
+        Args:
+            host (str): The host to send to
+            port (int): The UDP port to send to
+        """
+        BaseOutput.__init__(self, f'OSC {host}:{port}', host=host, port=port)
+
+    def _open(self, host:str, port:int) -> None:
+        self._address = (host, port)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Message counts
+        self.sent = 0
+        self.errors = 0
+
+    def _close(self) -> None:
+        self._socket.close()
+        _logger().info(
+            f'{self.name}: {self.sent} messages sent, {self.errors} errors')
+
+    def _send(self, msg:Message) -> None:
+        try:
+            self._socket.sendto(pack(msg, time.time()), self._address)
+            self.sent += 1
+        except OSError as e:
+            # Nobody is listening (yet), the message is lost like on an
+            # unplugged MIDI cable
+            self.errors += 1
+            _logger().debug(f'{self.name} send failed: {e}')
+
+
+def pack(msg:Message, sent:float = None) -> bytes:
+    """
+        Packs a MIDI message as OSC (see floppiano.network)
+    Args:
+        msg (Message): The MIDI message
+        sent (float, optional): When it was sent (seconds since the epoch).
+            Defaults to None (an OSC message without a bundle).
+
+    Returns:
+        bytes: The datagram
+    """
+    data = bytes(msg.bytes())
+    if len(data) <= 3:
+        osc = ADDRESS + b',m\0\0' + b'\0' + data.ljust(3, b'\0')
+    else:
+        osc = ADDRESS + b',b\0\0' + struct.pack('>i', len(data)) + \
+            data.ljust((len(data) + 3) // 4 * 4, b'\0')
+    if sent is None: return osc
+    seconds = int(sent)
+    timetag = struct.pack(
+        '>II',
+        (seconds + NTP_DELTA) & 0xFFFFFFFF,
+        int((sent - seconds) * (1 << 32)) & 0xFFFFFFFF)
+    return BUNDLE + timetag + struct.pack('>i', len(osc)) + osc
+
+
+def unpack(data:bytes, sent:float = None) -> list[tuple[Message, float]]:
+    """
+        Unpacks the MIDI messages of an OSC datagram (see floppiano.network),
+        other OSC messages are skipped
+    Args:
+        data (bytes): The datagram
+        sent (float, optional): When the enclosing bundle was sent. Defaults
+            to None (not in a bundle).
+
+    Raises:
+        ValueError: If the datagram is not OSC
+
+    Returns:
+        list[tuple[Message, float]]: The MIDI messages and when they were sent
+            (seconds since the epoch, None if not known)
+    """
+    if data.startswith(BUNDLE):
+        if len(data) < 16: raise ValueError('Truncated OSC bundle')
+        seconds, fraction = struct.unpack_from('>II', data, 8)
+        if (seconds << 32 | fraction) != IMMEDIATELY:
+            sent = seconds - NTP_DELTA + fraction / (1 << 32)
+        messages = []
+        offset = 16
+        while offset < len(data):
+            if offset + 4 > len(data): raise ValueError('Truncated OSC bundle')
+            (size,) = struct.unpack_from('>i', data, offset)
+            offset += 4
+            if size < 0 or offset + size > len(data):
+                raise ValueError('Truncated OSC bundle')
+            messages.extend(unpack(data[offset:offset + size], sent))
+            offset += size
+        return messages
+
+    address, offset = _string(data, 0)
+    if address != '/midi': return []
+    tags, offset = _string(data, offset)
+    if not tags.startswith(','): raise ValueError('No OSC type tags')
+    messages = []
+    for tag in tags[1:]:
+        if tag == 'm':
+            if offset + 4 > len(data): raise ValueError('Truncated OSC message')
+            midi = data[offset + 1:offset + 4]
+            offset += 4
+            # (Up to 3 bytes, the rest is padding)
+            length = _midi_length(midi[0])
+            messages.append((Message.from_bytes(midi[:length]), sent))
+        elif tag == 'b':
+            if offset + 4 > len(data): raise ValueError('Truncated OSC message')
+            (size,) = struct.unpack_from('>i', data, offset)
+            offset += 4
+            if size < 0 or offset + size > len(data):
+                raise ValueError('Truncated OSC message')
+            messages.append(
+                (Message.from_bytes(data[offset:offset + size]), sent))
+            offset += (size + 3) // 4 * 4
+        else:
+            # Only MIDI arguments are expected
+            raise ValueError(f"Unsupported OSC type tag '{tag}'")
+    return messages
+
+
+def _string(data:bytes, offset:int) -> tuple[str, int]:
+    # Reads an OSC string, returns it and the offset after its padding
+    end = data.find(b'\0', offset)
+    if end < 0: raise ValueError('Unterminated OSC string')
+    return data[offset:end].decode('ascii'), (end + 4) // 4 * 4
+
+
+def _midi_length(status:int) -> int:
+    # The length of a MIDI message (of up to 3 bytes) by its status byte
+    if status < 0x80: raise ValueError('Not a MIDI status byte')
+    if status < 0xF0:
+        return 2 if status & 0xF0 in (0xC0, 0xD0) else 3
+    return {0xF1: 2, 0xF2: 3, 0xF3: 2}.get(status, 1)
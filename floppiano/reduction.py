@@ -0,0 +1,267 @@
+import os
+import json
+import logging
+from threading import Lock
+from mido import Message
+
+"""
+                              Reduction Cache:
+
+A JSON object recording the plan (see VoiceReducer.plan()) that reduced a .mid
+file's notes to a number of voices, so a file is only planned once per number
+of voices (and channels played and redirect). A file's plans are thrown away when it
+changes (by size and modification time).
+
+Ex.
+{
+    "version": 1,
+    "files": {
+        "assets/MIDI/song.mid": {
+            "mtime": 1723100000.0,
+            "size": 9574,
+            "plans": {
+                "4 all -1": {"dropped": [12, 40], "cut": [[8, 16]]},
+                "2 0,1 0": {"dropped": [3, 12, 40], "cut": []}
+            }
+        }
+    }
+}
+"""
+
+# Bumped when the plans change, older caches are thrown away
+CACHE_VERSION = 1
+
+
+class VoiceReducer():
+    """
+        Reduces the notes of a .mid file (its messages, see
+        MIDIPlayer.prepare()) so that no more than a number of voices ever
+        sound at once. The whole file is planned ahead: the highest (melody) and
+        lowest (bass) sounding notes are kept, inner notes that double a
+        sounding note are merged into it and the other inner notes are dropped,
+        or cut short to make room for a new melody or bass note. Plans are
+        cached per file, number of voices, channels and redirect.
+    """
+
+    def __init__(self, cache_file:str = None) -> None:
+        """
+            Creates a VoiceReducer
+        Args:
+            cache_file (str, optional): The path to the cache (JSON) file.
+                Defaults to None (plans are only kept in memory).
+        """
+        self.logger = logging.getLogger(__name__)
+        self._cache_file = cache_file
+        # Reduce is called from the MIDIPlayer's worker thread too
+        self._lock = Lock()
+        self._files:dict[str, dict] = None
+        # Are there plans that are not saved?
+        self._changed = False
+
+    def reduce(
+        self,
+        file_path:str,
+        messages:list[Message],
+        voices:int,
+        channels:list[int] = None,
+        redirect:int = -1) -> list[Message]:
+        """
+            Reduces a .mid file's messages to a number of voices, using the
+            cached plan if there is one
+        Args:
+            file_path (str): The path to the .mid file the messages are from
+            messages (list[Message]): The file's messages (see
+                MIDIPlayer.prepare())
+            voices (int): The most notes to sound at once
+            channels (list[int], optional): The channels the messages were
+                prepared with. Defaults to None (all channels).
+            redirect (int, optional): The redirect the messages were prepared
+                with. Defaults to -1 (No redirect).
+
+        Raises:
+            ValueError: If voices is less than one
+
+        Returns:
+            list[Message]: The reduced messages
+        """
+        if voices < 1: raise ValueError('Can not reduce to less than 1 voice')
+        key = ' '.join((
+            str(voices),
+            'all' if channels is None else ','.join(map(str, channels)),
+            str(redirect)))
+        try:
+            stat = os.stat(file_path)
+            version = (stat.st_mtime, stat.st_size)
+        except OSError:
+            version = None
+
+        with self._lock:
+            if self._files is None: self._files = self._load_cache()
+            entry = self._files.get(file_path)
+            if entry is None or (entry['mtime'], entry['size']) != version:
+                entry = None
+            plan = None if entry is None else entry['plans'].get(key)
+
+        if plan is None:
+            plan = VoiceReducer.plan(messages, voices)
+            if len(plan['dropped']) + len(plan['cut']) > 0:
+                self.logger.info(
+                    f"Reduced '{file_path}' to {voices} voices: "
+                    f"{len(plan['dropped'])} notes dropped, "
+                    f"{len(plan['cut'])} cut short")
+            if version is not None:
+                with self._lock:
+                    if entry is None:
+                        mtime, size = version
+                        entry = {'mtime': mtime, 'size': size, 'plans': {}}
+                        self._files[file_path] = entry
+                    entry['plans'][key] = plan
+                    self._changed = True
+        return VoiceReducer.apply(messages, plan)
+
+    def save(self) -> None:
+        """
+            Saves the plans made since the last save to the cache file (if any)
+        """
+        if self._cache_file is None: return
+        with self._lock:
+            if not self._changed: return
+            data = json.dumps({'version': CACHE_VERSION, 'files': self._files})
+            self._changed = False
+        try:
+            directory = os.path.dirname(self._cache_file)
+            if directory != '': os.makedirs(directory, exist_ok=True)
+            with open(self._cache_file, 'w', encoding='utf8') as file:
+                file.write(data)
+        except OSError:
+            # Not fatal, the files are planned again next time
+            pass
+
+    @staticmethod
+    def plan(messages:list[Message], voices:int) -> dict:
+        """
+            Plans which notes to leave out so that no more than a number of
+            voices sound at once (in the order the messages are played). Notes
+            are told apart by note number only (a synth plays one note once, 
+            whatever the channel).
+        Args:
+            messages (list[Message]): The messages
+            voices (int): The most notes to sound at once
+
+        Returns:
+            dict: The indexes of the note_on messages to leave out ('dropped',
+                their note_off is left out too) and the [index, before] of the
+                note_on messages whose notes end early ('cut'), just before the
+                message at the 'before' index.
+        """
+        dropped = []
+        cut = []
+        # The time of each message (notes starting at the same time are a 
+        # chord)
+        times = []
+        time = 0.0
+        for msg in messages:
+            time += msg.time
+            times.append(time)
+
+        # The sounding notes: [note, note_on index, note_off index]
+        sounding:list[list] = []
+        for on, off in VoiceReducer._notes(messages):
+            note = messages[on].note
+            sounding = [playing for playing in sounding if playing[2] > on]
+            if any(playing[0] == note for playing in sounding):
+                # Merge into the same note that is already sounding
+                dropped.append(on)
+                continue
+            new = [note, on, off]
+            if len(sounding) < voices:
+                sounding.append(new)
+                continue
+
+            # Keep the melody (highest) and bass (lowest, with 2+ voices)
+            notes = sorted(playing[0] for playing in sounding + [new])
+            kept = {notes[-1]} if voices == 1 else {notes[0], notes[-1]}
+            if note not in kept:
+                # Drop the new inner note
+                dropped.append(on)
+                continue
+            # Cut an inner note short, preferring one that doubles another
+            # note (in another octave) and then the one sounding the longest
+            inner = [playing for playing in sounding if playing[0] not in kept]
+            classes = [playing[0] % 12 for playing in sounding + [new]]
+            victim = min(inner, key = lambda playing: (
+                classes.count(playing[0] % 12) == 1, playing[1]))
+            sounding.remove(victim)
+            # (A note of the same chord is dropped instead)
+            if times[victim[1]] == times[on]: dropped.append(victim[1])
+            else: cut.append([victim[1], on])
+            sounding.append(new)
+        return {'dropped': dropped, 'cut': cut}
+
+    @staticmethod
+    def apply(messages:list[Message], plan:dict) -> list[Message]:
+        """
+            Leaves out the notes of a plan (see plan())
+        Args:
+            messages (list[Message]): The messages that were planned
+            plan (dict): The plan
+
+        Returns:
+            list[Message]: The messages without the dropped notes, with the
+                cut notes ending early
+        """
+        if len(plan['dropped']) == 0 and len(plan['cut']) == 0:
+            return messages
+        dropped = set(plan['dropped'])
+        # The note_on indexes of the notes that end before each message
+        cut:dict[int, list[int]] = {}
+        for on, before in plan['cut']: cut.setdefault(before, []).append(on)
+        # The note_off indexes of the notes left out or ended early
+        removed = set()
+        ended = {on for on, _ in plan['cut']}
+        for on, off in VoiceReducer._notes(messages):
+            if on in dropped or on in ended: removed.add(off)
+
+        reduced = []
+        # The time of the messages left out, added to the next message
+        skipped_time = 0.0
+        for index, msg in enumerate(messages):
+            skipped_time += msg.time
+            for on in cut.get(index, []):
+                reduced.append(Message(
+                    'note_off', 
+                    channel = messages[on].channel, 
+                    note = messages[on].note,
+                    time = skipped_time))
+                skipped_time = 0.0
+            if index in dropped or index in removed: continue
+            reduced.append(msg.copy(time = skipped_time))
+            skipped_time = 0.0
+        return reduced
+
+    @staticmethod
+    def _notes(messages:list[Message]):
+        # Yields the note_on and note_off index of each note, in order of 
+        # their start. Notes that never end have the index after the last 
+        # message.
+        pending:dict[tuple[int, int], list[int]] = {}
+        ends = {}
+        for index, msg in enumerate(messages):
+            if msg.type == 'note_on' and msg.velocity > 0:
+                pending.setdefault((msg.channel, msg.note), []).append(index)
+                ends[index] = len(messages)
+            elif msg.type in ('note_on', 'note_off'):
+                started = pending.get((msg.channel, msg.note))
+                if started: ends[started.pop(0)] = index
+        yield from ends.items()
+
+    def _load_cache(self) -> dict[str, dict]:
+        # The cached plans, nothing if there is no (usable) cache
+        if self._cache_file is None: return {}
+        try:
+            with open(self._cache_file, encoding='utf8') as file:
+                cache = json.load(file)
+            if cache.get('version') != CACHE_VERSION: return {}
+            return dict(cache['files'])
+        except (OSError, ValueError, AttributeError, KeyError, TypeError):
+            return {}
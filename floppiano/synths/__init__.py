@@ -1,3 +1,4 @@
 from floppiano.synths.synth import (
     Synth, CommandMap, OUTPUT_MODES, PITCH_BEND_RANGES, MODULATION_WAVES)
-from floppiano.synths.drive_synth import DriveSynth
+from floppiano.synths.drive_synth import DriveSynth, RANGE_POLICIES
+from floppiano.synths.router import SynthRouter
@@ -1,6 +1,18 @@
+import time
 from floppiano.midi import MIDIUtil
-from floppiano.devices import Drives
-from floppiano.synths import Synth, PITCH_BEND_RANGES
+from floppiano.devices import Drives, DriveCalibration
+from floppiano.synths import Synth, PITCH_BEND_RANGES, MODULATION_WAVES
+from floppiano.synths.scheduler import TickScheduler
+from floppiano.synths.lfo import LFO
+from floppiano.synths.glide import Glide
+
+# The fastest modulation frequency (Hz) reachable via the modulation wheel
+MAX_MODULATION_FREQUENCY = 16
+# The glide time (in seconds) of one step of the glide property
+GLIDE_TIME_STEP = 0.02
+
+# What a DriveSynth does with a note that a voice can't play
+RANGE_POLICIES = ['reroute', 'fold']
 
 
 class DriveVoice():
@@ -9,34 +21,81 @@ class DriveVoice():
         to make them a act single synth voice and manages I2C calls to do so. 
     """
 
-    def __init__(self, addresses:tuple[int]) -> None:
+    def __init__(
+        self, 
+        addresses:tuple[int], 
+        calibration:DriveCalibration = None) -> None:
         """
             A DriveVoice is an object that encapsulates one or more floppy drives
             to make them a act single synth voice and manages I2C calls to do so
         Args:
             addresses (tuple[int]): The iterable list/tuple of floppy drive 
                 I2C addresses to use.
+            calibration (DriveCalibration, optional): The tuning of the floppy
+                drives. Defaults to None (drives are in tune).
         """
         #Should only be set once.
-        self._addresses = addresses
+        self._all_addresses = tuple(addresses)
+        # The addresses of the drives that are online (see exclude())
+        self._addresses = self._all_addresses
+        if calibration is None: calibration = DriveCalibration()
+        self._calibration = calibration
+        # Set the playable notes and fold table
+        self._gen_tables()
         #public, can set be at anytime
         self.source = None
+        #public, the note that was asked for (before folding)
+        self.requested_note = None
         # set by note setter/getter
         self._frequency = None
+        # set by note setter, the time the note started (for modulation)
+        self.start_time = None
+        # The pitch bend offset in 'n' (set by pitch_bend())
+        self._bend = 0
+        # public, an offset in Hz added by modulation (LFO)
+        self.offset = 0.0
+        # The timer TOP (of the tuned frequency) each drive was last sent, by
+        # address
+        self._tops:dict[int, int] = {}
+        # set by note setter/getter
+        self._note = None
+        # The 'n' value to glide from and the glide time (set by glide())
+        self._glide_from = None
+        self._glide_time = 0.0
   
     @property
     def addresses(self) -> list[int]:
         """
             The I2C address of the floppy drives being used for the DriveVoice. 
+            (Excludes offline drives)
         """
         return self._addresses
+
+    def exclude(self, offline:set[int]) -> bool:
+        """
+            Stops using the offline floppy drives and starts using again any of
+            the DriveVoice's drives that are no longer offline. A DriveVoice
+            with no online drives can't play any note.
+        Args:
+            offline (set[int]): The I2C addresses of the offline drives
+
+        Returns:
+            bool: True if the drives being used changed
+        """
+        addresses = tuple(
+            address for address in self._all_addresses 
+            if address not in offline)
+        if addresses == self._addresses: return False
+        self._addresses = addresses
+        self._gen_tables()
+        return True
     
     @property
     def note(self) -> int:
         """
             Gets the current MIDI note of the DriveVoice
         """
-        return MIDIUtil.freq2MIDI(self._frequency)
+        return self._note
     
     @note.setter
     def note(self, note:int):
@@ -44,6 +103,80 @@ class DriveVoice():
             Sets the current MIDI note of the DriveVoice
         """
         self._frequency = MIDIUtil.MIDI2Freq(note)
+        self._note = note
+        self.start_time = time.perf_counter()
+        self._bend = 0
+        self.offset = 0.0
+        self._glide_from = None
+
+    @property
+    def frequency(self) -> float:
+        """
+            The frequency the DriveVoice should currently sound. That is, the
+            frequency of the note with glide, pitch bend and modulation applied.
+            None if the note is not set.
+        """
+        if self._frequency is None: return None
+        frequency = self._frequency
+        progress = self._glide_progress()
+        if progress is not None and progress < 1:
+            # Sweep evenly in pitch (n) from the glide start to the note
+            n = MIDIUtil.freq2n(frequency) + self._bend
+            n = self._glide_from + (n - self._glide_from) * progress
+            frequency = MIDIUtil.n2freq(n)
+        elif self._bend != 0:
+            frequency = MIDIUtil.n2freq(MIDIUtil.freq2n(frequency) + self._bend)
+        return frequency + self.offset
+
+    @property
+    def gliding(self) -> bool:
+        """
+            True if the DriveVoice is sweeping to its note. (Stays True until 
+            the end of the glide has been refreshed)
+        """
+        return self._glide_from is not None
+
+    def can_play(self, note:int) -> bool:
+        """
+            Returns True if all floppy drives associated with the DriveVoice
+            can play the MIDI note (see DriveCalibration)
+        Args:
+            note (int): The MIDI note
+        """
+        return note in self._playable
+
+    @property
+    def playable_notes(self) -> frozenset[int]:
+        """
+            The MIDI notes that all floppy drives of the DriveVoice can play
+        """
+        return self._playable
+
+    def fold(self, note:int) -> int:
+        """
+            Returns the playable note closest to the given note, that is the 
+            same note shifted by the fewest octaves. 
+        Args:
+            note (int): The MIDI note
+
+        Returns:
+            int: The folded MIDI note or None if the DriveVoice can't play any
+                octave of the note
+        """
+        return self._folds[note]
+
+    def glide(self, frequency:float, glide_time:float) -> None:
+        """
+            Makes the DriveVoice sweep from the given frequency to its current
+            note over glide_time seconds, starting when the note was set. The
+            sweep is sent to the drives via refresh() calls.
+        Args:
+            frequency (float): The frequency (in Hz) to sweep from
+            glide_time (float): The duration of the sweep in seconds
+        """
+        if glide_time <= 0 or self._frequency is None: return
+        self._glide_from = MIDIUtil.freq2n(frequency)
+        self._glide_time = glide_time
 
     def play(self) -> bool:
         """
@@ -56,20 +189,64 @@ class DriveVoice():
         """        
 
         if self._frequency is not None:
-            for address in self._addresses:
-                Drives.frequency(address, self._frequency)
-                Drives.enable(address, True)
+            frequency = self.frequency
+            if frequency == self._frequency:
+                # Playing the note as is, use the precomputed payloads
+                payloads = [self._calibration.payload(address, self._note)
+                            for address in self._addresses]
+            else:
+                payloads = self._payloads(frequency)
+            # Every drive's frequency and enable in one bus transaction
+            if Drives.play(self._addresses, payloads) is False:
+                # Not all sent, the next refresh() sends the frequencies again
+                self._tops = {}
+            else:
+                self._tops = {
+                    address: Drives.top(
+                        self._calibration.tune(address, frequency))
+                    for address in self._addresses}
             return True
         
         return False
+
+    def refresh(self) -> int:
+        """
+            Sends the DriveVoice's current frequency to the floppy drives that
+            would sound it (tuned) differently than what they were last sent.
+
+        Returns:
+            int: The number of bus writes made
+        """
+        frequency = self.frequency
+        if frequency is None: return 0
+
+        progress = self._glide_progress()
+        if progress is not None and progress >= 1:
+            # This refresh sends the end of the glide
+            self._glide_from = None
+
+        # Each drive is tuned differently, compare the TOPs they would use
+        tops = {}
+        payloads = []
+        for address in self._addresses:
+            tuned = self._calibration.tune(address, frequency)
+            top = Drives.top(tuned)
+            if self._tops.get(address) == top: continue
+            tops[address] = top
+            payloads.append(Drives.pack_frequency(tuned))
+        if len(tops) == 0: return 0
+
+        # (Not all sent, the next refresh() sends them again)
+        if Drives.retune(tuple(tops), payloads) is not False: 
+            self._tops.update(tops)
+        return len(tops)
     
     def silence(self):
         """
             Immediately silences all floppy drives associated with the 
             DriveVoice.
         """
-        for address in self._addresses:
-            Drives.enable(address, False)
+        Drives.silence(self._addresses)
 
     def match_mute(self, muted:bool):
         """
@@ -78,8 +255,11 @@ class DriveVoice():
         Args:
             muted (bool): The mute state to be matched
         """        
-        for address in self._addresses:
-            Drives.enable(address, not muted)
+        if muted:
+            self.silence()
+        else:
+            # Resend the frequency too, notes started while muted never sent it
+            self.play()
 
     def pitch_bend(self, pitch_bend:int, bend_range:float) -> None:
         """
@@ -88,24 +268,54 @@ class DriveVoice():
             pitch_bend (int): The MIDI pitch_wheel value
             bend_range (float): The number of steps to bend
         """
+        if self._frequency is None: return
+
         if pitch_bend == 0:
             # Pitch bend is zero so ensure that each drive is playing 
             # their original note/frequency
-            for address in self._addresses:
-                Drives.frequency(address, self._frequency)
+            self._bend = 0
         else:
-            old_n = MIDIUtil.freq2n(self._frequency)
             #Calculate the offset
-            n_mod = MIDIUtil.integer_map_range(
+            self._bend = MIDIUtil.integer_map_range(
                 pitch_bend,
                 -8192, # Min midi pitchwheel msg value
                 8191,  # Max midi pitchwheel msg value
                 -bend_range, 
                 bend_range)
-            
-            bent_freq = MIDIUtil.n2freq(old_n+n_mod)
-            for address in self._addresses:
-                Drives.frequency(address, bent_freq)   
+        self.refresh()
+
+    @staticmethod
+    def _fold(note:int, playable:frozenset[int]) -> int:
+        # Find the closest octave of the note in the playable notes. Prefer
+        # folding up on ties
+        if note in playable: return note
+        for octaves in range(1, 11):
+            for folded in (note + 12 * octaves, note - 12 * octaves):
+                if folded in playable: return folded
+        return None
+
+    def _gen_tables(self) -> None:
+        # The notes that all of the voice's drives can play
+        if len(self._addresses) == 0:
+            self._playable = frozenset()
+        else:
+            self._playable = frozenset(range(128)).intersection(
+                *(self._calibration.playable(address) 
+                  for address in self._addresses))
+        # The closest playable note (by octaves) to every note
+        self._folds = tuple(
+            DriveVoice._fold(note, self._playable) for note in range(128))
+
+    def _payloads(self, frequency:float) -> list[list[int]]:
+        # The tuned frequency payload of each drive
+        return [
+            Drives.pack_frequency(self._calibration.tune(address, frequency))
+            for address in self._addresses]
+
+    def _glide_progress(self) -> float:
+        # The fraction of the glide completed, None if not gliding
+        if self._glide_from is None: return None
+        return (time.perf_counter() - self.start_time) / self._glide_time
 
     def __repr__(self) -> str:
         return f'DriveVoice using addresses {self._addresses}'
@@ -120,10 +330,18 @@ class DriveSynth(Synth):
         self,
         drive_addresses: tuple[int],
         bow:bool = False,
-        spin:bool = False,   
+        spin:bool = False,
+        glide:int = 0,
+        calibration:DriveCalibration = None,
+        range_policy:str = 'fold',
+        control_rate:int = 100,
+        bus_budget:int = 1000,
+        broadcast:bool = True,
         **kwargs) -> None:
         """
-            Constructs a DriveSynth. Accepts Synth arguments via **kwargs 
+            Constructs a DriveSynth. Accepts Synth arguments via **kwargs. 
+            Unless specified the modulation_wave is 'square' (the drives' native
+            modulation wave), other waves are modulated by the host.
         Args:
             drive_addresses (tuple[int]): An iterable of int where each int is
                 an I2C address of a floppy drive
@@ -131,8 +349,31 @@ class DriveSynth(Synth):
                 Defaults to False.
             spin (bool, optional): The initial spin state of the DriveSynth. 
                 Defaults to False.
+            glide (int, optional): The initial glide (portamento) time in 
+                steps of GLIDE_TIME_STEP seconds [0-127]. Defaults to 0 (off).
+            calibration (DriveCalibration, optional): The tuning and usable
+                range of the drives. Defaults to None (drives are in tune).
+            range_policy (str, optional): What to do with a note that a voice
+                can't play. Must be a member of RANGE_POLICIES. 'reroute' plays
+                the note on another voice that can, 'fold' does the same but 
+                if no voice can, plays the closest octave of the note. Notes 
+                that still can't be played are rolled. Defaults to 'fold'.
+            control_rate (int, optional): The rate (in Hz) at which continuous
+                updates (ex. modulation, glide) are computed via update() calls.
+                Defaults to 100.
+            bus_budget (int, optional): The maximum number of bus writes per
+                second used by continuous updates. Defaults to 1000.
+            broadcast (bool, optional): Write the states all drives share (ex.
+                bow, spin) to I2C address 0, all drives at once. Must be False
+                if other synths use drives on the same bus (see SynthRouter),
+                the states are then written to each of the DriveSynth's drives.
+                Defaults to True.
         """
+        # Drives natively modulate with a square wave, prefer it by default
+        kwargs.setdefault('modulation_wave', 'square')
         super().__init__(**kwargs)
+        # Write shared states to every drive on the bus at once?
+        self.broadcast = broadcast
         
         # Add support for crash mode and spin (Custom). Both spin and bow use 
         # generic on/off MIDI control change messages
@@ -142,25 +383,41 @@ class DriveSynth(Synth):
         if 'spin' not in self.control_change_map:
             self.control_change_map['spin'] = 81
 
-        if 'modulation_wave' in self.control_change_map:
-            # Drives only support one modulation wave (triangle)
-            # prevent setting property modulation_wave via MIDI
-            self.control_change_map.pop('modulation_wave')
-        
+        # Glide uses the standard MIDI portamento time control change
+        if 'glide' not in self.control_change_map:
+            self.control_change_map['glide'] = 5
+
         if 'hardware_reset' not in self.sysex_map:
             self.sysex_map['hardware_reset'] = 3
         
         self.bow = bow
         self.spin = spin
+        self.glide = glide
+        self.range_policy = range_policy
+        # Counts of notes that could not be played as asked, by source
+        self._range_stats:dict[any, dict[str, int]] = {}
 
         #Ensure we have valid drive addresses 
         for address in drive_addresses: Drives._check_address(address)
         
         # Keep a copy of the Drive address to use
         self._drive_addresses = drive_addresses
+        # The drives that are not answering (see set_drive_online())
+        self._offline:set[int] = set()
+        if calibration is None: calibration = DriveCalibration()
+        self._calibration = calibration
         # Set the available voice stack to match the polyphony state
         self._available:list[DriveVoice] = self._gen_voices()        
         self._active:list[DriveVoice] = []
+
+        # Runs continuous updates (modulation, glide) at the control rate
+        self._scheduler = TickScheduler(control_rate, bus_budget)
+        # Host-side modulation for the waves the drives can't do natively
+        self._lfo = LFO(lambda: self._active)
+        self._scheduler.add(self._lfo)
+        # Sweeps voices that were given a new note when glide is on
+        self._glide = Glide(lambda: self._active, self._scheduler)
+        self._scheduler.add(self._glide)
     
         # Setup property changed callbacks/observers
         self.attach_observer('bow', self._bow_changed)
@@ -175,13 +432,122 @@ class DriveSynth(Synth):
         # Hardware reset to force the drives to match the DriveSynth's state
         self.hardware_reset()
 
+    #---------------------------Public Functions-------------------------------#
+
+    def update(self) -> None:
+        """
+            Should be called regularly (faster than the control rate). Computes
+            and sends continuous updates (ex. modulation, glide) to the drives.
+        """
+        self._scheduler.update()
+
+    def set_drive_online(self, address:int, online:bool) -> None:
+        """
+            Takes a drive out of (or puts it back in) the voices. Voices with no
+            online drives are skipped when notes are played. A drive that comes
+            back online is sent the DriveSynth's states again.
+        Args:
+            address (int): The I2C address of the drive
+            online (bool): Is the drive answering?
+        """
+        if address not in self._drive_addresses: return
+        if online == (address not in self._offline): return
+
+        if online:
+            self._offline.discard(address)
+        else:
+            self._offline.add(address)
+        self.logger.info(
+            f"Drive {address} {'online' if online else 'offline'}")
+
+        for voice in self._available + self._active:
+            voice.exclude(self._offline)
+        if not online: return
+
+        # The drive may have restarted, send it the current states
+        Drives.bow(address, self.bow)
+        Drives.spin(address, self.spin)
+        Drives.modulation_rate(address, self.modulation_rate)
+        Drives.modulation_frequency(
+            address, 
+            self._modulation_frequency() if self._lfo.wave is None else 0)
+        Drives.enable(address, False)
+        # Rejoin a note that is playing
+        for voice in self._active:
+            if address in voice.addresses and not self.muted: voice.play()
+
+    @property
+    def active_voices(self) -> int:
+        """
+            The number of voices playing a note
+        """
+        return len(self._active)
+
+    @property
+    def available_voices(self) -> int:
+        """
+            The number of voices free to play a note
+        """
+        return len(self._available)
+
+    @property
+    def playable_notes(self) -> frozenset[int]:
+        """
+            The MIDI notes that at least one voice can play (without folding)
+        """
+        return frozenset().union(
+            *(voice.playable_notes for voice in self._available + self._active))
+
+    @property
+    def drive_addresses(self) -> tuple[int]:
+        """
+            The I2C addresses of the DriveSynth's drives
+        """
+        return tuple(self._drive_addresses)
+
+    @property
+    def offline_drives(self) -> frozenset[int]:
+        """
+            The I2C addresses of the drives that are offline
+        """
+        return frozenset(self._offline)
+
+    def range_stats(self, source) -> dict[str, int]:
+        """
+            Returns the counts of notes from a source that could not be played
+            as asked since the counts were last cleared. 
+        Args:
+            source (_type_): The source of the notes
+
+        Returns:
+            dict[str, int]: The number of notes that were 'rerouted' (played
+                on a voice other than the next), 'folded' (played an octave(s)
+                away) and 'unplayable' (rolled because no voice could play them)
+        """
+        stats = {'rerouted': 0, 'folded': 0, 'unplayable': 0}
+        stats.update(self._range_stats.get(source, {}))
+        return stats
+
+    def clear_range_stats(self, source = None) -> None:
+        """
+            Clears the counts of notes that could not be played as asked
+        Args:
+            source (_type_, optional): The source to clear the counts of.
+                Defaults to None (all sources).
+        """
+        if source is None:
+            self._range_stats = {}
+        else:
+            self._range_stats.pop(source, None)
+
     #----------------------Inherited from from Synth---------------------------#
   
     def note_on(self, note: int, velocity: int, source) -> bool:
         """
             Plays a given MIDI Note. Velocity is ignored. If called directly 
             (not via MIDI) the note on will not be rolled if there are no 
-            available voices.
+            available voices. If glide is on, the voice sweeps from the last 
+            note it played to the given note.
         Args:
             note (int): A valid MIDI Note number
             velocity (int): Ignored
@@ -190,24 +556,9 @@ class DriveSynth(Synth):
 
         Returns:
             bool: True if the note was handled, False if the note could not be
-            played (There were no available voices.)
+            played (There were no available voices that can play the note.)
         """
-        try:
-            #Get an available voice throws IndexError if not possible
-            voice = self._available.pop()
-            # Setup the voice
-            voice.note = note
-            voice.source = source
-            #Play the note (if not muted)
-            if not self.muted:
-                voice.play()
-
-            #add the voice to the active pool/stack
-            self._active.append(voice)
-
-            self.logger.debug(
-                f"Note {note} from '{source}' played with {voice}")
-        except IndexError: 
+        if len(self._available) == 0:
             #We could not get an available drive
             self.logger.debug(
                 'No available DriveVoices. '
@@ -215,6 +566,54 @@ class DriveSynth(Synth):
             #We did not handle the note, return false so that it is rolled
             return False
 
+        #Get the most recently available voice that can play the note
+        played_note = note
+        for index in range(len(self._available)-1, -1, -1):
+            if self._available[index].can_play(note):
+                if index != len(self._available)-1:
+                    self._count_range(source, 'rerouted')
+                break
+        else:
+            index = None
+            if RANGE_POLICIES[self.range_policy] == 'fold':
+                # Play the note an octave(s) away on a voice that can
+                for index in range(len(self._available)-1, -1, -1):
+                    played_note = self._available[index].fold(note)
+                    if played_note is not None: break
+                else:
+                    index = None
+            
+            if index is None:
+                #None of the available drives can play the note
+                self._count_range(source, 'unplayable')
+                self.logger.debug(
+                    'No available DriveVoices can play the note. '
+                    f"Note {note} from '{source}' rolled")
+                return False
+            
+            self._count_range(source, 'folded')
+            self.logger.debug(f"Note {note} from '{source}' folded to "
+                              f'{played_note}')
+
+        voice = self._available.pop(index)
+        # Where the voice was before (to glide from)
+        last_frequency = voice.frequency
+        # Setup the voice
+        voice.note = played_note
+        voice.requested_note = note
+        voice.source = source
+        if self.glide > 0 and last_frequency is not None:
+            voice.glide(last_frequency, self.glide * GLIDE_TIME_STEP)
+        #Play the note (if not muted)
+        if not self.muted:
+            voice.play()
+
+        #add the voice to the active pool/stack
+        self._active.append(voice)
+
+        self.logger.debug(
+            f"Note {note} from '{source}' played with {voice}")
+
         #We handled the note, return true (nothing to rollover)
         return True
     
@@ -234,7 +633,7 @@ class DriveSynth(Synth):
         """
         # Test to see if that note is playing
         for index, voice in enumerate(self._active):
-            if voice.source == source and voice.note == note:
+            if voice.source == source and voice.requested_note == note:
                 #The note is playing so stop it
                 voice.silence()          
                 # Remove from the active stack
@@ -259,7 +658,8 @@ class DriveSynth(Synth):
             Resets all voices and force un-mutes the DriveSynth
         """
         # Stop all drives from sounding
-        Drives.enable(0,False)
+        if self.broadcast: Drives.enable(0,False)
+        else: Drives.silence(self._drive_addresses)
         #clear the active stack
         self._active = []
         #reset the available stack, to match our polyphony states
@@ -280,6 +680,7 @@ class DriveSynth(Synth):
         # properties to the Drives
         self.bow = self.bow
         self.spin = self.spin
+        self.modulation_wave = self.modulation_wave
         self.modulation_rate = self.modulation_rate
         self.modulation = self.modulation
 
@@ -325,26 +726,34 @@ class DriveSynth(Synth):
 
     def _bow_changed(self, bow:bool) -> None:
         self.logger.info(f'_bow_changed: {bow}')
-        Drives.bow(0, bow)
+        for address in self._state_addresses(): Drives.bow(address, bow)
 
     def _spin_changed(self, spin:bool) -> None:
         self.logger.info(f'_spin_changed: {spin}')
         # Update all drives' spin states
-        Drives.spin(0, spin)
+        for address in self._state_addresses(): Drives.spin(address, spin)
     
     def _modulation_rate_changed(self, modulation_rate:int) -> None:
         self.logger.info(f'modulation_rate_changed: {modulation_rate}')
         # Update all drives' modulation rates
-        Drives.modulation_rate(0, modulation_rate)
+        for address in self._state_addresses():
+            Drives.modulation_rate(address, modulation_rate)
+        # The host modulation uses the same amount
+        self._lfo.depth = modulation_rate
     
     def _modulation_changed(self, modulation:int) -> None:
         #TODO only 1-16hz sounds good, do we want this hard coded?
         # 0 -> no modulation/off
         self.logger.info(f'_modulation_changed: {modulation}')
         # Map the frequency
-        modulation_freq = MIDIUtil.integer_map_range(modulation, 0, 127, 0, 16)
-        # Update all drives' modulation frequencies                  
-        Drives.modulation_frequency(0,modulation_freq)
+        modulation_freq = self._modulation_frequency()
+        if self._lfo.wave is None:
+            # Update all drives' modulation frequencies
+            for address in self._state_addresses():
+                Drives.modulation_frequency(address, modulation_freq)
+        else:
+            # Modulating on the host
+            self._lfo.frequency = modulation_freq
 
     def _muted_changed(self, muted:bool) -> None:
         self.logger.info(f'_muted_changed: {muted}')
@@ -369,14 +778,46 @@ class DriveSynth(Synth):
             voice.pitch_bend(pitch_bend, bend_range)               
 
     def _modulation_wave_changed(self, modulation_wave:int) -> None:
-        # Drives only support one modulation wave (triangle)
-        # prevent setting property modulation_wave programmatically
-        raise NotImplementedError('DriveSynth only supports one modulation wave'
-                                  ' (triangle). Setting the modulation_wave is '
-                                  'not supported')
+        self.logger.info(f'_modulation_wave_changed: {modulation_wave}')
+        # Observers get the value as set, which may be a name or an index
+        wave = MODULATION_WAVES[self.modulation_wave]
+        if wave == 'square':
+            # Drives natively modulate with a square wave, stop the host 
+            # modulation
+            self._lfo.wave = None
+        else:
+            # Drives can't modulate with the wave, turn off the drives' 
+            # modulation and modulate on the host
+            for address in self._state_addresses():
+                Drives.modulation_frequency(address, 0)
+            self._lfo.wave = wave
+        # Apply the current modulation to the drives or the host
+        self._modulation_changed(self.modulation)
 
     #---------------------------Private Functions------------------------------#
 
+    def _count_range(self, source, stat:str) -> None:
+        # Count a note that could not be played as asked
+        stats = self._range_stats.setdefault(source, {})
+        stats[stat] = stats.get(stat, 0) + 1
+
+    def _state_addresses(self) -> tuple[int]:
+        # The I2C addresses to write the states all drives share to. Address 0
+        # (all drives on the bus) unless other synths share the bus
+        if self.broadcast: return (0,)
+        return tuple(self._drive_addresses)
+
+    def _modulation_frequency(self) -> int:
+        # The modulation frequency (Hz) of the modulation property
+        return MIDIUtil.integer_map_range(
+            self.modulation, 0, 127, 0, MAX_MODULATION_FREQUENCY)
+
+    def _new_voice(self, addresses:tuple[int]) -> DriveVoice:
+        # A DriveVoice that skips the offline drives
+        voice = DriveVoice(addresses, self._calibration)
+        voice.exclude(self._offline)
+        return voice
+
     def _gen_voices(self) -> list[DriveVoice]:
         """
             Generates an appropriate list of DriveVoices based upon the
@@ -396,7 +837,7 @@ class DriveSynth(Synth):
             if self.poly_voices == 0 or \
                 (self.poly_voices > len(self._drive_addresses)):
                 for address in self._drive_addresses:
-                    voices.append(DriveVoice((address,)))
+                    voices.append(self._new_voice((address,)))
                 return voices
 
             address_pool = list(self._drive_addresses)
@@ -406,7 +847,7 @@ class DriveSynth(Synth):
                 voice_addresses = []
                 for i in range(address_per_voice):
                     voice_addresses.append(address_pool.pop())
-                voices.append(DriveVoice(tuple(voice_addresses)))
+                voices.append(self._new_voice(tuple(voice_addresses)))
             return voices            
         else:
             # DriveSynth is  monophonic
@@ -417,13 +858,13 @@ class DriveSynth(Synth):
             if self._mono_voices == 0 or \
                 (self.mono_voices > len(self._drive_addresses)):
                 #Use all drives/addresses on a single voice
-                voices.append(DriveVoice(self._drive_addresses))
+                voices.append(self._new_voice(self._drive_addresses))
                 return voices            
 
             drives_to_use = tuple(
                 self._drive_addresses[i] for i in range(self.mono_voices))
             
-            voices.append(DriveVoice(drives_to_use))
+            voices.append(self._new_voice(drives_to_use))
             return voices
 
     #------------------------------Properties----------------------------------#
@@ -444,3 +885,30 @@ class DriveSynth(Synth):
     @spin.setter
     def spin(self, spin:bool):
         self._spin = bool(spin)
+
+    @property
+    def glide(self) -> int:
+        return self._glide_steps
+
+    @glide.setter
+    def glide(self, glide:int) -> None:
+        if glide<0 or glide>127:
+            raise ValueError('glide must be [0-127]')
+        self._glide_steps = glide
+
+    @property
+    def range_policy(self) -> int:
+        return self._range_policy
+
+    @range_policy.setter
+    def range_policy(self, range_policy) -> None:
+        if isinstance(range_policy, str):
+            # this will throw an exception if range_policy is not in 
+            # RANGE_POLICIES which is ok because strs can only be used 
+            # programmatically.
+            range_policy = RANGE_POLICIES.index(range_policy)
+
+        if range_policy <0 or range_policy > len(RANGE_POLICIES)-1:
+            raise ValueError('Not a valid range policy')
+
+        self._range_policy = range_policy
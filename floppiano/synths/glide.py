@@ -0,0 +1,44 @@
+import math
+from typing import Callable
+from floppiano.synths.scheduler import ContinuousTask, TickScheduler
+
+
+class Glide(ContinuousTask):
+    """
+        Sweeps gliding voices (portamento) towards their notes. When there are
+        more gliding voices than the bus budget allows to update every tick,
+        each voice is stepped less often (in bigger steps) so that the glides
+        never take more than their share of the bus.
+    """
+
+    def __init__(
+        self,
+        voices:Callable[[], list],
+        scheduler:TickScheduler) -> None:
+        """
+            Creates a Glide
+        Args:
+            voices (Callable[[], list]): Returns the voices to glide. A voice
+                must have the attributes 'gliding' and 'addresses'.
+            scheduler (TickScheduler): The scheduler running the Glide, used to
+                get the current bus budget.
+        """
+        self._voices = voices
+        self._scheduler = scheduler
+        self._ticks = 0
+        # The number of ticks between steps of a single voice
+        self.stride = 1
+
+    def tick(self, now:float) -> list:
+        gliding = [voice for voice in self._voices() if voice.gliding]
+        if len(gliding) == 0:
+            self.stride = 1
+            return []
+
+        # How many ticks are needed to step every gliding voice once?
+        writes = sum(len(voice.addresses) for voice in gliding)
+        self.stride = math.ceil(writes / self._scheduler.budget)
+
+        # Step an interleaved slice of the gliding voices each tick
+        self._ticks += 1
+        return gliding[self._ticks % self.stride::self.stride]
@@ -0,0 +1,110 @@
+import math
+from typing import Callable
+from floppiano.synths.synth import MODULATION_WAVES
+from floppiano.synths.scheduler import ContinuousTask
+
+# Number of samples in a wave table
+TABLE_SIZE = 256
+
+
+def _wave_table(wave:str, size:int) -> tuple[float]:
+    """
+        Generates one period of a unipolar wave ([0,1]) with size samples
+    Args:
+        wave (str): The wave name, a member of MODULATION_WAVES
+        size (int): The number of samples
+
+    Raises:
+        ValueError: If the wave is not known
+
+    Returns:
+        tuple[float]: The wave samples
+    """
+    phases = [i / size for i in range(size)]
+    match wave:
+        case 'sine':
+            return tuple((1 - math.cos(2 * math.pi * p)) / 2 for p in phases)
+        case 'square':
+            return tuple(0.0 if p < 0.5 else 1.0 for p in phases)
+        case 'saw':
+            return tuple(phases)
+        case 'triangle':
+            return tuple(1 - abs(2 * p - 1) for p in phases)
+        case _:
+            raise ValueError(f'Unknown wave: {wave}')
+
+
+class LFO(ContinuousTask):
+    """
+        A host-side low frequency oscillator. Modulates the frequency of voices
+        by adding an offset (in Hz) that follows a wave. Each voice's wave phase
+        starts when the voice starts playing (key sync).
+    """
+
+    # One period of each wave, built once
+    WAVE_TABLES = {wave: _wave_table(wave, TABLE_SIZE) 
+                   for wave in MODULATION_WAVES}
+
+    def __init__(
+        self,
+        voices:Callable[[], list],
+        wave:str = None,
+        frequency:float = 0,
+        depth:float = 0) -> None:
+        """
+            Creates an LFO
+        Args:
+            voices (Callable[[], list]): Returns the voices to modulate. A voice
+                must have the attributes 'start_time' and 'offset'.
+            wave (str, optional): The wave to modulate with. None disables the
+                LFO. Defaults to None.
+            frequency (float, optional): The LFO frequency in Hz. Defaults to 0.
+            depth (float, optional): The maximum offset in Hz added to a voice's
+                frequency. Defaults to 0.
+        """
+        self._voices = voices
+        self.wave = wave
+        self.frequency = frequency
+        self.depth = depth
+        # Was the LFO running on the last tick?
+        self._was_running = False
+
+    @property
+    def wave(self) -> str:
+        return self._wave
+
+    @wave.setter
+    def wave(self, wave:str) -> None:
+        if wave is not None and wave not in LFO.WAVE_TABLES:
+            raise ValueError(f'Unknown wave: {wave}')
+        self._wave = wave
+
+    @property
+    def running(self) -> bool:
+        """
+            True if the LFO changes the frequency of its voices
+        """
+        return self._wave is not None and self.frequency > 0 and self.depth > 0
+
+    def tick(self, now:float) -> list:
+        voices = self._voices()
+
+        if not self.running:
+            if self._was_running:
+                # Put the voices back to their un-modulated frequency once
+                self._was_running = False
+                for voice in voices: voice.offset = 0.0
+                return voices
+            return []
+        self._was_running = True
+
+        # Compute every voice's offset in one pass over the wave table
+        table = LFO.WAVE_TABLES[self._wave]
+        step = self.frequency * TABLE_SIZE
+        depth = self.depth
+        offsets = [
+            depth * table[int((now - voice.start_time) * step) % TABLE_SIZE]
+            for voice in voices
+        ]
+        for voice, offset in zip(voices, offsets): voice.offset = offset
+        return voices
@@ -0,0 +1,235 @@
+from mido import Message
+from floppiano.midi import MIDIUtil
+from floppiano.devices import DriveCalibration
+from floppiano.synths.drive_synth import DriveSynth
+
+
+class SynthRouter():
+    """
+        Plays MIDI on several DriveSynths at once, each with its own drives and
+        input channel. Messages are sent to the DriveSynth(s) listening on
+        their channel (messages without a channel, ex. sysex, go to all of
+        them). Has the parts of the DriveSynth interface that an Engine uses,
+        so it can be used in a DriveSynth's place.
+    """
+
+    def __init__(self, synths:list[DriveSynth]) -> None:
+        """
+            Creates a SynthRouter
+        Args:
+            synths (list[DriveSynth]): The DriveSynths to route MIDI to
+
+        Raises:
+            ValueError: If there are no DriveSynths, if DriveSynths share a
+                drive or if one of several DriveSynths broadcasts to all drives
+                (see DriveSynth's broadcast)
+        """
+        if len(synths) == 0:
+            raise ValueError('A SynthRouter needs at least one DriveSynth')
+        owners:dict[int, DriveSynth] = {}
+        for synth in synths:
+            if len(synths) > 1 and synth.broadcast:
+                raise ValueError(
+                    'DriveSynths that share the bus must not broadcast')
+            for address in synth.drive_addresses:
+                if address in owners:
+                    raise ValueError(
+                        f'Drive {address} is used by more than one DriveSynth')
+                owners[address] = synth
+
+        self._synths = list(synths)
+        # The DriveSynth that plays each drive
+        self._owners = owners
+
+    @staticmethod
+    def split(
+        drive_addresses:tuple[int],
+        count:int,
+        calibration:DriveCalibration = None,
+        **kwargs) -> 'SynthRouter':
+        """
+            Creates a SynthRouter that splits drives (as evenly as possible, in
+            order) across a number of DriveSynths listening on MIDI channels 0
+            to count-1. Accepts DriveSynth arguments via **kwargs.
+        Args:
+            drive_addresses (tuple[int]): The I2C addresses of the drives
+            count (int): The number of DriveSynths [1, 16]
+            calibration (DriveCalibration, optional): The tuning and usable
+                range of the drives. Defaults to None (drives are in tune).
+
+        Raises:
+            ValueError: If count is not in the range [1, 16] or there are fewer
+                drives than DriveSynths
+
+        Returns:
+            SynthRouter: The SynthRouter
+        """
+        if count < 1 or count > 16:
+            raise ValueError('The number of synths must be [1, 16]')
+        if count > len(drive_addresses):
+            raise ValueError(
+                f'Can not split {len(drive_addresses)} drives across {count} '
+                'synths')
+        drive_addresses = tuple(drive_addresses)
+        size, extra = divmod(len(drive_addresses), count)
+        synths = []
+        start = 0
+        for channel in range(count):
+            end = start + size + (1 if channel < extra else 0)
+            synths.append(DriveSynth(
+                drive_addresses[start:end],
+                calibration = calibration,
+                input_channel = channel,
+                output_channel = channel,
+                broadcast = count == 1,
+                **kwargs))
+            start = end
+        return SynthRouter(synths)
+
+    @property
+    def synths(self) -> list[DriveSynth]:
+        """
+            The DriveSynths that MIDI is routed to
+        """
+        return list(self._synths)
+
+    def parse(self, messages:list[Message], source = None) -> list[Message]:
+        """
+            Routes the messages to the DriveSynths by their channel (in one
+            pass) and has each DriveSynth act on its messages (see
+            Synth.parse())
+        Args:
+            messages (list[Message]): The MIDI messages to parse
+            source (_type_, optional): The source of the MIDI messages.
+                Defaults to None.
+
+        Returns:
+            list[Message]: The messages the DriveSynths output (ex. rolled
+                notes), by DriveSynth. Messages without a channel are output
+                once.
+        """
+        # The DriveSynths listening on each channel (read for every batch,
+        # the input channels can change)
+        table:dict[int, list[DriveSynth]] = {}
+        for synth in self._synths:
+            table.setdefault(synth.input_channel, []).append(synth)
+
+        batches:dict[int, list[Message]] = {}
+        for msg in messages:
+            if MIDIUtil.hasChannel(msg):
+                for synth in table.get(msg.channel, ()):
+                    batches.setdefault(id(synth), []).append(msg)
+            else:
+                for synth in self._synths:
+                    batches.setdefault(id(synth), []).append(msg)
+
+        outgoing = []
+        # Every DriveSynth passes along the messages without a channel (the
+        # same objects), output them once
+        passed = set()
+        for synth in self._synths:
+            batch = batches.get(id(synth))
+            if batch is None: continue
+            for msg in synth.parse(batch, source):
+                if not MIDIUtil.hasChannel(msg):
+                    if id(msg) in passed: continue
+                    passed.add(id(msg))
+                outgoing.append(msg)
+        return outgoing
+
+    def update(self) -> None:
+        """
+            Should be called regularly, sends each DriveSynth's continuous
+            updates (see DriveSynth.update())
+        """
+        for synth in self._synths: synth.update()
+
+    def reset(self) -> None:
+        """
+            Resets every DriveSynth
+        """
+        for synth in self._synths: synth.reset()
+
+    def hardware_reset(self) -> None:
+        """
+            Forces every DriveSynth's drives to match its states
+        """
+        for synth in self._synths: synth.hardware_reset()
+
+    def mute(self) -> None:
+        """
+            Mutes every DriveSynth
+        """
+        for synth in self._synths: synth.mute()
+
+    @property
+    def muted(self) -> bool:
+        """
+            Are all of the DriveSynths muted? Setting it (un)mutes them all.
+        """
+        return all(synth.muted for synth in self._synths)
+
+    @muted.setter
+    def muted(self, muted:bool) -> None:
+        for synth in self._synths: synth.muted = muted
+
+    def set_drive_online(self, address:int, online:bool) -> None:
+        """
+            Takes a drive out of (or puts it back in) the voices of the
+            DriveSynth that plays it (see DriveSynth.set_drive_online())
+        """
+        synth = self._owners.get(address)
+        if synth is not None: synth.set_drive_online(address, online)
+
+    @property
+    def active_voices(self) -> int:
+        """
+            The number of voices playing a note, of all DriveSynths
+        """
+        return sum(synth.active_voices for synth in self._synths)
+
+    @property
+    def available_voices(self) -> int:
+        """
+            The number of voices free to play a note, of all DriveSynths
+        """
+        return sum(synth.available_voices for synth in self._synths)
+
+    @property
+    def offline_drives(self) -> frozenset[int]:
+        """
+            The I2C addresses of the drives that are offline
+        """
+        return frozenset().union(
+            *(synth.offline_drives for synth in self._synths))
+
+    @property
+    def playable_notes(self) -> frozenset[int]:
+        """
+            The MIDI notes that at least one voice of a DriveSynth can play
+        """
+        return frozenset().union(
+            *(synth.playable_notes for synth in self._synths))
+
+    def range_stats(self, source) -> dict[str, int]:
+        """
+            Returns the counts of notes from a source that could not be played
+            as asked, of all DriveSynths (see DriveSynth.range_stats())
+        """
+        stats = {'rerouted': 0, 'folded': 0, 'unplayable': 0}
+        for synth in self._synths:
+            for stat, count in synth.range_stats(source).items():
+                stats[stat] += count
+        return stats
+
+    def clear_range_stats(self, source = None) -> None:
+        """
+            Clears the range stats of every DriveSynth (see
+            DriveSynth.clear_range_stats())
+        """
+        for synth in self._synths: synth.clear_range_stats(source)
+
+    def __repr__(self) -> str:
+        return 'SynthRouter(' + ', '.join(
+            f'channel {synth.input_channel}: {synth.drive_addresses}'
+            for synth in self._synths) + ')'
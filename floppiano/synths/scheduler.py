@@ -0,0 +1,173 @@
+import time
+from abc import ABC, abstractmethod
+
+
+class ContinuousTask(ABC):
+    """
+        An abstract task that continuously changes the state of some voices
+        (ex. modulation). Invoked by a TickScheduler once per control tick.
+    """
+
+    @abstractmethod
+    def tick(self, now:float) -> list:
+        """
+            Called once per control tick. Should update the state of any voices
+            the task is responsible for (without writing to the bus) and return
+            them so that the TickScheduler may refresh them.
+        Args:
+            now (float): The time (time.perf_counter()) of the tick
+
+        Returns:
+            list: The voices that need to be refreshed. A voice must implement
+                refresh() -> int, which sends its state to the bus and returns
+                the number of bus writes made.
+        """
+        return []
+
+
+class TickScheduler():
+    """
+        Runs ContinuousTasks at a fixed control rate via regular update() calls
+        and refreshes the voices they change within a bus bandwidth budget.
+    """
+
+    # Weight of the newest measurement in the bus write time average
+    _WRITE_TIME_WEIGHT = 0.1
+
+    def __init__(
+        self,
+        control_rate:int = 100,
+        bus_budget:int = 1000,
+        bus_share:float = 0.5) -> None:
+        """
+            Creates a TickScheduler
+        Args:
+            control_rate (int, optional): The number of ticks per second.
+                Defaults to 100.
+            bus_budget (int, optional): The maximum number of bus writes per
+                second that may be used to refresh voices. Defaults to 1000.
+            bus_share (float, optional): The maximum fraction of each tick's
+                time that may be spent writing to the bus (measured). The rest
+                is left for note on/off writes. Defaults to 0.5.
+
+        Raises:
+            ValueError: If the control rate or bus budget is not positive or if
+                the bus share is not in the range (0,1]
+        """
+        if control_rate <= 0:
+            raise ValueError('control_rate must be > 0')
+        if bus_budget <= 0:
+            raise ValueError('bus_budget must be > 0')
+        if bus_share <= 0 or bus_share > 1:
+            raise ValueError('bus_share must be in the range (0,1]')
+
+        self._period = 1 / control_rate
+        self._bus_budget = bus_budget
+        self._bus_share = bus_share
+        self._tasks:list[ContinuousTask] = []
+        self._next_tick = 0.0
+        # Where to start refreshing next tick when the budget runs out
+        self._cursor = 0
+        # Measured seconds per bus write (None until measured)
+        self._write_time:float = None
+
+        # Statistics
+        self.ticks = 0    # Number of ticks run
+        self.writes = 0   # Number of bus writes made refreshing voices
+        self.deferred = 0 # Number of refreshes pushed to a later tick
+
+    def add(self, task:ContinuousTask) -> None:
+        """
+            Adds a ContinuousTask to be run every tick
+        Args:
+            task (ContinuousTask): The task to add
+        """
+        if task not in self._tasks:
+            self._tasks.append(task)
+
+    def remove(self, task:ContinuousTask) -> None:
+        """
+            Removes a ContinuousTask
+        Args:
+            task (ContinuousTask): The task to remove
+        """
+        self._tasks.remove(task)
+
+    def update(self) -> int:
+        """
+            Should be called regularly (faster than the control rate). Runs all
+            tasks if a tick is due and refreshes the voices they changed.
+
+        Returns:
+            int: The number of bus writes made
+        """
+        now = time.perf_counter()
+        if now < self._next_tick: return 0
+
+        self._next_tick += self._period
+        # Don't try to catch up on missed ticks, that would flood the bus
+        if self._next_tick < now: self._next_tick = now + self._period
+        self.ticks += 1
+
+        # Collect the voices that changed (once each, in task order)
+        due = []
+        for task in self._tasks: due.extend(task.tick(now))
+        if len(due) == 0: return 0
+        due = list(dict.fromkeys(due))
+
+        # Rotate so that voices skipped last tick go first
+        start = self._cursor % len(due)
+        due = due[start:] + due[:start]
+
+        budget = self.budget
+        writes = 0
+        refreshed = 0
+        start_time = time.perf_counter()
+        for voice in due:
+            if writes >= budget: break
+            writes += voice.refresh()
+            refreshed += 1
+        elapsed = time.perf_counter() - start_time
+
+        self._cursor = (start + refreshed) if refreshed < len(due) else 0
+        self.deferred += len(due) - refreshed
+        self.writes += writes
+
+        if writes > 0:
+            # Keep a running average of how long a bus write takes
+            write_time = elapsed / writes
+            if self._write_time is None:
+                self._write_time = write_time
+            else:
+                self._write_time += TickScheduler._WRITE_TIME_WEIGHT * \
+                    (write_time - self._write_time)
+        return writes
+
+    @property
+    def control_rate(self) -> float:
+        return 1 / self._period
+
+    @property
+    def bus_budget(self) -> int:
+        return self._bus_budget
+
+    @property
+    def write_time(self) -> float:
+        """
+            The measured average time (in seconds) of a bus write. None if no
+            writes have been measured
+        """
+        return self._write_time
+
+    @property
+    def budget(self) -> int:
+        """
+            The number of bus writes allowed per tick. The lesser of the
+            configured bus budget and the writes that fit in the tick's bus
+            share at the measured bus throughput. Always at least 1.
+        """
+        budget = self._bus_budget * self._period
+        if self._write_time is not None and self._write_time > 0:
+            budget = min(
+                budget, self._bus_share * self._period / self._write_time)
+        return max(1, int(budget))
@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 from typing import Any, Callable
 from mido import Message
 from floppiano.midi import MIDIUtil, MIDIListener, MIDIParser
+import floppiano.metrics as metrics
 
 # Constants for Synths #
 OUTPUT_MODES = ['off', 'rollover']
@@ -414,6 +415,7 @@ class Synth(MIDIParser, MIDIListener, ABC):
         # If the note_on function did not handle the message, pass the message
         # along to the output
         if not (self.note_on(msg.note, msg.velocity, source)):
+            metrics.registry.count('synth.rolled')
             self._output.append(msg)
    
     def on_note_off(self, msg: Message, source) -> None:
@@ -0,0 +1,132 @@
+import json
+from collections import deque
+
+"""
+                            Note Latency Tracing:
+
+A LatencyTracer records, for each traced MIDI message, when it arrived from its
+source (ex. the keyboard scan that found a key change), when the synth started
+handling it and when the synth's bus writes for it finished. All times are
+time.perf_counter() times in seconds.
+
+The latencies (arrival to bus writes finished) are summarized per source as
+p50/p99/max and the events can be saved as a Chrome trace (JSON) that can be
+opened with chrome://tracing or https://ui.perfetto.dev
+"""
+
+
+class LatencyTracer():
+    """
+        Records the latency of MIDI messages from their arrival to the end of
+        their bus writes. Only the most recent events are kept.
+    """
+
+    def __init__(self, max_events:int = 100000) -> None:
+        """
+            Creates a LatencyTracer
+        Args:
+            max_events (int, optional): The maximum number of events kept (per
+                source for the latencies). Defaults to 100000.
+        Raises:
+            ValueError: If max_events is not positive
+        """
+        if max_events < 1:
+            raise ValueError('max_events must be positive')
+        self._max_events = max_events
+        # (source, name, arrival, start, done) of each message
+        self._events:deque[tuple[str, str, float, float, float]] = \
+            deque(maxlen = max_events)
+        # The latencies (seconds) of each source
+        self._latencies:dict[str, deque[float]] = {}
+
+    def record(
+        self,
+        source:str,
+        name:str,
+        arrival:float,
+        start:float,
+        done:float) -> None:
+        """
+            Records a message's times
+        Args:
+            source (str): The source of the message (ex. 'keyboard')
+            name (str): What the message was (ex. 'note_on 60')
+            arrival (float): When the message arrived from its source
+            start (float): When the synth started handling the message
+            done (float): When the message's bus writes finished
+        """
+        self._events.append((source, name, arrival, start, done))
+        latencies = self._latencies.get(source)
+        if latencies is None:
+            latencies = deque(maxlen = self._max_events)
+            self._latencies[source] = latencies
+        latencies.append(done - arrival)
+
+    def clear(self) -> None:
+        """
+            Forgets all recorded events
+        """
+        self._events.clear()
+        self._latencies = {}
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+            Returns the latency stats of each source
+        Returns:
+            dict[str, dict[str, float]]: The 'count' of messages and the 'p50',
+                'p99' and 'max' latencies (in milliseconds) of each source
+        """
+        stats = {}
+        for source, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            stats[source] = {
+                'count': len(ordered),
+                'p50': LatencyTracer._percentile(ordered, 50) * 1000,
+                'p99': LatencyTracer._percentile(ordered, 99) * 1000,
+                'max': ordered[-1] * 1000
+            }
+        return stats
+
+    def report(self) -> list[str]:
+        """
+            Returns the lines of a latency summary, one per source
+        """
+        return [f"{source}: {stat['count']} messages, "
+                f"p50 {stat['p50']:.2f} ms, p99 {stat['p99']:.2f} ms, "
+                f"max {stat['max']:.2f} ms"
+                for source, stat in self.stats().items()]
+
+    def save_trace(self, file_path:str) -> None:
+        """
+            Saves the recorded events as a Chrome trace (JSON). Each source is
+            a track, each message a 'wait' (arrival to start) and a 'play'
+            (start to done) span.
+        Args:
+            file_path (str): The path to the trace file
+        Raises:
+            OSError: If the file could not be written
+        """
+        tracks = {}
+        events = []
+        for source, name, arrival, start, done in self._events:
+            if source not in tracks:
+                tracks[source] = len(tracks) + 1
+                events.append({
+                    'name': 'thread_name', 'ph': 'M', 'pid': 1,
+                    'tid': tracks[source], 'args': {'name': source}})
+            for span, begin, end in (('wait', arrival, start),
+                                     ('play', start, done)):
+                events.append({
+                    'name': f'{name} ({span})', 'cat': source, 'ph': 'X',
+                    'pid': 1, 'tid': tracks[source],
+                    'ts': begin * 1000000, 'dur': (end - begin) * 1000000})
+
+        with open(file_path, 'w') as file:
+            json.dump(
+                {'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    @staticmethod
+    def _percentile(ordered:list[float], percent:float) -> float:
+        # The nearest-rank percentile of sorted values
+        rank = max(0, -(-len(ordered) * percent // 100) - 1)
+        return ordered[int(rank)]